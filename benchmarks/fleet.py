@@ -0,0 +1,197 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""End to end recipe runs against a synthetic fleet of local hosts
+
+    $ python benchmarks/fleet.py --hosts 1000
+    $ python benchmarks/fleet.py --hosts 5000 --parallel 4 --forks 50 --latency 0.05
+    $ python benchmarks/fleet.py --hosts 100 --recipes ping --connection local
+
+Hosts use a bundled fake connection plugin by default. It runs no module
+and answers after --latency seconds, --failure sets the share of
+unreachable hosts. The local connection runs the recipes for real on this
+machine, keep it to harmless recipes like ping.
+"""
+
+import os
+import sys
+import time
+import yaml
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+
+from flook.model.host import Host
+from flook.module.database import Database
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fleet(count, connection):
+    """Synthetic hosts, each with its own loopback address"""
+    return (
+        Host(
+            str(i),
+            f"fleet-{i}",
+            connection,
+            f"127.{i >> 16 & 255}.{i >> 8 & 255}.{(i & 255) or 1}",
+            22,
+            "root",
+            "fake",
+            "",
+            ["fleet"],
+            None,
+            None,
+        )
+        for i in range(count)
+    )
+
+
+def setup(home, args):
+    """Write the configs and register the recipes and hosts"""
+    env = dict(
+        os.environ,
+        HOME=home,
+        FLOOK_SOCKET=f"{home}/none.sock",
+    )
+
+    flook(env, ["config", "init"])
+
+    with open(f"{home}/.flook.yml") as f:
+        configs = yaml.safe_load(f)
+
+    configs["cache"]["path"] = f"{home}/cache"
+    configs["ansible"] = {
+        "envvars": {
+            "ANSIBLE_FORKS": args.forks,
+            "ANSIBLE_CONNECTION_PLUGINS": f"{ROOT}/benchmarks/plugins/connection",
+            "FLOOK_FAKE_LATENCY": args.latency,
+            "FLOOK_FAKE_FAILURE": args.failure,
+        }
+    }
+
+    with open(f"{home}/.flook.yml", "w") as f:
+        yaml.dump(configs, f)
+
+    os.makedirs(f"{home}/cache")
+
+    for name in args.recipes:
+        flook(env, ["recipe", "add", name, "-p", f"{ROOT}/recipe/{name}"])
+
+    database = Database()
+    database.connect(f"{home}/flook.db")
+    database.insert_hosts(fleet(args.hosts, args.connection))
+
+    return env
+
+
+def flook(env, args):
+    """Run a flook command"""
+    return subprocess.run(
+        [sys.executable, "-m", "flook.cli"] + args,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+
+def bench(env, name, args):
+    """Run a recipe towards the fleet, measure it and its child processes"""
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started_at = time.perf_counter()
+
+    flook(
+        env,
+        ["recipe", "run", name, "-t", "fleet", "-p", str(args.parallel)]
+        + (["--serial", args.serial] if args.serial else []),
+    )
+
+    makespan = time.perf_counter() - started_at
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    database = Database()
+    database.connect(f"{env['HOME']}/flook.db")
+    task = database.list_tasks("", 1)[0]
+
+    return {
+        "recipe": name,
+        "status": task.status,
+        "hosts": ", ".join(
+            f"{k}: {v}" for k, v in task.result.get("hosts", {}).items()
+        ),
+        "makespan": makespan,
+        "throughput": args.hosts / makespan,
+        "cpu": (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime),
+        # The largest child process so far, ansible-playbook in practice
+        "rss": after.ru_maxrss / 1024,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=1000)
+    parser.add_argument(
+        "--recipes",
+        nargs="+",
+        default=sorted(os.listdir(f"{ROOT}/recipe")),
+        help="Recipes of the recipe directory to run",
+    )
+    parser.add_argument("--connection", choices=["fake", "local"], default="fake")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure", type=float, default=0.0)
+    parser.add_argument("--parallel", type=int, default=1)
+    parser.add_argument("--forks", type=int, default=5)
+    parser.add_argument("--serial", default="")
+    parser.add_argument("--keep", action="store_true", help="Keep the flook home")
+    args = parser.parse_args(argv)
+
+    home = tempfile.mkdtemp(prefix="flook-fleet-")
+
+    try:
+        env = setup(home, args)
+
+        print(
+            f"{'recipe':<10} {'status':<10} {'makespan (s)':>12} {'hosts/s':>9} {'cpu (s)':>8} {'rss (MiB)':>10}  hosts"
+        )
+
+        for name in args.recipes:
+            item = bench(env, name, args)
+            print(
+                "{recipe:<10} {status:<10} {makespan:>12.2f} {throughput:>9.1f} {cpu:>8.2f} {rss:>10.1f}  {hosts}".format(
+                    **item
+                )
+            )
+    finally:
+        if args.keep:
+            print(f"flook home kept in {home}")
+        else:
+            shutil.rmtree(home)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
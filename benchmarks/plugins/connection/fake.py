@@ -0,0 +1,85 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+DOCUMENTATION = """
+    name: fake
+    short_description: Pretend to run modules on a host that does not exist
+    description:
+        - Runs no module, answers each one with a canned result after a delay,
+          for flook fleet benchmarks.
+        - FLOOK_FAKE_LATENCY sets the delay in seconds of each module.
+        - FLOOK_FAKE_FAILURE sets the share of hosts, between 0 and 1, that are
+          unreachable.
+    author: flook
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+
+from ansible.errors import AnsibleConnectionFailure
+from ansible.plugins.connection.local import Connection as LocalConnection
+
+
+# Canned module results, the rest only report no change
+RESULTS = {
+    "ping": {"ping": "pong"},
+    "stat": {"stat": {"exists": False}},
+    "setup": {"ansible_facts": {}},
+    "gather_facts": {"ansible_facts": {}},
+}
+
+# Modules come piped in with pipelining, as a file to run otherwise
+MODULE = re.compile(rb"mod_name='[\w.]*?(\w+)'|AnsiballZ_(\w+)\.py")
+
+
+class Connection(LocalConnection):
+    """Fake Connection Class"""
+
+    transport = "fake"
+
+    def _connect(self):
+        host = self._play_context.remote_addr or ""
+        failure = float(os.getenv("FLOOK_FAKE_FAILURE", "0"))
+
+        # The same hosts fail on every run, so runs compare
+        if zlib.crc32(host.encode()) % 10000 < failure * 10000:
+            raise AnsibleConnectionFailure(f"Fake host {host} is unreachable")
+
+        return super()._connect()
+
+    def exec_command(self, cmd, in_data=None, sudoable=True):
+        found = MODULE.search(in_data or b"") or MODULE.search(cmd.encode())
+
+        # Temporary directories and file moves run locally, modules never do
+        if found is None:
+            return super().exec_command(cmd, in_data, sudoable)
+
+        self._connect()
+        time.sleep(float(os.getenv("FLOOK_FAKE_LATENCY", "0")))
+
+        name = (found.group(1) or found.group(2)).decode()
+        result = dict({"changed": False}, **RESULTS.get(name, {}))
+
+        return 0, json.dumps(result).encode(), b""
@@ -0,0 +1,311 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Benchmarks of the database, playbook build, output and CLI hot paths
+
+    $ python benchmarks/suite.py run -o benchmarks/results.json
+    $ python benchmarks/suite.py run --sizes 1000 --only db output
+    $ python benchmarks/suite.py compare benchmarks/baseline.json benchmarks/results.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import statistics
+from datetime import datetime
+
+from flook.model.host import Host
+from flook.model.recipe import Recipe
+from flook.module.output import Output
+from flook.module.database import Database
+
+from bench_playbook import build, hosts
+
+
+# Operations timed one by one at each table size
+SAMPLE = 1000
+
+# CLI commands timed from a cold interpreter
+COMMANDS = [
+    ["host", "list"],
+    ["recipe", "list"],
+    ["task", "list"],
+    ["group", "list"],
+    ["config", "dump"],
+    ["metrics"],
+]
+
+RECIPE = "tasks:\n  - name: ping the host\n    ping: {}\n"
+
+
+def measure(function, repeat):
+    """Median seconds of a function over repeats"""
+    times = []
+
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started_at)
+
+    return statistics.median(times)
+
+
+def host(i):
+    """A password based host"""
+    return Host(
+        str(i),
+        f"host-{i}",
+        "ssh",
+        f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+        22,
+        "root",
+        "secret",
+        "",
+        ["web" if i % 2 else "db", f"zone-{i % 10}"],
+        None,
+        None,
+    )
+
+
+def recipe(i):
+    """A one task recipe"""
+    return Recipe(str(i), f"recipe-{i}", RECIPE, [], ["ping"], None, None)
+
+
+def bench_db(sizes, repeat):
+    """Database inserts, lookups and listings at growing table sizes"""
+    results = {}
+
+    for size in sizes:
+        path = tempfile.mkdtemp(prefix="flook-bench-")
+
+        try:
+            database = Database()
+            database.connect(f"{path}/flook.db")
+            database.migrate()
+
+            started_at = time.perf_counter()
+            database.insert_hosts(host(i) for i in range(size))
+            results[f"db.insert_hosts[{size}]"] = time.perf_counter() - started_at
+
+            started_at = time.perf_counter()
+            for i in range(size, size + SAMPLE):
+                database.insert_host(host(i))
+            results[f"db.insert_host[{size}]"] = (
+                time.perf_counter() - started_at
+            ) / SAMPLE
+
+            names = [f"host-{random.randrange(size)}" for _ in range(SAMPLE)]
+            started_at = time.perf_counter()
+            for name in names:
+                database.get_host(name)
+            results[f"db.get_host[{size}]"] = (
+                time.perf_counter() - started_at
+            ) / SAMPLE
+
+            results[f"db.list_hosts[{size}]"] = measure(database.list_hosts, repeat)
+            results[f"db.list_hosts_tag[{size}]"] = measure(
+                lambda: database.list_hosts("zone-1"), repeat
+            )
+
+            for i in range(size):
+                database.insert_recipe(recipe(i))
+
+            results[f"db.list_recipes[{size}]"] = measure(database.list_recipes, repeat)
+        finally:
+            shutil.rmtree(path)
+
+    return results
+
+
+def bench_build(sizes, repeat):
+    """Playbook builds at growing inventory sizes"""
+    results = {}
+    item = Recipe("1", "ping", RECIPE, [], [], None, None)
+
+    for size in sizes:
+        fleet = hosts(size, 10)
+        results[f"build.playbook[{size}]"] = statistics.median(
+            [build(fleet, item) for _ in range(repeat)]
+        )
+
+    return results
+
+
+def bench_output(sizes, repeat):
+    """Table and JSON rendering of host rows"""
+    results = {}
+    output = Output()
+
+    for size in sizes:
+        rows = [
+            {
+                "ID": str(i),
+                "Name": f"host-{i}",
+                "IP": "10.0.0.1",
+                "Connection": "SSH",
+                "Tags": "web, zone-1",
+                "Created at": "2023-01-01 00:00:00",
+                "Updated at": "2023-01-01 00:00:00",
+            }
+            for i in range(size)
+        ]
+
+        for name, typ in (("table", Output.DEFAULT), ("json", Output.JSON)):
+            results[f"output.{name}[{size}]"] = measure(
+                lambda: output.write(iter(rows), typ, io.StringIO()), repeat
+            )
+
+    return results
+
+
+def bench_cli(sizes, repeat):
+    """Cold start of each subcommand, from a new interpreter"""
+    results = {}
+    home = tempfile.mkdtemp(prefix="flook-bench-")
+    env = dict(os.environ, HOME=home, FLOOK_SOCKET=f"{home}/none.sock")
+
+    def flook(args):
+        subprocess.run(
+            [sys.executable, "-m", "flook.cli"] + args,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    try:
+        flook(["config", "init"])
+
+        database = Database()
+        database.connect(f"{home}/flook.db")
+        database.insert_hosts(host(i) for i in range(10))
+
+        for args in COMMANDS:
+            results["cli.{}".format("_".join(args))] = measure(
+                lambda: flook(args), repeat
+            )
+    finally:
+        shutil.rmtree(home)
+
+    return results
+
+
+SUITES = {
+    "db": bench_db,
+    "build": bench_build,
+    "output": bench_output,
+    "cli": bench_cli,
+}
+
+
+def run(args):
+    """Run the benchmarks and write the results"""
+    results = {}
+
+    for name in args.only or SUITES.keys():
+        started_at = time.perf_counter()
+        results.update(SUITES[name](args.sizes, args.repeat))
+        print(f"{name:>8} done in {time.perf_counter() - started_at:.1f}s")
+
+    data = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "createdAt": datetime.utcnow().isoformat(),
+        },
+        "results": results,
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+    for key, value in sorted(results.items()):
+        print(f"{key:<32} {value * 1000:>12.3f} ms")
+
+    return 0
+
+
+def compare(args):
+    """Compare results against a baseline, fail on regressions"""
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+
+    with open(args.results) as f:
+        results = json.load(f)["results"]
+
+    regressions = 0
+
+    print(f"{'benchmark':<32} {'baseline':>12} {'current':>12} {'change':>8}")
+
+    for key in sorted(set(baseline.keys()) & set(results.keys())):
+        change = (results[key] - baseline[key]) * 100 / baseline[key]
+        flag = ""
+
+        if change > args.threshold:
+            flag = " REGRESSION"
+            regressions += 1
+
+        print(
+            f"{key:<32} {baseline[key] * 1000:>9.3f} ms {results[key] * 1000:>9.3f} ms {change:>+7.1f}%{flag}"
+        )
+
+    print(f"\n{regressions} regressions above {args.threshold}%")
+
+    return 1 if regressions > 0 else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_run = commands.add_parser("run", help="Run the benchmarks")
+    parser_run.add_argument(
+        "--sizes", nargs="+", type=int, default=[1000, 10000, 100000]
+    )
+    parser_run.add_argument("--repeat", type=int, default=5)
+    parser_run.add_argument("--only", nargs="+", choices=sorted(SUITES.keys()))
+    parser_run.add_argument("-o", "--output", default="benchmarks/results.json")
+    parser_run.set_defaults(handler=run)
+
+    parser_compare = commands.add_parser("compare", help="Compare to a baseline")
+    parser_compare.add_argument("baseline")
+    parser_compare.add_argument("results")
+    parser_compare.add_argument(
+        "--threshold", type=float, default=20, help="Allowed slowdown in percent"
+    )
+    parser_compare.set_defaults(handler=compare)
+
+    args = parser.parse_args(argv)
+
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,21 +20,64 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import uuid
 import click
-import logging, json, sys
 
-from flook import __version__
 from flook.model.host import Host
-from flook.command.hosts import Hosts
-from flook.command.configs import Configs
-from flook.command.recipes import Recipes
 
 
+def version(ctx, param, value):
+    """Print the version, importing package metadata only when asked"""
+    if not value or ctx.resilient_parsing:
+        return
+
+    from flook import __version__
+
+    click.echo(f"{ctx.info_name}, version {__version__}")
+    ctx.exit()
+
+
+# Command modules are imported inside each command, so a command only loads
+# what it needs (e.g. ansible_runner only for recipe runs)
 @click.group(help="🐺 A Lightweight and Flexible Ansible Command Line Tool")
-@click.version_option(version=__version__, help="Show the current version")
-def main():
-    pass
+@click.option(
+    "--version",
+    is_flag=True,
+    expose_value=False,
+    is_eager=True,
+    callback=version,
+    help="Show the current version",
+)
+@click.option(
+    "--profile",
+    "profile",
+    type=click.STRING,
+    default="",
+    help="Profile the command into a cProfile .prof file or, for any other extension, collapsed stacks",
+)
+@click.option(
+    "--timings",
+    "timings",
+    is_flag=True,
+    default=False,
+    help="Print the wall and CPU time of each phase of the command, parallel shards add up",
+)
+@click.pass_context
+def main(ctx, profile, timings):
+    if profile != "":
+        from flook.module.profiler import Profiler
+
+        profiler = Profiler(profile)
+        profiler.start()
+        ctx.call_on_close(profiler.stop)
+
+    if timings:
+        from flook.module.phases import Phases
+
+        Phases.reset()
+        started = Phases.clock()
+        ctx.call_on_close(
+            lambda: Phases.report(click.get_text_stream("stderr"), started)
+        )
 
 
 # Hosts command
@@ -47,10 +90,25 @@ def host():
 @host.command(help="List hosts")
 @click.option("-t", "--tag", "tag", type=click.STRING, default="", help="Host tag")
 @click.option(
-    "-o", "--output", "output", type=click.STRING, default="", help="Output format"
+    "-s",
+    "--select",
+    "select",
+    type=click.STRING,
+    default="",
+    help='Hosts selector e.g. "tag:web & !tag:canary | name:db-* | ip:10.0.0.0/8"',
 )
-def list(tag, output):
-    return Hosts().init().list(tag, output)
+@click.option(
+    "-o",
+    "--output",
+    "output",
+    type=click.STRING,
+    default="",
+    help="Output format (table, json, jsonl, csv or yaml)",
+)
+def list(tag, select, output):
+    from flook.command.hosts import Hosts
+
+    return Hosts().init().list(tag, output, select)
 
 
 # Add host sub command
@@ -107,6 +165,9 @@ def list(tag, output):
 @click.option("-t", "--tags", "tags", type=click.STRING, default="", help="Host tags")
 @click.option("-f", "--force", "force", is_flag=True, default=False, help="Force add")
 def add(name, connection, ip, port, user, password, ssh_private_key_file, tags, force):
+    import uuid
+    from flook.command.hosts import Hosts
+
     host = Host(
         str(uuid.uuid4()),
         name,
@@ -124,13 +185,35 @@ def add(name, connection, ip, port, user, password, ssh_private_key_file, tags,
     return Hosts().init().add(host, force)
 
 
+# Import hosts sub command
+@host.command(
+    name="import",
+    help="Import hosts from a CSV, JSON, JSON lines, YAML or Ansible inventory file",
+)
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "-f", "--force", "force", is_flag=True, default=False, help="Update existing hosts"
+)
+def import_hosts(path, force):
+    from flook.command.hosts import Hosts
+
+    return Hosts().init().import_hosts(path, force)
+
+
 # Get host sub command
 @host.command(help="Get a host")
 @click.argument("name")
 @click.option(
-    "-o", "--output", "output", type=click.STRING, default="", help="Output format"
+    "-o",
+    "--output",
+    "output",
+    type=click.STRING,
+    default="",
+    help="Output format (table, json, jsonl, csv or yaml)",
 )
 def get(name, output):
+    from flook.command.hosts import Hosts
+
     return Hosts().init().get(name, output)
 
 
@@ -138,6 +221,8 @@ def get(name, output):
 @host.command(help="SSH to a host")
 @click.argument("name")
 def ssh(name):
+    from flook.command.hosts import Hosts
+
     return Hosts().init().ssh(name)
 
 
@@ -145,6 +230,8 @@ def ssh(name):
 @host.command(help="Delete a host")
 @click.argument("name")
 def delete(name):
+    from flook.command.hosts import Hosts
+
     return Hosts().init().delete(name)
 
 
@@ -168,6 +255,8 @@ def recipe():
 @click.option("-t", "--tags", "tags", type=click.STRING, default="", help="Recipe tags")
 @click.option("-f", "--force", "force", is_flag=True, default=False, help="Force add")
 def add(name, path, tags, force):
+    from flook.command.recipes import Recipes
+
     return (
         Recipes()
         .init()
@@ -179,9 +268,16 @@ def add(name, path, tags, force):
 @recipe.command(help="List all recipes")
 @click.option("-t", "--tag", "tag", type=click.STRING, default="", help="Recipe tag")
 @click.option(
-    "-o", "--output", "output", type=click.STRING, default="", help="Output format"
+    "-o",
+    "--output",
+    "output",
+    type=click.STRING,
+    default="",
+    help="Output format (table, json, jsonl, csv or yaml)",
 )
 def list(tag, output):
+    from flook.command.recipes import Recipes
+
     return Recipes().init().list(tag, output)
 
 
@@ -189,9 +285,16 @@ def list(tag, output):
 @recipe.command(help="Get a recipe")
 @click.argument("name")
 @click.option(
-    "-o", "--output", "output", type=click.STRING, default="", help="Output format"
+    "-o",
+    "--output",
+    "output",
+    type=click.STRING,
+    default="",
+    help="Output format (table, json, jsonl, csv or yaml)",
 )
 def get(name, output):
+    from flook.command.recipes import Recipes
+
     return Recipes().init().get(name, output)
 
 
@@ -199,6 +302,8 @@ def get(name, output):
 @recipe.command(help="Delete a recipe")
 @click.argument("name")
 def delete(name):
+    from flook.command.recipes import Recipes
+
     return Recipes().init().delete(name)
 
 
@@ -216,13 +321,410 @@ def delete(name):
 @click.option(
     "-t",
     "--tag",
-    "tag",
+    "tags",
+    type=click.STRING,
+    multiple=True,
+    help="Hosts tag to run recipe towards, can be repeated",
+)
+@click.option(
+    "-s",
+    "--select",
+    "select",
+    type=click.STRING,
+    default="",
+    help='Hosts selector e.g. "tag:web & !tag:canary | name:db-* | ip:10.0.0.0/8"',
+)
+@click.option(
+    "-p",
+    "--parallel",
+    "parallel",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of shards to split hosts into and run in parallel",
+)
+@click.option(
+    "--serial",
+    "serial",
     type=click.STRING,
     default="",
-    help="Hosts tag to run recipe towards",
+    help="Roll out in batches of this many hosts or percentage of hosts e.g. 10 or 25%",
+)
+@click.option(
+    "--canary",
+    "canary",
+    type=click.STRING,
+    default="",
+    help="Size of a first batch to run on its own, a count or a percentage",
+)
+@click.option(
+    "--max-fail",
+    "max_fail",
+    type=click.FloatRange(min=0, max=100),
+    default=0,
+    help="Stop the rollout once this percentage of hosts failed",
+)
+@click.option(
+    "--changed-only",
+    "changed_only",
+    is_flag=True,
+    default=False,
+    help="Only run on hosts whose recipe, templates, config or group vars changed or whose last run failed",
 )
-def run(name, host, tag):
-    return Recipes().init().run(name, host, tag)
+@click.option(
+    "--max-age",
+    "max_age",
+    type=click.STRING,
+    default="",
+    help="With --changed-only, also run on hosts converged longer ago than this e.g. 3600, 12h or 7d",
+)
+@click.option(
+    "-o",
+    "--output",
+    "output",
+    type=click.STRING,
+    default="",
+    help="Output format (table, json, jsonl, csv or yaml)",
+)
+@click.option(
+    "-e",
+    "--events",
+    "events",
+    type=click.Choice(["ndjson", "progress"]),
+    default=None,
+    help="Stream per host events as NDJSON or a compact progress view",
+)
+@click.option(
+    "-d",
+    "--detach",
+    "detach",
+    is_flag=True,
+    default=False,
+    help="Run in the background and print the run id",
+)
+@click.option("--run-id", "run_id", type=click.STRING, default="", hidden=True)
+def run(
+    name,
+    host,
+    tags,
+    select,
+    parallel,
+    serial,
+    canary,
+    max_fail,
+    changed_only,
+    max_age,
+    output,
+    events,
+    detach,
+    run_id,
+):
+    from flook.command.recipes import Recipes
+
+    return (
+        Recipes()
+        .init()
+        .run(
+            name,
+            host,
+            tags,
+            parallel,
+            output,
+            events or "",
+            detach,
+            run_id,
+            select,
+            {"serial": serial, "canary": canary, "max_fail": max_fail},
+            {"changed_only": changed_only, "max_age": max_age},
+        )
+    )
+
+
+# Enqueue recipe sub command
+@recipe.command(help="Queue a recipe run for the workers")
+@click.argument("name")
+@click.option(
+    "-h",
+    "--host",
+    "host",
+    type=click.STRING,
+    default="",
+    help="The name of the host to run recipe towards",
+)
+@click.option(
+    "-t",
+    "--tag",
+    "tags",
+    type=click.STRING,
+    multiple=True,
+    help="Hosts tag to run recipe towards, can be repeated",
+)
+@click.option(
+    "-s",
+    "--select",
+    "select",
+    type=click.STRING,
+    default="",
+    help='Hosts selector e.g. "tag:web & !tag:canary | name:db-* | ip:10.0.0.0/8"',
+)
+@click.option(
+    "-p",
+    "--parallel",
+    "parallel",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of shards to split hosts into and run in parallel",
+)
+@click.option(
+    "--serial",
+    "serial",
+    type=click.STRING,
+    default="",
+    help="Roll out in batches of this many hosts or percentage of hosts e.g. 10 or 25%",
+)
+@click.option(
+    "--canary",
+    "canary",
+    type=click.STRING,
+    default="",
+    help="Size of a first batch to run on its own, a count or a percentage",
+)
+@click.option(
+    "--max-fail",
+    "max_fail",
+    type=click.FloatRange(min=0, max=100),
+    default=0,
+    help="Stop the rollout once this percentage of hosts failed",
+)
+@click.option(
+    "--changed-only",
+    "changed_only",
+    is_flag=True,
+    default=False,
+    help="Only run on hosts whose recipe, templates, config or group vars changed or whose last run failed",
+)
+@click.option(
+    "--max-age",
+    "max_age",
+    type=click.STRING,
+    default="",
+    help="With --changed-only, also run on hosts converged longer ago than this e.g. 3600, 12h or 7d",
+)
+def enqueue(
+    name, host, tags, select, parallel, serial, canary, max_fail, changed_only, max_age
+):
+    from flook.command.recipes import Recipes
+
+    return (
+        Recipes()
+        .init()
+        .enqueue(
+            name,
+            host,
+            tags,
+            parallel,
+            select,
+            {"serial": serial, "canary": canary, "max_fail": max_fail},
+            {"changed_only": changed_only, "max_age": max_age},
+        )
+    )
+
+
+# Tasks command
+@click.group(help="Manage tasks")
+def task():
+    pass
+
+
+# List tasks sub command
+@task.command(help="List tasks")
+@click.option(
+    "-s", "--status", "status", type=click.STRING, default="", help="Task status"
+)
+@click.option(
+    "-l", "--limit", "limit", type=click.INT, default=50, help="Number of tasks to list"
+)
+@click.option(
+    "-o",
+    "--output",
+    "output",
+    type=click.STRING,
+    default="",
+    help="Output format (table, json, jsonl, csv or yaml)",
+)
+def list(status, limit, output):
+    from flook.command.tasks import Tasks
+
+    return Tasks().init().list(status, limit, output)
+
+
+# Get task sub command
+@task.command(help="Get a task")
+@click.argument("id")
+@click.option(
+    "-o",
+    "--output",
+    "output",
+    type=click.STRING,
+    default="",
+    help="Output format (table, json, jsonl, csv or yaml)",
+)
+def get(id, output):
+    from flook.command.tasks import Tasks
+
+    return Tasks().init().get(id, output)
+
+
+# Stats task sub command
+@task.command(help="Get the slowest tasks and hosts of a run")
+@click.argument("id")
+@click.option(
+    "-n",
+    "--top",
+    "top",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Number of tasks and hosts to list",
+)
+@click.option(
+    "-r",
+    "--runs",
+    "runs",
+    type=click.IntRange(min=0),
+    default=5,
+    help="Number of former runs of the recipe to compare against",
+)
+@click.option(
+    "-o",
+    "--output",
+    "output",
+    type=click.STRING,
+    default="",
+    help="Output format (table, json, jsonl, csv or yaml)",
+)
+def stats(id, top, runs, output):
+    from flook.command.tasks import Tasks
+
+    return Tasks().init().stats(id, top, runs, output)
+
+
+# Groups command
+@click.group(help="Manage host groups, one per host tag")
+def group():
+    pass
+
+
+# Set group vars sub command
+@group.command(help="Set the vars of a host tag group")
+@click.argument("name")
+@click.option(
+    "-v",
+    "--var",
+    "vars",
+    type=click.STRING,
+    multiple=True,
+    help="A var as key=value, values are parsed as JSON when valid",
+)
+@click.option(
+    "-u", "--unset", "unset", type=click.STRING, multiple=True, help="A var to remove"
+)
+def set(name, vars, unset):
+    from flook.command.groups import Groups
+
+    return Groups().init().set(name, vars, unset)
+
+
+# Get group sub command
+@group.command(help="Get a group")
+@click.argument("name")
+@click.option(
+    "-o",
+    "--output",
+    "output",
+    type=click.STRING,
+    default="",
+    help="Output format (table, json, jsonl, csv or yaml)",
+)
+def get(name, output):
+    from flook.command.groups import Groups
+
+    return Groups().init().get(name, output)
+
+
+# List groups sub command
+@group.command(help="List groups")
+@click.option(
+    "-o",
+    "--output",
+    "output",
+    type=click.STRING,
+    default="",
+    help="Output format (table, json, jsonl, csv or yaml)",
+)
+def list(output):
+    from flook.command.groups import Groups
+
+    return Groups().init().list(output)
+
+
+# Delete group sub command
+@group.command(help="Delete a group")
+@click.argument("name")
+def delete(name):
+    from flook.command.groups import Groups
+
+    return Groups().init().delete(name)
+
+
+# Facts command
+@click.group(help="Manage hosts facts")
+def facts():
+    pass
+
+
+# Refresh facts sub command
+@facts.command(help="Gather hosts facts into the fact cache")
+@click.option(
+    "-h", "--host", "host", type=click.STRING, default="", help="The host name"
+)
+@click.option("-t", "--tag", "tag", type=click.STRING, default="", help="Hosts tag")
+@click.option(
+    "-p",
+    "--parallel",
+    "parallel",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of shards to split hosts into and run in parallel",
+)
+@click.option(
+    "-o",
+    "--output",
+    "output",
+    type=click.STRING,
+    default="",
+    help="Output format (table, json, jsonl, csv or yaml)",
+)
+def refresh(host, tag, parallel, output):
+    from flook.command.facts import Facts
+
+    return Facts().init().refresh(host, tag, parallel, output)
+
+
+# Get facts sub command
+@facts.command(help="Get the cached hosts facts")
+@click.argument("name", required=False, default="")
+@click.option("-t", "--tag", "tag", type=click.STRING, default="", help="Hosts tag")
+@click.option(
+    "-o",
+    "--output",
+    "output",
+    type=click.STRING,
+    default="",
+    help="Output format (table, json, jsonl, csv or yaml)",
+)
+def get(name, tag, output):
+    from flook.command.facts import Facts
+
+    return Facts().init().get(name, tag, output)
 
 
 # Manage configs command
@@ -234,25 +736,126 @@ def config():
 # Init configs sub command
 @config.command(help="Init configurations")
 def init():
+    from flook.command.configs import Configs
+
     return Configs().init()
 
 
 # Edit configs sub command
 @config.command(help="Edit configurations")
 def edit():
+    from flook.command.configs import Configs
+
     return Configs().edit()
 
 
 # Show configs sub command
 @config.command(help="Show configurations")
 def dump():
+    from flook.command.configs import Configs
+
     return Configs().dump()
 
 
+# Serve command
+@click.command(help="Serve commands over a unix socket, skipping the cold start")
+@click.option(
+    "-s",
+    "--socket",
+    "path",
+    type=click.STRING,
+    default="",
+    help="The socket path, FLOOK_SOCKET or ~/.flook.sock by default",
+)
+def serve(path):
+    from flook.module.client import Client
+    from flook.module.server import Server
+
+    return Server(path or Client.socket_path()).run()
+
+
+# Metrics command
+@click.command(help="Print the OpenMetrics text of runs, hosts and the queue")
+@click.option(
+    "-f",
+    "--file",
+    "path",
+    type=click.STRING,
+    default="",
+    help="Write the metrics to a file for the node exporter textfile collector",
+)
+@click.option(
+    "-l",
+    "--listen",
+    "listen",
+    type=click.STRING,
+    default="",
+    help="Serve the metrics over HTTP on an address e.g. 127.0.0.1:9464",
+)
+def metrics(path, listen):
+    from flook.command.metrics import Metrics
+
+    if listen != "":
+        return Metrics().init().serve(listen)
+
+    return Metrics().init().get(path)
+
+
+# Worker command
+@click.command(help="Run queued recipe runs")
+@click.option(
+    "-c",
+    "--concurrency",
+    "concurrency",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of runs to execute at once",
+)
+@click.option(
+    "-l",
+    "--limit",
+    "limits",
+    type=click.STRING,
+    multiple=True,
+    help="Most concurrent runs touching hosts of a tag e.g. tag:db=2, can be repeated",
+)
+@click.option(
+    "--drain",
+    "drain",
+    is_flag=True,
+    default=False,
+    help="Exit once the queue is empty",
+)
+@click.option(
+    "--poll",
+    "poll",
+    type=click.FloatRange(min=0.1),
+    default=1.0,
+    help="Seconds to wait between queue checks",
+)
+@click.option(
+    "--lease",
+    "lease",
+    type=click.IntRange(min=1),
+    default=60,
+    help="Seconds a claimed run is kept without the worker renewing it, then it is queued again or failed",
+)
+def worker(concurrency, limits, drain, poll, lease):
+    from flook.command.workers import Workers
+
+    return Workers().init().run(concurrency, limits, drain, poll, lease)
+
+
 # Register Commands
 main.add_command(host)
 main.add_command(recipe)
+main.add_command(task)
+main.add_command(group)
+main.add_command(facts)
 main.add_command(config)
+main.add_command(serve)
+main.add_command(worker)
+main.add_command(metrics)
 
 
 if __name__ == "__main__":
@@ -24,8 +24,12 @@ import os
 import yaml
 import click
 
+from flook.module.ssh import Ssh
+from flook.module.playbook import Playbook
+from flook.module.fact_cache import FactCache
 from flook.module.logger import Logger
 from flook.module.output import Output
+from flook.module.exporter import Exporter
 from flook.module.database import Database
 from flook.module.file_system import FileSystem
 
@@ -47,11 +51,20 @@ class Configs:
             raise click.ClickException("User home path is not defined")
 
         base = {
-            "database": {"type": "file", "path": "{}/flook.db".format(self._home)},
-            "cache": {"path": "/tmp"},
+            "database": dict(
+                {"type": "file", "path": "{}/flook.db".format(self._home)},
+                **Database.PRAGMAS,
+            ),
+            "cache": {
+                "path": "/tmp",
+                "bundle_max_age": Playbook.BUNDLE_MAX_AGE,
+            },
+            "ssh": dict(Ssh.DEFAULTS),
+            "facts": dict(FactCache.DEFAULTS),
+            "metrics": dict(Exporter.DEFAULTS),
         }
 
-        self.database.connect("{}/flook.db".format(self._home))
+        self.database.connect(base["database"]["path"], base["database"])
         self.database.migrate()
 
         self.file_system.write_file(
@@ -0,0 +1,161 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import uuid
+import click
+
+from flook.model.recipe import Recipe
+from flook.module.logger import Logger
+from flook.module.output import Output
+from flook.module.config import Config
+from flook.module.compiler import Compiler
+from flook.module.database import Database
+from flook.module.fact_cache import FactCache
+
+
+class Facts:
+    """Facts Class"""
+
+    def __init__(self):
+        self.output = Output()
+        self.database = Database()
+        self.config = Config()
+        self.compiler = Compiler()
+        self.logger = Logger().get_logger(__name__)
+
+    def init(self):
+        """Init database and configs"""
+        self._configs = self.config.load()
+        self.database.connect(
+            self._configs["database"]["path"], self._configs["database"]
+        )
+        self.database.migrate()
+        self._cache = FactCache(
+            "{}/facts".format(self._configs["cache"]["path"].rstrip("/")),
+            self._configs.get("facts"),
+        )
+        return self
+
+    def refresh(self, host_name, tag, parallel, output):
+        """Gather facts of hosts into the fact cache"""
+        from flook.module.executor import Executor
+
+        hosts = self._hosts(host_name, tag)
+        data = {"gather_facts": False, "tasks": [{"name": "gather facts", "setup": {}}]}
+
+        recipe = Recipe(
+            "facts",
+            "facts",
+            "",
+            [],
+            [],
+            None,
+            None,
+            self.compiler.compile(data),
+        )
+
+        # Gather from as many hosts at once as the facts forks allow
+        configs = dict(self._configs)
+        configs["ansible"] = dict(configs.get("ansible", {}))
+        configs["ansible"]["envvars"] = dict(
+            configs["ansible"].get("envvars", {}),
+            ANSIBLE_FORKS=self._cache.configs["forks"],
+        )
+
+        status, results = Executor(
+            str(uuid.uuid4()),
+            self._configs["cache"]["path"].rstrip("/"),
+            hosts,
+            recipe,
+            parallel,
+            configs,
+        ).run(None, True)
+
+        data = (
+            {
+                "Host": name,
+                "Status": result["status"].upper(),
+                "Duration": result["duration"],
+            }
+            for name, result in results.items()
+        )
+
+        self.output.write(data, Output.format(output))
+
+        if not status:
+            raise click.ClickException(f"Facts gathering failed on some hosts")
+
+    def get(self, host_name, tag, output):
+        """Get the cached facts of hosts"""
+        typ = Output.format(output)
+        cached = (
+            (host.name, self._cache.get(host.name))
+            for host in self._hosts(host_name, tag)
+        )
+        data = (self._row(name, item, typ) for name, item in cached if item is not None)
+
+        if self.output.write(data, typ) == 0:
+            raise click.ClickException(f"No cached facts found!")
+
+    def _hosts(self, host_name, tag):
+        """Select hosts by name or tag, all hosts if neither is set"""
+        if host_name != "":
+            host = self.database.get_host(host_name)
+
+            if host is None:
+                raise click.ClickException(f"Host with name {host_name} not found")
+
+            return [host]
+
+        hosts = self.database.list_hosts(tag)
+
+        if len(hosts) == 0:
+            raise click.ClickException(f"No hosts matching!")
+
+        return hosts
+
+    def _row(self, name, item, typ):
+        """Get the output row of a host cached facts"""
+        facts, gathered_at, expired = item
+
+        if typ != Output.DEFAULT:
+            return {
+                "Host": name,
+                "Gathered at": gathered_at,
+                "Expired": expired,
+                "Facts": facts,
+            }
+
+        return {
+            "Host": name,
+            "Distribution": "{} {}".format(
+                facts.get("ansible_distribution", "-"),
+                facts.get("ansible_distribution_version", ""),
+            ).strip(),
+            "Kernel": facts.get("ansible_kernel", "-"),
+            "Architecture": facts.get("ansible_architecture", "-"),
+            "CPUs": facts.get("ansible_processor_vcpus", "-"),
+            "Memory (MB)": facts.get("ansible_memtotal_mb", "-"),
+            "Gathered at": gathered_at,
+            "Expired": "YES" if expired else "NO",
+        }
@@ -0,0 +1,113 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+import click
+
+from flook.model.group import Group
+from flook.module.logger import Logger
+from flook.module.output import Output
+from flook.module.config import Config
+from flook.module.database import Database
+
+
+class Groups:
+    """Groups Class"""
+
+    def __init__(self):
+        self.output = Output()
+        self.database = Database()
+        self.config = Config()
+        self.logger = Logger().get_logger(__name__)
+
+    def init(self):
+        """Init database and configs"""
+        self._configs = self.config.load()
+        self.database.connect(
+            self._configs["database"]["path"], self._configs["database"]
+        )
+        self.database.migrate()
+        return self
+
+    def set(self, name, vars, unset):
+        """Set and unset the vars of a group"""
+        group = self.database.get_group(name)
+        data = dict(group.vars) if group is not None else {}
+
+        for item in vars:
+            if "=" not in item:
+                raise click.ClickException(f"Invalid var {item}, expected key=value")
+
+            key, value = item.split("=", 1)
+
+            try:
+                data[key] = json.loads(value)
+            except ValueError:
+                data[key] = value
+
+        for key in unset:
+            data.pop(key, None)
+
+        self.database.save_group(Group(name, data, None, None))
+
+        click.echo(f"Group with name {name} got updated")
+
+    def get(self, name, output):
+        """Get a group"""
+        group = self.database.get_group(name)
+
+        if group is None:
+            raise click.ClickException(f"Group with name {name} not found")
+
+        typ = Output.format(output)
+        self.output.write([self._row(group, typ)], typ)
+
+    def list(self, output):
+        """List groups"""
+        typ = Output.format(output)
+        data = (self._row(group, typ) for group in self.database.list_groups())
+
+        if self.output.write(data, typ) == 0:
+            raise click.ClickException(f"No groups found!")
+
+    def delete(self, name):
+        """Delete a group"""
+        self.database.delete_group(name)
+
+        click.echo(f"Group with name {name} got deleted")
+
+    def _row(self, group, typ):
+        """Get the output row of a group"""
+        return {
+            "Name": group.name,
+            "Vars": (
+                group.vars
+                if typ != Output.DEFAULT
+                else ", ".join(
+                    "{}={}".format(k, json.dumps(v)) for k, v in group.vars.items()
+                )
+                or "-"
+            ),
+            "Created at": group.created_at,
+            "Updated at": group.updated_at,
+        }
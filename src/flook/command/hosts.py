@@ -21,6 +21,7 @@
 # SOFTWARE.
 
 import click
+import sqlite3
 import subprocess
 
 from flook.model.host import Host
@@ -28,6 +29,7 @@ from flook.module.logger import Logger
 from flook.module.output import Output
 from flook.module.config import Config
 from flook.module.database import Database
+from flook.module.inventory import Inventory
 from flook.module.file_system import FileSystem
 
 
@@ -44,12 +46,19 @@ class Hosts:
     def init(self):
         """Init database and configs"""
         self._configs = self.config.load()
-        self.database.connect(self._configs["database"]["path"])
+        self.database.connect(
+            self._configs["database"]["path"], self._configs["database"]
+        )
         self.database.migrate()
         return self
 
     def add(self, host, force):
         """Add a new host"""
+        if not Inventory.valid_name(host.name):
+            raise click.ClickException(
+                f"Invalid host name {host.name}, only letters, digits and _ . : @ - are allowed"
+            )
+
         if force:
             self.database.delete_host(host.name)
 
@@ -60,35 +69,30 @@ class Hosts:
 
         click.echo(f"Host with name {host.name} got created")
 
-    def list(self, tag, output):
-        """List hosts"""
-        data = []
-        hosts = self.database.list_hosts()
-
-        for host in hosts:
-            if tag != "" and tag not in host.tags:
-                continue
-
-            data.append(
-                {
-                    "ID": host.id,
-                    "Name": host.name,
-                    "IP": host.ip,
-                    "Connection": host.connection.upper(),
-                    "Tags": ", ".join(host.tags) if len(host.tags) > 0 else "-",
-                    "Created at": host.created_at,
-                    "Updated at": host.updated_at,
-                }
+    def import_hosts(self, path, force):
+        """Import hosts from an inventory file in one transaction"""
+        try:
+            count = self.database.insert_hosts(Inventory(path).hosts(), force)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        except sqlite3.IntegrityError as e:
+            raise click.ClickException(
+                f"Some hosts exist or are duplicated, use --force to update them ({e})"
             )
 
-        if len(data) == 0:
-            raise click.ClickException(f"No hosts found!")
+        click.echo(f"{count} hosts got imported")
 
-        print(
-            self.output.render(
-                data, Output.JSON if output.lower() == "json" else Output.DEFAULT
-            )
-        )
+    def list(self, tag, output, select=""):
+        """List hosts"""
+        try:
+            hosts = self.database.iter_hosts(tag, select)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        data = (self._row(host) for host in hosts)
+
+        if self.output.write(data, Output.format(output)) == 0:
+            raise click.ClickException(f"No hosts found!")
 
     def get(self, name, output):
         """Get a host"""
@@ -97,23 +101,7 @@ class Hosts:
         if host is None:
             raise click.ClickException(f"Host with name {name} not found")
 
-        data = [
-            {
-                "ID": host.id,
-                "Name": host.name,
-                "IP": host.ip,
-                "Connection": host.connection.upper(),
-                "Tags": ", ".join(host.tags) if len(host.tags) > 0 else "-",
-                "Created at": host.created_at,
-                "Updated at": host.updated_at,
-            }
-        ]
-
-        print(
-            self.output.render(
-                data, Output.JSON if output.lower() == "json" else Output.DEFAULT
-            )
-        )
+        self.output.write([self._row(host)], Output.format(output))
 
     def ssh(self, name):
         """SSH to a host"""
@@ -148,3 +136,15 @@ class Hosts:
         self.database.delete_host(name)
 
         click.echo(f"Host with name {name} got deleted")
+
+    def _row(self, host):
+        """Get the output row of a host"""
+        return {
+            "ID": host.id,
+            "Name": host.name,
+            "IP": host.ip,
+            "Connection": host.connection.upper(),
+            "Tags": ", ".join(host.tags) if len(host.tags) > 0 else "-",
+            "Created at": host.created_at,
+            "Updated at": host.updated_at,
+        }
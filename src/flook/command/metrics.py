@@ -0,0 +1,100 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import click
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from flook.module.logger import Logger
+from flook.module.config import Config
+from flook.module.exporter import Exporter
+from flook.module.database import Database
+
+
+class Metrics:
+    """Metrics Class"""
+
+    def __init__(self):
+        self.database = Database()
+        self.config = Config()
+        self.logger = Logger().get_logger(__name__)
+
+    def init(self):
+        """Init database and configs"""
+        self._configs = self.config.load()
+        self.database.connect(
+            self._configs["database"]["path"], self._configs["database"]
+        )
+        self.database.migrate()
+        return self
+
+    def get(self, path):
+        """Print the metrics or write them to a file"""
+        exporter = Exporter(self.database)
+
+        if path == "":
+            click.echo(exporter.render(), nl=False)
+            return
+
+        exporter.export(path)
+
+    def serve(self, listen):
+        """Serve the metrics over HTTP"""
+        host, _, port = listen.rpartition(":")
+
+        if not port.isdigit():
+            raise click.ClickException(
+                f"Invalid address {listen}, expected [host]:port"
+            )
+
+        exporter = Exporter(self.database)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+
+                body = exporter.render().encode()
+
+                self.send_response(200)
+                self.send_header(
+                    "Content-Type",
+                    "application/openmetrics-text; version=1.0.0; charset=utf-8",
+                )
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        # Scrapes are served one at a time on the thread owning the connection
+        server = HTTPServer((host, int(port)), Handler)
+
+        click.echo(f"Serving metrics on http://{listen}/metrics")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
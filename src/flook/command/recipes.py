@@ -20,16 +20,24 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import sys
 import uuid
-import yaml
+import functools
 import click
+import subprocess
+from datetime import datetime
 
+from flook.model.task import Task
 from flook.model.recipe import Recipe
+from flook.module.events import Events
 from flook.module.logger import Logger
 from flook.module.output import Output
 from flook.module.config import Config
+from flook.module.phases import Phases
+from flook.module.timings import Timings
+from flook.module.exporter import Exporter
+from flook.module.compiler import Compiler
 from flook.module.database import Database
-from flook.module.playbook import Playbook
 from flook.module.file_system import FileSystem
 
 
@@ -40,13 +48,16 @@ class Recipes:
         self.output = Output()
         self.database = Database()
         self.config = Config()
+        self.compiler = Compiler()
         self.file_system = FileSystem()
         self.logger = Logger().get_logger(__name__)
 
     def init(self):
         """Init database and configs"""
         self._configs = self.config.load()
-        self.database.connect(self._configs["database"]["path"])
+        self.database.connect(
+            self._configs["database"]["path"], self._configs["database"]
+        )
         self.database.migrate()
         return self
 
@@ -69,9 +80,9 @@ class Recipes:
                 "{}/recipe.yaml".format(configs["path"])
             )
 
-        data = yaml.load(recipe, Loader=yaml.Loader)
+        data = self.compiler.load(recipe)
 
-        if data and "templates" in data.keys():
+        if "templates" in data.keys():
             for k, v in data["templates"].items():
                 if self.file_system.file_exists("{}/{}".format(configs["path"], v)):
                     templates.append(
@@ -83,7 +94,14 @@ class Recipes:
                     )
 
         recipe = Recipe(
-            str(uuid.uuid4()), name, recipe, templates, configs["tags"], None, None
+            str(uuid.uuid4()),
+            name,
+            recipe,
+            templates,
+            configs["tags"],
+            None,
+            None,
+            self.compiler.compile(data),
         )
 
         self.database.insert_recipe(recipe)
@@ -92,32 +110,11 @@ class Recipes:
 
     def list(self, tag, output):
         """List Recipes"""
-        data = []
-        recipes = self.database.list_recipes()
-
-        for recipe in recipes:
-            if tag != "" and tag not in recipe.tags:
-                continue
-
-            data.append(
-                {
-                    "ID": recipe.id,
-                    "Name": recipe.name,
-                    "Tags": ", ".join(recipe.tags) if len(recipe.tags) > 0 else "-",
-                    "Created at": recipe.created_at,
-                    "Updated at": recipe.updated_at,
-                }
-            )
+        data = (self._row(recipe) for recipe in self.database.iter_recipes(tag))
 
-        if len(data) == 0:
+        if self.output.write(data, Output.format(output)) == 0:
             raise click.ClickException(f"No recipes found!")
 
-        print(
-            self.output.render(
-                data, Output.JSON if output.lower() == "json" else Output.DEFAULT
-            )
-        )
-
     def get(self, name, output):
         """Get Recipe"""
         recipe = self.database.get_recipe(name)
@@ -125,21 +122,7 @@ class Recipes:
         if recipe is None:
             raise click.ClickException(f"Recipe with name {name} not found")
 
-        data = [
-            {
-                "ID": recipe.id,
-                "Name": recipe.name,
-                "Tags": ", ".join(recipe.tags) if len(recipe.tags) > 0 else "-",
-                "Created at": recipe.created_at,
-                "Updated at": recipe.updated_at,
-            }
-        ]
-
-        print(
-            self.output.render(
-                data, Output.JSON if output.lower() == "json" else Output.DEFAULT
-            )
-        )
+        self.output.write([self._row(recipe)], Output.format(output))
 
     def delete(self, name):
         """Delete a Recipe"""
@@ -147,10 +130,258 @@ class Recipes:
 
         click.echo(f"Recipe with name {name} got deleted")
 
-    def run(self, name, host_name, tag):
-        """Run a Recipe towards a host"""
+    def run(
+        self,
+        name,
+        host_name,
+        tags,
+        parallel=1,
+        output="",
+        events="",
+        detach=False,
+        run_id="",
+        select="",
+        rollout=None,
+        converge=None,
+    ):
+        """Run a Recipe towards a host, hosts of tags and hosts matching a selector"""
+        from flook.module.rollout import Rollout
+        from flook.module.executor import Executor
+        from flook.module.playbook import Playbook
+
+        rollout = rollout or {}
+        converge = converge or {}
+        run_id = run_id if run_id != "" else str(uuid.uuid4())
+        payload = {
+            "recipe": name,
+            "host": host_name,
+            "tags": list(tags),
+            "select": select,
+            "parallel": parallel,
+            "rollout": rollout,
+            "converge": converge,
+        }
+        started_at = datetime.utcnow()
+
+        try:
+            max_age = Recipes.seconds(converge.get("max_age", ""))
+
+            with Phases.measure("select"):
+                recipe, hosts = self._select(name, host_name, tags, select, rollout)
+        except click.ClickException as e:
+            # A detached run got saved as pending by its parent, record why
+            # it never started instead of leaving it pending
+            if self.database.get_task(run_id) is not None:
+                self.database.save_task(
+                    Task(
+                        run_id,
+                        name,
+                        "failed",
+                        payload,
+                        self._summary(started_at, {}, e.message),
+                        None,
+                        None,
+                    )
+                )
+            raise
+
+        if detach:
+            self.database.save_task(
+                Task(run_id, name, "pending", payload, {}, None, None)
+            )
+            try:
+                return self._detach(payload, run_id)
+            except OSError as e:
+                self.database.save_task(
+                    Task(
+                        run_id,
+                        name,
+                        "failed",
+                        payload,
+                        self._summary(started_at, {}, str(e)),
+                        None,
+                        None,
+                    )
+                )
+                raise click.ClickException(f"Failed to start the run: {e}")
+
+        groups = {group.name: group.vars for group in self.database.list_groups()}
+        content_hash = Playbook.content_hash(recipe)
+        hashes = {
+            host.id: Playbook.state_hash(content_hash, host, groups) for host in hosts
+        }
+        converged = []
+
+        if converge.get("changed_only", False):
+            hosts, converged = self._changed(recipe, hosts, hashes, max_age)
+
+        if len(hosts) == 0:
+            self.database.save_task(
+                Task(
+                    run_id,
+                    name,
+                    "successful",
+                    payload,
+                    dict(self._summary(started_at, {}), converged=len(converged)),
+                    None,
+                    None,
+                )
+            )
+            click.echo(f"All {len(converged)} hosts converged, nothing to run")
+            return
+
+        if len(converged) > 0:
+            click.echo(f"Skipping {len(converged)} converged hosts", err=True)
+
+        self.database.save_task(Task(run_id, name, "running", payload, {}, None, None))
+
+        if rollout.get("serial", "") != "":
+            executor = Rollout(
+                run_id,
+                self._configs["cache"]["path"].rstrip("/"),
+                hosts,
+                recipe,
+                rollout["serial"],
+                rollout.get("canary", ""),
+                rollout.get("max_fail", 0),
+                parallel,
+                self._configs,
+                groups,
+            )
+        else:
+            executor = Executor(
+                run_id,
+                self._configs["cache"]["path"].rstrip("/"),
+                hosts,
+                recipe,
+                parallel,
+                self._configs,
+                groups,
+            )
+
+        stream = Events(events) if events != "" else None
+        timings = Timings(
+            stream.handle if stream else None,
+            functools.partial(self.database.insert_task_timings, run_id),
+        )
+        phases = Phases.records()
+        started_at = datetime.utcnow()
+
+        try:
+            status, results = executor.run(timings.handle, stream is not None)
+        except BaseException as e:
+            self.database.save_task(
+                Task(
+                    run_id,
+                    name,
+                    "failed",
+                    payload,
+                    self._summary(
+                        started_at,
+                        {},
+                        str(e) or type(e).__name__,
+                        Phases.since(phases),
+                    ),
+                    None,
+                    None,
+                )
+            )
+            self._export()
+            raise
+        finally:
+            # Rows of a failed run are kept too, earlier batches are written
+            timings.flush()
+
+            if stream is not None:
+                stream.close()
+
+        self.database.insert_task_hosts(run_id, results)
+        # Hosts a rollout never got to keep their former state
+        self.database.save_host_states(
+            recipe.id,
+            run_id,
+            [
+                (host.id, hashes[host.id], results[host.name]["status"])
+                for host in hosts
+                if results.get(host.name, {}).get("status")
+                in ("ok", "failed", "unreachable")
+            ],
+        )
+        self.database.save_task(
+            Task(
+                run_id,
+                name,
+                "successful" if status else "failed",
+                payload,
+                dict(
+                    self._summary(started_at, results, "", Phases.since(phases)),
+                    converged=len(converged),
+                ),
+                None,
+                None,
+            )
+        )
+        self._export()
+
+        if events == Events.NDJSON:
+            for host_name, result in results.items():
+                stream.summary(host_name, result)
+        else:
+            data = (
+                {
+                    "Host": host_name,
+                    "Status": result["status"].upper(),
+                    "Ok": result["ok"],
+                    "Changed": result["changed"],
+                    "Failed": result["failed"],
+                    "Unreachable": result["unreachable"],
+                    "Skipped": result["skipped"],
+                }
+                for host_name, result in results.items()
+            )
+
+            self.output.write(data, Output.format(output))
+
+        if not status:
+            raise click.ClickException(f"Recipe {name} failed on some hosts")
+
+    def enqueue(
+        self, name, host_name, tags, parallel=1, select="", rollout=None, converge=None
+    ):
+        """Queue a Recipe run for the workers"""
+        rollout = rollout or {}
+        converge = converge or {}
+        run_id = str(uuid.uuid4())
+        payload = {
+            "recipe": name,
+            "host": host_name,
+            "tags": list(tags),
+            "select": select,
+            "parallel": parallel,
+            "rollout": rollout,
+            "converge": converge,
+        }
+
+        Recipes.seconds(converge.get("max_age", ""))
+
+        with Phases.measure("select"):
+            recipe, hosts = self._select(name, host_name, tags, select, rollout)
+
+        # Concurrency limits apply to the tags of the hosts the run touches
+        self.database.enqueue_task(
+            Task(run_id, name, "queued", payload, {}, None, None),
+            sorted({tag for host in hosts for tag in host.tags}),
+        )
+        self._export()
+
+        click.echo(run_id)
+
+    def _select(self, name, host_name, tags, select, rollout):
+        """Get the recipe and the hosts of a run"""
+        from flook.module.rollout import Rollout
+
         hosts = []
-        found = ""
+        found = set()
         recipe = self.database.get_recipe(name)
 
         if recipe is None:
@@ -160,25 +391,206 @@ class Recipes:
             host = self.database.get_host(host_name)
 
             if host is None:
-                raise click.ClickException(f"Host with name {name} not found")
+                raise click.ClickException(f"Host with name {host_name} not found")
 
-            found = host.id
+            found.add(host.id)
             hosts.append(host)
 
-        if tag != "":
-            items = self.database.list_hosts()
-            for item in items:
-                if tag not in item.tags or found == item.id:
+        # A host with several of the tags runs once, in all of their groups
+        for tag in tags:
+            for item in self.database.iter_hosts(tag):
+                if item.id in found:
                     continue
+                found.add(item.id)
+                hosts.append(item)
+
+        if select != "":
+            try:
+                selected = self.database.iter_hosts("", select)
+            except ValueError as e:
+                raise click.ClickException(str(e))
+
+            for item in selected:
+                if item.id in found:
+                    continue
+                found.add(item.id)
                 hosts.append(item)
 
         if len(hosts) == 0:
             raise click.ClickException(f"No hosts matching!")
 
-        playbook = Playbook(
-            str(uuid.uuid4()), self._configs["cache"]["path"].rstrip("/"), hosts, recipe
+        try:
+            for size in (rollout.get("serial", ""), rollout.get("canary", "")):
+                if size != "":
+                    Rollout.size(size, len(hosts))
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        return recipe, hosts
+
+    def _row(self, recipe):
+        """Get the output row of a recipe"""
+        return {
+            "ID": recipe.id,
+            "Name": recipe.name,
+            "Tags": ", ".join(recipe.tags) if len(recipe.tags) > 0 else "-",
+            "Created at": recipe.created_at,
+            "Updated at": recipe.updated_at,
+        }
+
+    def _summary(self, started_at, results, error="", phases=None):
+        """Build the result of a run task"""
+        finished_at = datetime.utcnow()
+        hosts = {}
+
+        for result in results.values():
+            hosts[result["status"]] = hosts.get(result["status"], 0) + 1
+
+        summary = {
+            "startedAt": started_at.isoformat(),
+            "finishedAt": finished_at.isoformat(),
+            "duration": round((finished_at - started_at).total_seconds(), 3),
+            "hosts": hosts,
+        }
+
+        if phases:
+            summary["phases"] = phases
+
+        if error != "":
+            summary["error"] = error
+
+        return summary
+
+    def _export(self):
+        """Write the metrics textfile if one is configured"""
+        path = self._configs.get("metrics", {}).get("textfile", "")
+
+        if path == "":
+            return
+
+        try:
+            Exporter(self.database).export(path)
+        except OSError as e:
+            self.logger.warning(f"Failed to write the metrics to {path}: {e}")
+
+    def _detach(self, payload, run_id):
+        """Run a Recipe in a background process"""
+        log = "{}/{}.log".format(self._configs["cache"]["path"].rstrip("/"), run_id)
+
+        with open(log, "w") as f:
+            subprocess.Popen(
+                Recipes.command(payload, run_id),
+                stdin=subprocess.DEVNULL,
+                stdout=f,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+
+        click.echo(run_id)
+
+    @staticmethod
+    def command(payload, run_id):
+        """
+        Get the command running a task payload in a child process
+
+        Args:
+            payload: The payload of a run task
+            run_id: The task id
+
+        Returns:
+            The command arguments
+        """
+        rollout = payload.get("rollout") or {}
+
+        command = [
+            sys.executable,
+            "-m",
+            "flook.cli",
+            "recipe",
+            "run",
+            payload["recipe"],
+            "--host",
+            payload.get("host", ""),
+            "--select",
+            payload.get("select", ""),
+            "--parallel",
+            str(payload.get("parallel", 1)),
+            "--serial",
+            rollout.get("serial", ""),
+            "--canary",
+            rollout.get("canary", ""),
+            "--max-fail",
+            str(rollout.get("max_fail", 0)),
+            "--events",
+            Events.NDJSON,
+            "--run-id",
+            run_id,
+        ]
+
+        for tag in payload.get("tags", []):
+            command.extend(["--tag", tag])
+
+        converge = payload.get("converge") or {}
+
+        if converge.get("changed_only", False):
+            command.append("--changed-only")
+
+        if converge.get("max_age", "") != "":
+            command.extend(["--max-age", converge["max_age"]])
+
+        return command
+
+    @staticmethod
+    def seconds(value):
+        """
+        Parse a duration like 90, 90s, 30m, 12h or 7d
+
+        Args:
+            value: The duration, empty for none
+
+        Returns:
+            The duration in seconds, 0 for none
+        """
+        units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+        if value == "":
+            return 0
+
+        if value.isdigit():
+            return int(value)
+
+        if value[:-1].isdigit() and value[-1] in units:
+            return int(value[:-1]) * units[value[-1]]
+
+        raise click.ClickException(
+            f"Invalid duration {value}, expected seconds or a number ending with s, m, h or d"
         )
 
-        playbook.build()
-        playbook.run()
-        playbook.cleanup()
+    def _changed(self, recipe, hosts, hashes, max_age):
+        """Split hosts into the ones to run and the ones converged already"""
+        states = self.database.list_host_states(recipe.id)
+        now = datetime.utcnow()
+        changed = []
+        converged = []
+
+        for host in hosts:
+            state = states.get(host.id)
+
+            if (
+                state is None
+                or state["hash"] != hashes[host.id]
+                or state["status"] != "ok"
+                or (
+                    max_age > 0
+                    and (
+                        now
+                        - datetime.strptime(state["updated_at"], "%Y-%m-%d %H:%M:%S")
+                    ).total_seconds()
+                    > max_age
+                )
+            ):
+                changed.append(host)
+            else:
+                converged.append(host)
+
+        return changed, converged
@@ -0,0 +1,217 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import click
+
+from flook.module.logger import Logger
+from flook.module.output import Output
+from flook.module.config import Config
+from flook.module.timings import Timings
+from flook.module.database import Database
+
+
+class Tasks:
+    """Tasks Class"""
+
+    def __init__(self):
+        self.output = Output()
+        self.database = Database()
+        self.config = Config()
+        self.logger = Logger().get_logger(__name__)
+
+    def init(self):
+        """Init database and configs"""
+        self._configs = self.config.load()
+        self.database.connect(
+            self._configs["database"]["path"], self._configs["database"]
+        )
+        self.database.migrate()
+        return self
+
+    def list(self, status, limit, output):
+        """List tasks"""
+        data = (self._row(task) for task in self.database.list_tasks(status, limit))
+
+        if self.output.write(data, Output.format(output)) == 0:
+            raise click.ClickException(f"No tasks found!")
+
+    def get(self, id, output):
+        """Get a task with its per host results"""
+        task = self.database.get_task(id)
+
+        if task is None:
+            raise click.ClickException(f"Task with id {id} not found")
+
+        data = [self._row(task)]
+        hosts = []
+
+        for name, result in self.database.list_task_hosts(task.id).items():
+            hosts.append(
+                {
+                    "Host": name,
+                    "Status": result["status"].upper(),
+                    "Ok": result["ok"],
+                    "Changed": result["changed"],
+                    "Failed": result["failed"],
+                    "Unreachable": result["unreachable"],
+                    "Skipped": result["skipped"],
+                    "Duration": result["duration"],
+                }
+            )
+
+        typ = Output.format(output)
+
+        if typ == Output.DEFAULT:
+            self.output.write(data, typ)
+            self.output.write(hosts, typ)
+            return
+
+        data[0]["Hosts"] = [
+            {self.output.camel_case(k): v for k, v in host.items()} for host in hosts
+        ]
+
+        self.output.write(data, typ)
+
+    def stats(self, id, top, runs, output):
+        """Get the slowest tasks and hosts of a run against the former runs"""
+        task = self.database.get_task(id)
+
+        if task is None:
+            raise click.ClickException(f"Task with id {id} not found")
+
+        previous = self.database.list_previous_tasks(task, runs)
+        timings = self.database.list_task_timings([task.id])
+        former = {}
+
+        for item in self.database.list_task_timings([item.id for item in previous]):
+            former.setdefault(item["name"], []).append(item["duration"])
+
+        # Tasks keep the order they ran in until sorted by total time
+        durations = {}
+        slowest = {}
+
+        for item in timings:
+            durations.setdefault(item["name"], []).append(item["duration"])
+
+            if item["duration"] > slowest.get(item["host"], ("", -1))[1]:
+                slowest[item["host"]] = (item["name"], item["duration"])
+
+        tasks = [
+            {
+                "Task": name,
+                "Hosts": len(values),
+                "Total": round(sum(values), 3),
+                "P50": Timings.percentile(values, 50),
+                "P95": Timings.percentile(values, 95),
+                "Max": max(values),
+                "Previous P50": Timings.percentile(former.get(name, []), 50),
+                "Change": self._change(
+                    Timings.percentile(values, 50),
+                    Timings.percentile(former.get(name, []), 50),
+                ),
+            }
+            for name, values in durations.items()
+        ]
+        tasks.sort(key=lambda item: item["Total"], reverse=True)
+
+        results = self.database.list_task_hosts(task.id)
+        hosts = [
+            {
+                "Host": name,
+                "Status": result["status"].upper(),
+                "Duration": result["duration"],
+                "Slowest Task": slowest.get(name, ("-", None))[0],
+                "Slowest Task Duration": slowest.get(name, ("-", None))[1],
+            }
+            for name, result in results.items()
+        ]
+        host_durations = [
+            result["duration"]
+            for result in results.values()
+            if result["duration"] is not None
+        ]
+        former_durations = [
+            item.result["duration"]
+            for item in previous
+            if item.result.get("duration") is not None
+        ]
+        mean = (
+            round(sum(former_durations) / len(former_durations), 3)
+            if len(former_durations) > 0
+            else None
+        )
+
+        data = [
+            {
+                "ID": task.id,
+                "Recipe": task.name,
+                "Status": task.status.upper(),
+                "Duration": task.result.get("duration"),
+                "Previous Runs": len(previous),
+                "Previous Duration": mean,
+                "Change": self._change(task.result.get("duration"), mean),
+                "Host P50": Timings.percentile(host_durations, 50),
+                "Host P95": Timings.percentile(host_durations, 95),
+            }
+        ]
+        typ = Output.format(output)
+
+        if typ == Output.DEFAULT:
+            self.output.write(data, typ)
+            self.output.write(tasks[:top], typ)
+            self.output.write(hosts[:top], typ)
+            return
+
+        data[0]["Tasks"] = [
+            {self.output.camel_case(k): v for k, v in item.items()}
+            for item in tasks[:top]
+        ]
+        data[0]["Hosts"] = [
+            {self.output.camel_case(k): v for k, v in item.items()}
+            for item in hosts[:top]
+        ]
+
+        self.output.write(data, typ)
+
+    def _change(self, value, previous):
+        """Get the change of a duration against a former one"""
+        if value is None or not previous:
+            return "-"
+
+        return "{:+.1f}%".format((value - previous) * 100 / previous)
+
+    def _row(self, task):
+        """Get the output row of a task"""
+        hosts = task.result.get("hosts", {})
+
+        return {
+            "ID": task.id,
+            "Recipe": task.name,
+            "Status": task.status.upper(),
+            "Hosts": ", ".join([f"{k}: {v}" for k, v in hosts.items()])
+            if len(hosts) > 0
+            else "-",
+            "Duration": task.result.get("duration", "-"),
+            "Created at": task.created_at,
+            "Updated at": task.updated_at,
+        }
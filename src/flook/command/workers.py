@@ -0,0 +1,169 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+import click
+import signal
+import threading
+import subprocess
+
+from flook.model.task import Task
+from flook.module.logger import Logger
+from flook.module.config import Config
+from flook.module.database import Database
+from flook.command.recipes import Recipes
+
+
+class Workers:
+    """Workers Class"""
+
+    def __init__(self):
+        self.database = Database()
+        self.config = Config()
+        self.logger = Logger().get_logger(__name__)
+        self._children = {}
+        self._stopping = False
+
+    def init(self):
+        """Init database and configs"""
+        self._configs = self.config.load()
+        self.database.connect(
+            self._configs["database"]["path"], self._configs["database"]
+        )
+        self.database.migrate()
+        return self
+
+    def run(self, concurrency, limits, drain=False, poll=1.0, lease=60):
+        """Run queued tasks, at most concurrency of them at once"""
+        limits = Workers.limits(limits)
+
+        # Leases are renewed once per poll
+        if lease <= poll:
+            raise click.ClickException(
+                f"Lease of {lease} seconds must be longer than the poll interval"
+            )
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *args: self.stop())
+
+        while True:
+            self._reap()
+
+            if len(self._children) > 0:
+                self.database.renew_tasks(list(self._children.keys()), lease)
+
+            claimed = None
+
+            while not self._stopping and len(self._children) < concurrency:
+                claimed = self.database.claim_task(limits, lease=lease)
+
+                if claimed is None:
+                    break
+
+                self._spawn(claimed)
+
+            if len(self._children) == 0 and (
+                self._stopping or (drain and claimed is None)
+            ):
+                break
+
+            time.sleep(poll)
+
+    def stop(self):
+        """Stop claiming tasks, the running ones finish"""
+        self._stopping = True
+
+    @staticmethod
+    def limits(values):
+        """
+        Parse concurrency limits
+
+        Args:
+            values: A list of limits like tag:db=2
+
+        Returns:
+            A dict of the most running tasks per tag
+        """
+        limits = {}
+
+        for value in values:
+            key, _, count = value.partition("=")
+
+            if not key.startswith("tag:") or key == "tag:" or not count.isdigit():
+                raise click.ClickException(
+                    f"Invalid limit {value}, expected tag:<name>=<count>"
+                )
+
+            limits[key[len("tag:") :]] = int(count)
+
+        return limits
+
+    def _spawn(self, task):
+        """Start the child process of a claimed task"""
+        log = "{}/{}.log".format(self._configs["cache"]["path"].rstrip("/"), task.id)
+
+        try:
+            with open(log, "w") as f:
+                self._children[task.id] = subprocess.Popen(
+                    Recipes.command(task.payload, task.id),
+                    stdin=subprocess.DEVNULL,
+                    stdout=f,
+                    stderr=subprocess.STDOUT,
+                )
+        except OSError as e:
+            self._fail(task, f"Failed to start the run: {e}")
+            return
+
+        self.logger.info(f"Started task {task.id} of recipe {task.name}")
+
+    def _reap(self):
+        """Collect the finished child processes"""
+        for id, process in list(self._children.items()):
+            code = process.poll()
+
+            if code is None:
+                continue
+
+            del self._children[id]
+            self.database.release_task(id)
+            task = self.database.get_task(id)
+
+            # The child failed before it could record a result
+            if task is not None and task.status in ("claimed", "running"):
+                self._fail(task, f"Run exited with code {code}")
+
+            self.logger.info(f"Task {id} exited with code {code}")
+
+    def _fail(self, task, error):
+        """Mark a task failed"""
+        self.database.release_task(task.id)
+        self.database.save_task(
+            Task(
+                task.id,
+                task.name,
+                "failed",
+                task.payload,
+                {"error": error},
+                None,
+                None,
+            )
+        )
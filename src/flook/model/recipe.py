@@ -21,10 +21,25 @@
 # SOFTWARE.
 
 
+import hashlib
+
+
 class Recipe:
     """Recipe Model"""
 
-    def __init__(self, id, name, recipe, templates, tags, created_at, updated_at):
+    def __init__(
+        self,
+        id,
+        name,
+        recipe,
+        templates,
+        tags,
+        created_at,
+        updated_at,
+        playbook=None,
+        template_hashes=None,
+        loader=None,
+    ):
         """Class Constructor"""
         self._id = id
         self._name = name
@@ -33,6 +48,9 @@ class Recipe:
         self._tags = tags
         self._created_at = created_at
         self._updated_at = updated_at
+        self._playbook = playbook
+        self._template_hashes = template_hashes
+        self._loader = loader
 
     @property
     def id(self):
@@ -51,9 +69,26 @@ class Recipe:
 
     @property
     def templates(self):
-        """Recipe Templates"""
+        """Recipe Templates, stored ones get loaded on first use"""
+        if self._templates is None:
+            self._templates = (
+                self._loader(self._template_hashes) if self._template_hashes else []
+            )
+
         return self._templates
 
+    @property
+    def template_hashes(self):
+        """Recipe Template Content Hashes by Name"""
+        if self._template_hashes is None:
+            self._template_hashes = {
+                key: hashlib.sha256(value.encode()).hexdigest()
+                for item in self._templates
+                for key, value in item.items()
+            }
+
+        return self._template_hashes
+
     @property
     def tags(self):
         """Recipe Tags"""
@@ -68,3 +103,8 @@ class Recipe:
     def updated_at(self):
         """Recipe Updated At"""
         return self._updated_at
+
+    @property
+    def playbook(self):
+        """Recipe Compiled Playbook"""
+        return self._playbook
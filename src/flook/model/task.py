@@ -24,10 +24,11 @@
 class Task:
     """Task Model"""
 
-    def __init__(self, id, name, payload, result, created_at, updated_at):
+    def __init__(self, id, name, status, payload, result, created_at, updated_at):
         """Class Constructor"""
         self._id = id
         self._name = name
+        self._status = status
         self._payload = payload
         self._result = result
         self._created_at = created_at
@@ -43,6 +44,11 @@ class Task:
         """Task Name"""
         return self._name
 
+    @property
+    def status(self):
+        """Task Status"""
+        return self._status
+
     @property
     def payload(self):
         """Task Payload"""
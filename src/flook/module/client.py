@@ -0,0 +1,117 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import sys
+import json
+import socket
+
+
+class Client:
+    """Client Class"""
+
+    # Commands a running server answers, anything interactive or long
+    # running like recipe run, host ssh and config edit runs locally
+    PROXIED = {
+        "host": ("list", "get", "add", "import", "delete"),
+        "recipe": ("add", "list", "get", "delete", "enqueue"),
+        "task": ("list", "get", "stats"),
+        "group": ("set", "get", "list", "delete"),
+        "facts": ("get",),
+    }
+
+    def __init__(self, path=None):
+        """Class Constructor"""
+        self._path = path or Client.socket_path()
+
+    @staticmethod
+    def socket_path():
+        """The server socket, FLOOK_SOCKET or .flook.sock next to the configs"""
+        return os.getenv("FLOOK_SOCKET", "{}/.flook.sock".format(os.getenv("HOME", "")))
+
+    @staticmethod
+    def env():
+        """The client environment a command depends on, HOME and FLOOK_*"""
+        return {
+            key: value
+            for key, value in os.environ.items()
+            if key == "HOME" or key.startswith("FLOOK_")
+        }
+
+    @staticmethod
+    def proxied(args):
+        """Whether a command line can be answered by the server"""
+        return (
+            len(args) >= 2
+            and args[1] in Client.PROXIED.get(args[0], ())
+            and "--help" not in args
+        )
+
+    def request(self, args):
+        """
+        Send a command to the server
+
+        Args:
+            args: The command line arguments
+
+        Returns:
+            A dict of the exit code, stdout and stderr, None if no server runs
+        """
+        if not os.path.exists(self._path):
+            return None
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            sock.connect(self._path)
+        except OSError:
+            sock.close()
+            return None
+
+        with sock, sock.makefile("rb") as f:
+            sock.sendall(
+                json.dumps(
+                    {"args": args, "cwd": os.getcwd(), "env": Client.env()}
+                ).encode()
+                + b"\n"
+            )
+            line = f.readline()
+
+        return json.loads(line) if line else None
+
+
+def main():
+    """Answer through the server when it runs, else run the command locally"""
+    args = sys.argv[1:]
+
+    if Client.proxied(args):
+        response = Client().request(args)
+
+        if response is not None:
+            sys.stdout.write(response["stdout"])
+            sys.stderr.write(response["stderr"])
+            sys.exit(response["code"])
+
+    from flook.cli import main as cli
+
+    cli()
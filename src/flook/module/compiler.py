@@ -0,0 +1,64 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import yaml
+
+
+class Compiler:
+    """Compiler Class"""
+
+    # LibYAML bindings are several times faster, fallback to pure Python
+    LOADER = getattr(yaml, "CLoader", yaml.Loader)
+    DUMPER = getattr(yaml, "CDumper", yaml.Dumper)
+
+    def load(self, recipe):
+        """
+        Parse a recipe
+
+        Args:
+            recipe: The recipe YAML content
+
+        Returns:
+            The parsed recipe, an empty dict for an empty recipe
+        """
+        data = yaml.load(recipe, Loader=Compiler.LOADER)
+
+        return data if data else {}
+
+    def compile(self, data):
+        """
+        Compile a parsed recipe into the playbook ansible runs
+
+        Args:
+            data: The parsed recipe
+
+        Returns:
+            The playbook YAML content
+        """
+        base = {
+            "hosts": "remote",
+        }
+
+        base.update({k: v for k, v in data.items() if k != "templates"})
+
+        return yaml.dump([base], Dumper=Compiler.DUMPER)
@@ -23,21 +23,42 @@
 import os
 import yaml
 
+from flook.module.phases import Phases
+
 
 class Config:
     """Config Class"""
 
     FILE = ".flook.yml"
 
+    # Parsed configs by path, reused while the file is unchanged so a
+    # long running process parses them once. Callers must not mutate them.
+    _cache = {}
+
     def __init__(self):
         self.configs = {}
         self._home = os.getenv("HOME", "")
 
     def load(self):
         """Load Configs"""
-        with open("{}/{}".format(self._home, Config.FILE)) as f:
+        with Phases.measure("config"):
+            return self._load()
+
+    def _load(self):
+        """Load and cache the configs"""
+        path = "{}/{}".format(self._home, Config.FILE)
+        mtime = os.stat(path).st_mtime_ns
+        cached = Config._cache.get(path)
+
+        if cached is not None and cached[0] == mtime:
+            self.configs = cached[1]
+            return self.configs
+
+        with open(path) as f:
             self.configs = yaml.load(f, Loader=yaml.FullLoader)
 
+        Config._cache[path] = (mtime, self.configs)
+
         return self.configs
 
     def get_configs(self):
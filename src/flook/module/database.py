@@ -20,39 +20,298 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+
+import sys
+import zlib
 import json
 import sqlite3
+import hashlib
+import functools
+import ipaddress
 
 from flook.model.host import Host
+from flook.model.task import Task
+from flook.model.group import Group
 from flook.model.recipe import Recipe
+from flook.module.phases import Phases
+from flook.module.selector import Selector
 
 
 class Database:
     """Database Class"""
 
-    def connect(self, path):
-        """Connect into a database"""
+    # Each migration is a list of statements applied inside one transaction.
+    # Append new migrations, never edit the ones already released.
+    MIGRATIONS = [
+        [
+            "CREATE TABLE IF NOT EXISTS host (id TEXT, name TEXT, config TEXT, createdAt TEXT, updatedAt TEXT)",
+            "CREATE TABLE IF NOT EXISTS recipe (id TEXT, name TEXT, config TEXT, createdAt TEXT, updatedAt TEXT)",
+            "CREATE TABLE IF NOT EXISTS task (id TEXT, name TEXT, payload TEXT, result TEXT, createdAt TEXT, updatedAt TEXT)",
+        ],
+        [
+            "CREATE TABLE host_new (id TEXT PRIMARY KEY, name TEXT NOT NULL, connection TEXT, ip TEXT, port INTEGER, user TEXT, password TEXT, sshPrivateKey TEXT, createdAt TEXT, updatedAt TEXT)",
+            "CREATE UNIQUE INDEX host_name ON host_new (name)",
+            "INSERT OR IGNORE INTO host_new SELECT id, name, json_extract(config, '$.connection'), json_extract(config, '$.ip'), json_extract(config, '$.port'), json_extract(config, '$.user'), json_extract(config, '$.password'), json_extract(config, '$.ssh_private_key'), createdAt, updatedAt FROM host",
+            "CREATE TABLE host_tag (hostId TEXT NOT NULL REFERENCES host (id) ON DELETE CASCADE, tag TEXT NOT NULL, PRIMARY KEY (hostId, tag))",
+            "CREATE INDEX host_tag_tag ON host_tag (tag)",
+            "INSERT OR IGNORE INTO host_tag SELECT host.id, json_each.value FROM host, json_each(host.config, '$.tags') WHERE host.id IN (SELECT id FROM host_new)",
+            "DROP TABLE host",
+            "ALTER TABLE host_new RENAME TO host",
+            "CREATE TABLE recipe_new (id TEXT PRIMARY KEY, name TEXT NOT NULL, config TEXT, createdAt TEXT, updatedAt TEXT)",
+            "CREATE UNIQUE INDEX recipe_name ON recipe_new (name)",
+            "INSERT OR IGNORE INTO recipe_new SELECT id, name, json_remove(config, '$.tags'), createdAt, updatedAt FROM recipe",
+            "CREATE TABLE recipe_tag (recipeId TEXT NOT NULL REFERENCES recipe (id) ON DELETE CASCADE, tag TEXT NOT NULL, PRIMARY KEY (recipeId, tag))",
+            "CREATE INDEX recipe_tag_tag ON recipe_tag (tag)",
+            "INSERT OR IGNORE INTO recipe_tag SELECT recipe.id, json_each.value FROM recipe, json_each(recipe.config, '$.tags') WHERE recipe.id IN (SELECT id FROM recipe_new)",
+            "DROP TABLE recipe",
+            "ALTER TABLE recipe_new RENAME TO recipe",
+        ],
+        [
+            "CREATE TABLE task_new (id TEXT PRIMARY KEY, name TEXT, status TEXT NOT NULL DEFAULT 'unknown', payload TEXT, result TEXT, createdAt TEXT, updatedAt TEXT)",
+            "INSERT OR IGNORE INTO task_new (id, name, payload, result, createdAt, updatedAt) SELECT id, name, payload, result, createdAt, updatedAt FROM task",
+            "DROP TABLE task",
+            "ALTER TABLE task_new RENAME TO task",
+            "CREATE INDEX task_created_at ON task (createdAt)",
+            "CREATE INDEX task_status ON task (status, createdAt)",
+            "CREATE TABLE task_host (taskId TEXT NOT NULL REFERENCES task (id) ON DELETE CASCADE, host TEXT NOT NULL, status TEXT, ok INTEGER, changed INTEGER, failed INTEGER, unreachable INTEGER, skipped INTEGER, startedAt TEXT, finishedAt TEXT, duration REAL, PRIMARY KEY (taskId, host))",
+        ],
+        [
+            "CREATE TABLE host_group (name TEXT PRIMARY KEY, vars TEXT NOT NULL DEFAULT '{}', createdAt TEXT, updatedAt TEXT)",
+        ],
+        [
+            "ALTER TABLE host ADD COLUMN ipv4 INTEGER",
+            "UPDATE host SET ipv4 = flook_ipv4(ip)",
+            "CREATE INDEX host_ipv4 ON host (ipv4)",
+        ],
+        [
+            "CREATE TABLE task_tag (taskId TEXT NOT NULL REFERENCES task (id) ON DELETE CASCADE, tag TEXT NOT NULL, PRIMARY KEY (taskId, tag))",
+            "CREATE INDEX task_tag_tag ON task_tag (tag)",
+        ],
+        [
+            "CREATE TABLE task_timing (taskId TEXT NOT NULL REFERENCES task (id) ON DELETE CASCADE, host TEXT NOT NULL, name TEXT NOT NULL, status TEXT, startedAt TEXT, finishedAt TEXT, duration REAL)",
+            "CREATE INDEX task_timing_task ON task_timing (taskId)",
+            "CREATE INDEX task_name ON task (name, createdAt)",
+        ],
+        [
+            "CREATE TABLE host_state (hostId TEXT NOT NULL REFERENCES host (id) ON DELETE CASCADE, recipeId TEXT NOT NULL REFERENCES recipe (id) ON DELETE CASCADE, hash TEXT NOT NULL, status TEXT NOT NULL, taskId TEXT, updatedAt TEXT, PRIMARY KEY (recipeId, hostId))",
+            "CREATE INDEX host_state_host ON host_state (hostId)",
+        ],
+        [
+            "CREATE TABLE blob (hash TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL)",
+            "CREATE TABLE recipe_template (recipeId TEXT NOT NULL REFERENCES recipe (id) ON DELETE CASCADE, name TEXT NOT NULL, hash TEXT NOT NULL REFERENCES blob (hash), PRIMARY KEY (recipeId, name))",
+            "CREATE INDEX recipe_template_hash ON recipe_template (hash)",
+            "INSERT OR IGNORE INTO blob SELECT flook_sha256(file.value), flook_compress(file.value), length(CAST(file.value AS BLOB)) FROM recipe, json_each(recipe.config, '$.templates') AS item, json_each(item.value) AS file",
+            "INSERT OR IGNORE INTO recipe_template SELECT recipe.id, file.key, flook_sha256(file.value) FROM recipe, json_each(recipe.config, '$.templates') AS item, json_each(item.value) AS file",
+            "UPDATE recipe SET config = json_remove(config, '$.templates')",
+        ],
+        [
+            "ALTER TABLE recipe ADD COLUMN playbook TEXT",
+            "UPDATE recipe SET playbook = json_extract(config, '$.playbook'), config = json_remove(config, '$.playbook', '$.data')",
+        ],
+        [
+            "CREATE TABLE task_lease (taskId TEXT PRIMARY KEY REFERENCES task (id) ON DELETE CASCADE, expiresAt TEXT NOT NULL)",
+            "CREATE INDEX task_lease_expires ON task_lease (expiresAt)",
+        ],
+    ]
+
+    # Defaults tunable from the database section of the configs
+    PRAGMAS = {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "busy_timeout": 5000,
+        "cache_size": -16000,
+        "mmap_size": 268435456,
+    }
+
+    # Open connections by path when set to a dict, a long running process
+    # then keeps one warm connection instead of connecting per command
+    POOL = None
+
+    HOST_COLUMNS = "id, name, connection, ip, port, user, password, sshPrivateKey, createdAt, updatedAt, (SELECT json_group_array(tag) FROM host_tag WHERE hostId = host.id)"
+
+    TASK_COLUMNS = "id, name, status, payload, result, createdAt, updatedAt"
+
+    TASK_HOST_COLUMNS = "host, status, ok, changed, failed, unreachable, skipped, startedAt, finishedAt, duration"
+
+    GROUP_COLUMNS = "name, vars, createdAt, updatedAt"
+
+    RECIPE_COLUMNS = "id, name, config, createdAt, updatedAt, (SELECT json_group_array(tag) FROM recipe_tag WHERE recipeId = recipe.id), (SELECT json_group_object(name, hash) FROM recipe_template WHERE recipeId = recipe.id), playbook"
+
+    def connect(self, path, options=None):
+        """
+        Connect into a database
+
+        Args:
+            path: The database file path
+            options: Optional pragmas overrides, usually the database configs
+        """
+        with Phases.measure("database"):
+            return self._connect(path, options)
+
+    def _connect(self, path, options=None):
+        """Open the connection"""
         self.path = path
 
-        self._connection = sqlite3.connect(self.path)
+        if Database.POOL is not None and path in Database.POOL:
+            self._connection = Database.POOL[path]
+            return self._connection.total_changes
+
+        pragmas = dict(Database.PRAGMAS)
+        pragmas.update(
+            {k: v for k, v in (options or {}).items() if k in Database.PRAGMAS}
+        )
+
+        # Run timings are written from the thread draining shard events
+        # while the caller waits on the shards
+        self._connection = sqlite3.connect(
+            self.path,
+            timeout=int(pragmas["busy_timeout"]) / 1000,
+            check_same_thread=False,
+        )
+
+        for name, value in pragmas.items():
+            # Pragma values can't be bound, only accept words and numbers
+            if not str(value).lstrip("-").isalnum():
+                raise ValueError(f"Invalid database {name} value {value}")
+
+            self._connection.execute(f"PRAGMA {name} = {value}")
+
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        # Deterministic functions can be used in indexes, Python 3.8+ only
+        for name, function in (
+            ("flook_ipv4", Database.ipv4),
+            ("flook_sha256", Database.sha256),
+            ("flook_compress", Database.compress),
+        ):
+            self._connection.create_function(
+                name,
+                1,
+                function,
+                **({"deterministic": True} if sys.version_info >= (3, 8) else {}),
+            )
+
+        if Database.POOL is not None:
+            Database.POOL[path] = self._connection
 
         return self._connection.total_changes
 
+    @staticmethod
+    def sha256(value):
+        """Get the content hash of a text, the blob key"""
+        return hashlib.sha256(value.encode()).hexdigest()
+
+    @staticmethod
+    def compress(value):
+        """Compress a text into blob data"""
+        return zlib.compress(value.encode())
+
+    @staticmethod
+    def load_templates(path, hashes):
+        """
+        Load the templates of a recipe from a database file
+
+        Recipes carry this as their template loader, it pickles so shards
+        in other processes load the templates only if they build
+
+        Args:
+            path: The database file path
+            hashes: The template content hashes by name
+
+        Returns:
+            The templates, a list of name to content dicts
+        """
+        database = Database()
+        database.connect(path)
+
+        try:
+            return database.get_templates(hashes)
+        finally:
+            if Database.POOL is None:
+                database._connection.close()
+
+    @staticmethod
+    def ipv4(ip):
+        """
+        Get the numeric value of an IPv4 address, the host ip range index key
+
+        Args:
+            ip: The host ip
+
+        Returns:
+            The address as an integer or None if not an IPv4 address
+        """
+        try:
+            return int(ipaddress.IPv4Address(ip))
+        except (ValueError, TypeError):
+            return None
+
     def migrate(self):
+        """Apply the pending schema migrations"""
+        with Phases.measure("database"):
+            return self._migrate()
+
+    def _migrate(self):
+        """Apply the pending schema migrations"""
         cursor = self._connection.cursor()
 
+        # The schema version is mirrored in the database header, reading it
+        # needs no table lookup so up to date databases skip all the DDL
+        if cursor.execute("PRAGMA user_version").fetchone()[0] == len(
+            Database.MIGRATIONS
+        ):
+            cursor.close()
+            return
+
         cursor.execute(
-            "CREATE TABLE IF NOT EXISTS host (id TEXT, name TEXT, config TEXT, createdAt TEXT, updatedAt TEXT)"
-        )
-        cursor.execute(
-            "CREATE TABLE IF NOT EXISTS recipe (id TEXT, name TEXT, config TEXT, createdAt TEXT, updatedAt TEXT)"
-        )
-        cursor.execute(
-            "CREATE TABLE IF NOT EXISTS task (id TEXT, name TEXT, payload TEXT, result TEXT, createdAt TEXT, updatedAt TEXT)"
+            "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, appliedAt TEXT)"
         )
 
+        # Tables get rebuilt by the migrations, foreign keys must stay
+        # off so dropping a parent table does not cascade into children
+        cursor.execute("PRAGMA foreign_keys = OFF")
+
+        try:
+            for version in range(1, len(Database.MIGRATIONS) + 1):
+                # Take the write lock before checking, so concurrent flook
+                # processes never apply the same migration twice
+                cursor.execute("BEGIN IMMEDIATE")
+
+                try:
+                    applied = cursor.execute(
+                        "SELECT COUNT(*) FROM schema_version WHERE version = ?",
+                        (version,),
+                    ).fetchone()[0]
+
+                    if applied == 0:
+                        for statement in Database.MIGRATIONS[version - 1]:
+                            cursor.execute(statement)
+
+                        cursor.execute(
+                            "INSERT INTO schema_version VALUES (?, datetime('now'))",
+                            (version,),
+                        )
+
+                    cursor.execute(f"PRAGMA user_version = {version}")
+                except Exception:
+                    self._connection.rollback()
+                    raise
+
+                self._connection.commit()
+        finally:
+            cursor.execute("PRAGMA foreign_keys = ON")
+            cursor.close()
+
+    def schema_version(self):
+        """Get the current schema version"""
+        cursor = self._connection.cursor()
+
+        version = cursor.execute("SELECT MAX(version) FROM schema_version").fetchone()[
+            0
+        ]
+
         cursor.close()
-        self._connection.commit()
+
+        return version if version is not None else 0
 
     def delete_host(self, name):
         """Delete a row by host name"""
@@ -68,56 +327,39 @@ class Database:
         """Get a row by host name"""
         cursor = self._connection.cursor()
 
-        rows = cursor.execute(
-            "SELECT id, name, config, createdAt, updatedAt FROM host WHERE name = '{}'".format(
-                name
-            )
-        ).fetchall()
+        row = cursor.execute(
+            f"SELECT {Database.HOST_COLUMNS} FROM host WHERE name = ?", (name,)
+        ).fetchone()
 
         cursor.close()
 
-        if len(rows) > 0:
-            for row in rows:
-                data = json.loads(row[2])
-
-                host = Host(
-                    row[0],
-                    row[1],
-                    data["connection"],
-                    data["ip"],
-                    data["port"],
-                    data["user"],
-                    data["password"],
-                    data["ssh_private_key"],
-                    data["tags"],
-                    row[3],
-                    row[4],
-                )
-
-                return host
-        else:
+        if row is None:
             return None
 
+        return self._host(row)
+
     def insert_host(self, host):
         """Insert a new row"""
         cursor = self._connection.cursor()
 
         result = cursor.execute(
-            "INSERT INTO host VALUES ('{}', '{}', '{}', datetime('now'), datetime('now'))".format(
+            "INSERT INTO host VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), datetime('now'), ?)",
+            (
                 host.id,
                 host.name,
-                json.dumps(
-                    {
-                        "connection": host.connection,
-                        "ip": host.ip,
-                        "port": host.port,
-                        "user": host.user,
-                        "password": host.password,
-                        "ssh_private_key": host.ssh_private_key,
-                        "tags": host.tags,
-                    }
-                ),
-            )
+                host.connection,
+                host.ip,
+                host.port,
+                host.user,
+                host.password,
+                host.ssh_private_key,
+                Database.ipv4(host.ip),
+            ),
+        )
+
+        cursor.executemany(
+            "INSERT OR IGNORE INTO host_tag VALUES (?, ?)",
+            [(host.id, tag) for tag in host.tags],
         )
 
         cursor.close()
@@ -126,42 +368,132 @@ class Database:
 
         return result.rowcount
 
-    def list_hosts(self):
-        """List all rows"""
-        result = []
+    def insert_hosts(self, hosts, force=False, chunk=1000):
+        """
+        Insert many hosts in one transaction
+
+        Args:
+            hosts: An iterable of hosts, consumed in chunks
+            force: Whether to update the hosts that already exist
+            chunk: The number of hosts written per batch
+
+        Returns:
+            The number of hosts written
+        """
+        query = "INSERT INTO host VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), datetime('now'), ?)"
+
+        if force:
+            query += " ON CONFLICT (name) DO UPDATE SET connection = excluded.connection, ip = excluded.ip, port = excluded.port, user = excluded.user, password = excluded.password, sshPrivateKey = excluded.sshPrivateKey, ipv4 = excluded.ipv4, updatedAt = excluded.updatedAt"
 
         cursor = self._connection.cursor()
-        rows = cursor.execute(
-            "SELECT id, name, config, createdAt, updatedAt FROM host"
-        ).fetchall()
-        cursor.close()
+        count = 0
+        batch = []
 
-        for row in rows:
-            data = json.loads(row[2])
-
-            host = Host(
-                row[0],
-                row[1],
-                data["connection"],
-                data["ip"],
-                data["port"],
-                data["user"],
-                data["password"],
-                data["ssh_private_key"],
-                data["tags"],
-                row[3],
-                row[4],
+        def flush():
+            cursor.executemany(
+                query,
+                [
+                    (
+                        host.id,
+                        host.name,
+                        host.connection,
+                        host.ip,
+                        host.port,
+                        host.user,
+                        host.password,
+                        host.ssh_private_key,
+                        Database.ipv4(host.ip),
+                    )
+                    for host in batch
+                ],
             )
 
-            result.append(host)
+            # Tags are attached by name, upserted hosts keep their former id
+            if force:
+                cursor.executemany(
+                    "DELETE FROM host_tag WHERE hostId = (SELECT id FROM host WHERE name = ?)",
+                    [(host.name,) for host in batch],
+                )
+
+            cursor.executemany(
+                "INSERT OR IGNORE INTO host_tag SELECT id, ? FROM host WHERE name = ?",
+                [(tag, host.name) for host in batch for tag in host.tags],
+            )
+
+        try:
+            cursor.execute("BEGIN")
+
+            for host in hosts:
+                batch.append(host)
+
+                if len(batch) == chunk:
+                    flush()
+                    count += len(batch)
+                    batch = []
+
+            if len(batch) > 0:
+                flush()
+                count += len(batch)
+
+        except BaseException:
+            self._connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        self._connection.commit()
+
+        return count
+
+    def list_hosts(self, tag="", select=""):
+        """List all rows, optionally only the ones with a tag or matching a selector"""
+        return [host for host in self.iter_hosts(tag, select)]
+
+    def iter_hosts(self, tag="", select=""):
+        """
+        Iterate over rows as they are read
+
+        Args:
+            tag: Only the hosts with this tag
+            select: Only the hosts matching this selector, see Selector
+
+        Returns:
+            A generator of hosts
 
-        return result
+        Raises:
+            ValueError: If the selector is invalid
+        """
+        conditions = []
+        params = []
+
+        if tag != "":
+            conditions.append("id IN (SELECT hostId FROM host_tag WHERE tag = ?)")
+            params.append(tag)
+
+        if select != "":
+            condition, values = Selector().compile(select)
+            conditions.append(condition)
+            params.extend(values)
+
+        query = f"SELECT {Database.HOST_COLUMNS} FROM host"
+
+        if len(conditions) > 0:
+            query += " WHERE " + " AND ".join(conditions)
+
+        cursor = self._connection.cursor()
+        cursor.execute(query, params)
+
+        # Not a generator itself so an invalid selector raises right away
+        return self._iterate(cursor, self._host)
 
     def delete_recipe(self, name):
-        """Delete a row by recipe name"""
+        """Delete a row by recipe name and the blobs no other recipe uses"""
         cursor = self._connection.cursor()
 
         cursor.execute("DELETE FROM recipe WHERE name = ?", (name,))
+        cursor.execute(
+            "DELETE FROM blob WHERE hash NOT IN (SELECT hash FROM recipe_template)"
+        )
 
         cursor.close()
 
@@ -171,46 +503,288 @@ class Database:
         """Get a row by recipe name"""
         cursor = self._connection.cursor()
 
-        rows = cursor.execute(
-            "SELECT id, name, config, createdAt, updatedAt FROM recipe WHERE name = '{}'".format(
-                name
-            )
-        ).fetchall()
+        row = cursor.execute(
+            f"SELECT {Database.RECIPE_COLUMNS} FROM recipe WHERE name = ?", (name,)
+        ).fetchone()
 
         cursor.close()
 
-        if len(rows) > 0:
-            for row in rows:
-                data = json.loads(row[2])
-                recipe = Recipe(
-                    row[0],
-                    row[1],
-                    data["recipe"],
-                    data["templates"],
-                    data["tags"],
-                    row[3],
-                    row[4],
-                )
-                return recipe
-        else:
+        if row is None:
             return None
 
+        return self._recipe(row)
+
     def insert_recipe(self, recipe):
         """Insert a new row"""
         cursor = self._connection.cursor()
 
         result = cursor.execute(
-            "INSERT INTO recipe VALUES ('{}', '{}', '{}', datetime('now'), datetime('now'))".format(
+            "INSERT INTO recipe (id, name, config, createdAt, updatedAt, playbook) VALUES (?, ?, ?, datetime('now'), datetime('now'), ?)",
+            (
                 recipe.id,
                 recipe.name,
-                json.dumps(
-                    {
-                        "recipe": recipe.recipe,
-                        "templates": recipe.templates,
-                        "tags": recipe.tags,
-                    }
+                json.dumps({"recipe": recipe.recipe}),
+                recipe.playbook,
+            ),
+        )
+
+        cursor.executemany(
+            "INSERT OR IGNORE INTO recipe_tag VALUES (?, ?)",
+            [(recipe.id, tag) for tag in recipe.tags],
+        )
+
+        # Templates are stored once by content, whatever recipes share them
+        hashes = recipe.template_hashes
+
+        cursor.executemany(
+            "INSERT OR IGNORE INTO blob VALUES (?, ?, ?)",
+            [
+                (hashes[key], Database.compress(value), len(value.encode()))
+                for item in recipe.templates
+                for key, value in item.items()
+            ],
+        )
+        cursor.executemany(
+            "INSERT OR IGNORE INTO recipe_template VALUES (?, ?, ?)",
+            [(recipe.id, key, hash) for key, hash in hashes.items()],
+        )
+
+        cursor.close()
+
+        self._connection.commit()
+
+        return result.rowcount
+
+    def get_templates(self, hashes):
+        """
+        Get the templates of their content hashes
+
+        Args:
+            hashes: The template content hashes by name
+
+        Returns:
+            The templates sorted by name, a list of name to content dicts
+        """
+        unique = tuple(set(hashes.values()))
+
+        cursor = self._connection.cursor()
+
+        rows = cursor.execute(
+            "SELECT hash, data FROM blob WHERE hash IN ({})".format(
+                ", ".join("?" * len(unique))
+            ),
+            unique,
+        ).fetchall()
+
+        cursor.close()
+
+        blobs = {row[0]: zlib.decompress(row[1]).decode() for row in rows}
+
+        return [{name: blobs[hashes[name]]} for name in sorted(hashes.keys())]
+
+    def list_recipes(self, tag=""):
+        """List all rows, optionally only the ones with a tag"""
+        return [recipe for recipe in self.iter_recipes(tag)]
+
+    def iter_recipes(self, tag=""):
+        """Iterate over rows as they are read, optionally only the ones with a tag"""
+        cursor = self._connection.cursor()
+
+        if tag != "":
+            cursor.execute(
+                f"SELECT {Database.RECIPE_COLUMNS} FROM recipe WHERE id IN (SELECT recipeId FROM recipe_tag WHERE tag = ?)",
+                (tag,),
+            )
+        else:
+            cursor.execute(f"SELECT {Database.RECIPE_COLUMNS} FROM recipe")
+
+        try:
+            for row in cursor:
+                yield self._recipe(row)
+        finally:
+            cursor.close()
+
+    def save_task(self, task):
+        """Insert a task or update its status, payload and result"""
+        cursor = self._connection.cursor()
+
+        result = cursor.execute(
+            "INSERT INTO task VALUES (?, ?, ?, ?, ?, datetime('now'), datetime('now')) ON CONFLICT (id) DO UPDATE SET status = excluded.status, payload = excluded.payload, result = excluded.result, updatedAt = excluded.updatedAt",
+            (
+                task.id,
+                task.name,
+                task.status,
+                json.dumps(task.payload),
+                json.dumps(task.result),
+            ),
+        )
+
+        cursor.close()
+
+        self._connection.commit()
+
+        return result.rowcount
+
+    def get_task(self, id):
+        """Get a row by task id"""
+        cursor = self._connection.cursor()
+
+        row = cursor.execute(
+            f"SELECT {Database.TASK_COLUMNS} FROM task WHERE id = ?", (id,)
+        ).fetchone()
+
+        cursor.close()
+
+        if row is None:
+            return None
+
+        return self._task(row)
+
+    def list_tasks(self, status="", limit=50):
+        """List the latest rows, optionally only the ones with a status"""
+        cursor = self._connection.cursor()
+
+        if status != "":
+            rows = cursor.execute(
+                f"SELECT {Database.TASK_COLUMNS} FROM task WHERE status = ? ORDER BY createdAt DESC LIMIT ?",
+                (status, limit),
+            ).fetchall()
+        else:
+            rows = cursor.execute(
+                f"SELECT {Database.TASK_COLUMNS} FROM task ORDER BY createdAt DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+        cursor.close()
+
+        return [self._task(row) for row in rows]
+
+    def enqueue_task(self, task, tags):
+        """
+        Queue a task
+
+        Args:
+            task: The task, its status is usually queued
+            tags: The tags of the task hosts, concurrency limits apply to them
+
+        Returns:
+            The number of inserted rows
+        """
+        cursor = self._connection.cursor()
+
+        try:
+            result = cursor.execute(
+                "INSERT INTO task VALUES (?, ?, ?, ?, ?, datetime('now'), datetime('now'))",
+                (
+                    task.id,
+                    task.name,
+                    task.status,
+                    json.dumps(task.payload),
+                    json.dumps(task.result),
                 ),
             )
+
+            cursor.executemany(
+                "INSERT OR IGNORE INTO task_tag VALUES (?, ?)",
+                [(task.id, tag) for tag in tags],
+            )
+        except BaseException:
+            self._connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        self._connection.commit()
+
+        return result.rowcount
+
+    def claim_task(self, limits=None, candidates=100, lease=60):
+        """
+        Claim the oldest queued task within the concurrency limits
+
+        Claims whose lease expired, their worker is gone, are queued again
+        if their run never started and failed otherwise, so they stop
+        counting against the limits
+
+        Args:
+            limits: A dict of the most claimed or running tasks per tag
+            candidates: The number of oldest queued tasks considered
+            lease: The seconds the claim holds unless renewed
+
+        Returns:
+            The claimed task or None if none can run now
+        """
+        limits = limits or {}
+        cursor = self._connection.cursor()
+
+        # Takes the write lock up front, two workers can't claim the same task
+        cursor.execute("BEGIN IMMEDIATE")
+
+        try:
+            expired = "SELECT taskId FROM task_lease WHERE expiresAt < datetime('now')"
+
+            cursor.execute(
+                f"UPDATE task SET status = 'queued', updatedAt = datetime('now') WHERE status = 'claimed' AND id IN ({expired})"
+            )
+            cursor.execute(
+                f"UPDATE task SET status = 'failed', result = json_object('error', 'The worker lease expired'), updatedAt = datetime('now') WHERE status = 'running' AND id IN ({expired})"
+            )
+            cursor.execute("DELETE FROM task_lease WHERE expiresAt < datetime('now')")
+
+            rows = cursor.execute(
+                f"SELECT {Database.TASK_COLUMNS} FROM task WHERE status = 'queued' ORDER BY createdAt, rowid LIMIT ?",
+                (candidates,),
+            ).fetchall()
+
+            busy = {
+                tag: cursor.execute(
+                    "SELECT COUNT(*) FROM task_tag JOIN task ON task.id = task_tag.taskId WHERE task_tag.tag = ? AND task.status IN ('claimed', 'running')",
+                    (tag,),
+                ).fetchone()[0]
+                for tag in limits.keys()
+            }
+
+            for row in rows:
+                tags = [
+                    item[0]
+                    for item in cursor.execute(
+                        "SELECT tag FROM task_tag WHERE taskId = ?", (row[0],)
+                    )
+                ]
+
+                if any(busy[tag] >= limits[tag] for tag in tags if tag in limits):
+                    continue
+
+                cursor.execute(
+                    "UPDATE task SET status = 'claimed', updatedAt = datetime('now') WHERE id = ?",
+                    (row[0],),
+                )
+                cursor.execute(
+                    "INSERT OR REPLACE INTO task_lease VALUES (?, datetime('now', ?))",
+                    (row[0], f"+{int(lease)} seconds"),
+                )
+                self._connection.commit()
+
+                return self._task((row[0], row[1], "claimed") + tuple(row[3:]))
+
+            self._connection.commit()
+
+            return None
+        except BaseException:
+            self._connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def renew_tasks(self, ids, lease=60):
+        """Renew the leases of claimed tasks"""
+        cursor = self._connection.cursor()
+
+        result = cursor.execute(
+            "UPDATE task_lease SET expiresAt = datetime('now', ?) WHERE taskId IN ({})".format(
+                ", ".join("?" * len(ids))
+            ),
+            (f"+{int(lease)} seconds",) + tuple(ids),
         )
 
         cursor.close()
@@ -219,27 +793,334 @@ class Database:
 
         return result.rowcount
 
-    def list_recipes(self):
-        """List all rows"""
-        result = []
+    def release_task(self, id):
+        """Drop the lease of a claimed task"""
+        cursor = self._connection.cursor()
+
+        result = cursor.execute("DELETE FROM task_lease WHERE taskId = ?", (id,))
+
+        cursor.close()
+
+        self._connection.commit()
+
+        return result.rowcount
+
+    def count_tasks(self, status):
+        """Count the rows with a status"""
+        cursor = self._connection.cursor()
+
+        count = cursor.execute(
+            "SELECT COUNT(*) FROM task WHERE status = ?", (status,)
+        ).fetchone()[0]
+
+        cursor.close()
+
+        return count
+
+    def insert_task_hosts(self, task_id, results):
+        """Insert the per host results of a task"""
+        cursor = self._connection.cursor()
+
+        cursor.executemany(
+            "INSERT OR REPLACE INTO task_host VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    task_id,
+                    name,
+                    result["status"],
+                    result["ok"],
+                    result["changed"],
+                    result["failed"],
+                    result["unreachable"],
+                    result["skipped"],
+                    result["started_at"],
+                    result["finished_at"],
+                    result["duration"],
+                )
+                for name, result in results.items()
+            ),
+        )
+
+        cursor.close()
+
+        self._connection.commit()
 
+    def list_task_hosts(self, task_id):
+        """List the per host results of a task, slowest first"""
         cursor = self._connection.cursor()
+
         rows = cursor.execute(
-            "SELECT id, name, config, createdAt, updatedAt FROM recipe"
+            f"SELECT {Database.TASK_HOST_COLUMNS} FROM task_host WHERE taskId = ? ORDER BY duration DESC",
+            (task_id,),
         ).fetchall()
+
         cursor.close()
 
-        for row in rows:
-            data = json.loads(row[2])
-            recipe = Recipe(
-                row[0],
-                row[1],
-                data["recipe"],
-                data["templates"],
-                data["tags"],
-                row[3],
-                row[4],
-            )
-            result.append(recipe)
+        return {
+            row[0]: {
+                "status": row[1],
+                "ok": row[2],
+                "changed": row[3],
+                "failed": row[4],
+                "unreachable": row[5],
+                "skipped": row[6],
+                "started_at": row[7],
+                "finished_at": row[8],
+                "duration": row[9],
+            }
+            for row in rows
+        }
+
+    def insert_task_timings(self, task_id, rows):
+        """Insert the per host task timings of a run"""
+        cursor = self._connection.cursor()
+
+        cursor.executemany(
+            "INSERT INTO task_timing VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((task_id,) + tuple(row) for row in rows),
+        )
+
+        cursor.close()
+
+        self._connection.commit()
+
+    def list_task_timings(self, task_ids):
+        """List the per host task timings of runs"""
+        cursor = self._connection.cursor()
+
+        rows = cursor.execute(
+            "SELECT taskId, host, name, status, startedAt, finishedAt, duration FROM task_timing WHERE taskId IN ({}) ORDER BY rowid".format(
+                ", ".join("?" * len(task_ids))
+            ),
+            tuple(task_ids),
+        ).fetchall()
+
+        cursor.close()
+
+        return [
+            {
+                "task_id": row[0],
+                "host": row[1],
+                "name": row[2],
+                "status": row[3],
+                "started_at": row[4],
+                "finished_at": row[5],
+                "duration": row[6],
+            }
+            for row in rows
+        ]
+
+    def list_previous_tasks(self, task, limit=5):
+        """List the finished runs of the same recipe before a run, latest first"""
+        cursor = self._connection.cursor()
+
+        rows = cursor.execute(
+            f"SELECT {Database.TASK_COLUMNS} FROM task WHERE name = ? AND id != ? AND createdAt <= ? AND status IN ('successful', 'failed') ORDER BY createdAt DESC LIMIT ?",
+            (task.name, task.id, task.created_at, limit),
+        ).fetchall()
+
+        cursor.close()
+
+        return [self._task(row) for row in rows]
+
+    def task_histogram(self, path, buckets):
+        """
+        Get the histogram of a number in the result of finished tasks per recipe
+
+        Args:
+            path: The JSON path of the number in the task result
+            buckets: The bucket upper bounds
+
+        Returns:
+            A list of (recipe, count, sum, count per bucket...) rows
+        """
+        cursor = self._connection.cursor()
+
+        rows = cursor.execute(
+            "SELECT name, COUNT(*), TOTAL(value){} FROM (SELECT name, json_extract(result, ?) AS value FROM task WHERE status IN ('successful', 'failed')) WHERE value IS NOT NULL GROUP BY name ORDER BY name".format(
+                "".join(", TOTAL(value <= ?)" for bucket in buckets)
+            ),
+            tuple(buckets) + (path,),
+        ).fetchall()
+
+        cursor.close()
+
+        return rows
+
+    def count_task_hosts(self):
+        """Count the host results per recipe and status"""
+        cursor = self._connection.cursor()
+
+        rows = cursor.execute(
+            "SELECT task.name, task_host.status, COUNT(*) FROM task_host JOIN task ON task.id = task_host.taskId GROUP BY task.name, task_host.status ORDER BY task.name, task_host.status"
+        ).fetchall()
+
+        cursor.close()
+
+        return rows
+
+    def count_tasks_by_status(self):
+        """Count the rows per status"""
+        cursor = self._connection.cursor()
+
+        rows = cursor.execute(
+            "SELECT status, COUNT(*) FROM task GROUP BY status"
+        ).fetchall()
+
+        cursor.close()
+
+        return dict(rows)
+
+    def save_host_states(self, recipe_id, task_id, states):
+        """
+        Record the last run of a recipe on hosts
+
+        Args:
+            recipe_id: The recipe id
+            task_id: The run task id
+            states: A list of (host id, state hash, host status) tuples
+        """
+        cursor = self._connection.cursor()
+
+        cursor.executemany(
+            "INSERT INTO host_state VALUES (?, ?, ?, ?, ?, datetime('now')) ON CONFLICT (recipeId, hostId) DO UPDATE SET hash = excluded.hash, status = excluded.status, taskId = excluded.taskId, updatedAt = excluded.updatedAt",
+            (
+                (host_id, recipe_id, hash, status, task_id)
+                for host_id, hash, status in states
+            ),
+        )
+
+        cursor.close()
+
+        self._connection.commit()
+
+    def list_host_states(self, recipe_id):
+        """List the last run of a recipe by host id"""
+        cursor = self._connection.cursor()
+
+        rows = cursor.execute(
+            "SELECT hostId, hash, status, taskId, updatedAt FROM host_state WHERE recipeId = ?",
+            (recipe_id,),
+        ).fetchall()
+
+        cursor.close()
+
+        return {
+            row[0]: {
+                "hash": row[1],
+                "status": row[2],
+                "task_id": row[3],
+                "updated_at": row[4],
+            }
+            for row in rows
+        }
+
+    def save_group(self, group):
+        """Insert a group or update its vars"""
+        cursor = self._connection.cursor()
+
+        result = cursor.execute(
+            "INSERT INTO host_group VALUES (?, ?, datetime('now'), datetime('now')) ON CONFLICT (name) DO UPDATE SET vars = excluded.vars, updatedAt = excluded.updatedAt",
+            (group.name, json.dumps(group.vars)),
+        )
+
+        cursor.close()
+
+        self._connection.commit()
+
+        return result.rowcount
+
+    def get_group(self, name):
+        """Get a row by group name"""
+        cursor = self._connection.cursor()
+
+        row = cursor.execute(
+            f"SELECT {Database.GROUP_COLUMNS} FROM host_group WHERE name = ?", (name,)
+        ).fetchone()
+
+        cursor.close()
+
+        if row is None:
+            return None
+
+        return self._group(row)
+
+    def list_groups(self):
+        """List all rows ordered by name"""
+        cursor = self._connection.cursor()
+
+        rows = cursor.execute(
+            f"SELECT {Database.GROUP_COLUMNS} FROM host_group ORDER BY name"
+        ).fetchall()
+
+        cursor.close()
+
+        return [self._group(row) for row in rows]
+
+    def delete_group(self, name):
+        """Delete a row by group name"""
+        cursor = self._connection.cursor()
+
+        cursor.execute("DELETE FROM host_group WHERE name = ?", (name,))
+
+        cursor.close()
+
+        self._connection.commit()
+
+    def _iterate(self, cursor, build):
+        """Build items from rows as they are read, then close the cursor"""
+        try:
+            for row in cursor:
+                yield build(row)
+        finally:
+            cursor.close()
+
+    def _host(self, row):
+        """Build a host from a row"""
+        return Host(
+            row[0],
+            row[1],
+            row[2],
+            row[3],
+            row[4],
+            row[5],
+            row[6],
+            row[7],
+            json.loads(row[10]),
+            row[8],
+            row[9],
+        )
+
+    def _recipe(self, row):
+        """Build a recipe from a row"""
+        data = json.loads(row[2])
+
+        # Templates load on first use, listings never decode them
+        return Recipe(
+            row[0],
+            row[1],
+            data["recipe"],
+            None,
+            json.loads(row[5]),
+            row[3],
+            row[4],
+            row[7],
+            json.loads(row[6]),
+            functools.partial(Database.load_templates, self.path),
+        )
+
+    def _task(self, row):
+        """Build a task from a row"""
+        return Task(
+            row[0],
+            row[1],
+            row[2],
+            json.loads(row[3]) if row[3] else {},
+            json.loads(row[4]) if row[4] else {},
+            row[5],
+            row[6],
+        )
 
-        return result
+    def _group(self, row):
+        """Build a group from a row"""
+        return Group(row[0], json.loads(row[1]), row[2], row[3])
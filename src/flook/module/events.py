@@ -0,0 +1,140 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import sys
+import json
+import threading
+
+
+class Events:
+    """Events Class"""
+
+    NDJSON = "ndjson"
+    PROGRESS = "progress"
+
+    STATUSES = {
+        "runner_on_ok": "ok",
+        "runner_on_failed": "failed",
+        "runner_on_unreachable": "unreachable",
+        "runner_on_skipped": "skipped",
+    }
+
+    def __init__(self, mode, stream=None):
+        """Class Constructor"""
+        self._mode = mode
+        # The progress view goes to stderr to keep stdout for the results
+        if stream is None:
+            stream = sys.stdout if mode == Events.NDJSON else sys.stderr
+
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._task = ""
+        self._counts = {"ok": 0, "changed": 0, "failed": 0, "unreachable": 0}
+
+    @staticmethod
+    def compact(event):
+        """
+        Reduce an ansible runner event to the fields flook cares about
+
+        Args:
+            event: The ansible runner event
+
+        Returns:
+            A small dict or None if the event is not a host or task event
+        """
+        data = event.get("event_data", {})
+
+        if event.get("event") == "playbook_on_task_start":
+            return {"event": "task", "task": data.get("task", "")}
+
+        if event.get("event") not in Events.STATUSES:
+            return None
+
+        status = Events.STATUSES[event["event"]]
+        result = data.get("res", {}) if isinstance(data.get("res"), dict) else {}
+
+        if status == "failed" and data.get("ignore_errors"):
+            status = "ignored"
+
+        item = {
+            "event": status,
+            "host": data.get("host", ""),
+            "task": data.get("task", ""),
+            "changed": bool(result.get("changed", False)),
+            "start": data.get("start"),
+            "end": data.get("end"),
+            "duration": data.get("duration"),
+        }
+
+        if status in ("failed", "unreachable"):
+            item["msg"] = str(result.get("msg", ""))
+
+        return item
+
+    def handle(self, event):
+        """Write a compact event to the stream"""
+        with self._lock:
+            if self._mode == Events.NDJSON:
+                self._stream.write(json.dumps(event) + "\n")
+            else:
+                self._progress(event)
+
+            self._stream.flush()
+
+    def summary(self, name, result):
+        """Write a host summary"""
+        if self._mode == Events.NDJSON:
+            self.handle(dict({"event": "summary", "host": name}, **result))
+
+    def close(self):
+        """Terminate the progress line"""
+        if self._mode == Events.PROGRESS:
+            self._stream.write("\n")
+            self._stream.flush()
+
+    def _progress(self, event):
+        """Update the one line progress view"""
+        if event["event"] == "task":
+            self._task = event["task"]
+
+        elif event["event"] in ("failed", "unreachable"):
+            self._counts[event["event"]] += 1
+            self._stream.write(
+                "\r\033[K{} [{}] {}: {}\n".format(
+                    event["event"].upper(), event["host"], event["task"], event["msg"]
+                )
+            )
+
+        elif event["event"] == "batch":
+            self._stream.write(
+                "\r\033[KBATCH {batch}/{batches} ({hosts} hosts)\n".format(**event)
+            )
+
+        elif event["event"] in ("ok", "ignored"):
+            self._counts["changed" if event["changed"] else "ok"] += 1
+
+        self._stream.write(
+            "\r\033[Kok={ok} changed={changed} failed={failed} unreachable={unreachable} | {task}".format(
+                task=self._task, **self._counts
+            )
+        )
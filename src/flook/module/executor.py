@@ -0,0 +1,275 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import threading
+from datetime import datetime
+from multiprocessing import Manager
+from concurrent.futures import ProcessPoolExecutor
+
+from flook.module.events import Events
+from flook.module.phases import Phases
+from flook.module.playbook import Playbook
+
+
+def run_shard(
+    id,
+    cache,
+    hosts,
+    recipe,
+    quiet,
+    listener=None,
+    configs=None,
+    groups=None,
+    inventory=None,
+):
+    """
+    Build, run and cleanup the playbook of a single shard
+
+    Args:
+        id: The shard playbook id
+        cache: The cache path
+        hosts: The shard hosts
+        recipe: The recipe to run
+        quiet: Whether to hide ansible output
+        listener: An optional callable or queue receiving compact events
+        configs: The flook configs
+        groups: The group vars by host tag
+        inventory: An inventory already built for more hosts than the shard
+
+    Returns:
+        A tuple of the run status and the ansible stats
+    """
+    handler = None
+    record = None
+
+    if listener is not None:
+        forward = listener if callable(listener) else listener.put
+
+        def handler(event):
+            item = Events.compact(event)
+
+            if item is not None:
+                forward(item)
+
+        # Shards may run in other processes, their phases go with the events
+        def record(name, wall, cpu):
+            forward({"event": "phase", "phase": name, "wall": wall, "cpu": cpu})
+
+    playbook = Playbook(id, cache, hosts, recipe, configs, groups, inventory)
+
+    try:
+        with Phases.measure("build", record):
+            playbook.build()
+
+        with Phases.measure("execute", record):
+            status = playbook.run(quiet, handler)
+    finally:
+        with Phases.measure("cleanup", record):
+            playbook.cleanup()
+
+    return status, playbook.stats
+
+
+class Executor:
+    """Executor Class"""
+
+    def __init__(
+        self,
+        id,
+        cache,
+        hosts,
+        recipe,
+        parallel=1,
+        configs=None,
+        groups=None,
+        inventory=None,
+    ):
+        """Class Constructor"""
+        self._configs = configs
+        self._groups = groups
+        self._inventory = inventory
+        self._id = id
+        self._cache = cache
+        self._hosts = hosts
+        self._recipe = recipe
+        self._parallel = max(1, min(parallel, len(hosts)))
+
+    def shards(self):
+        """Split hosts into contiguous shards of nearly equal size"""
+        size, extra = divmod(len(self._hosts), self._parallel)
+        shards = []
+        start = 0
+
+        for index in range(self._parallel):
+            end = start + size + (1 if index < extra else 0)
+            shards.append(self._hosts[start:end])
+            start = end
+
+        return shards
+
+    def run(self, listener=None, quiet=False):
+        """
+        Run the recipe towards all hosts
+
+        Args:
+            listener: An optional callable receiving compact events as they happen
+            quiet: Whether to hide ansible output
+
+        Returns:
+            A tuple of the overall status and the per host results
+        """
+        shards = self.shards()
+        quiet = quiet or len(shards) > 1
+
+        self._listener = listener
+        self._times = {}
+
+        if len(shards) == 1:
+            outcomes = [
+                run_shard(
+                    self._id,
+                    self._cache,
+                    shards[0],
+                    self._recipe,
+                    quiet,
+                    self._track,
+                    self._configs,
+                    self._groups,
+                    self._inventory,
+                )
+            ]
+        else:
+            # Worker processes forward their events through a queue, a thread
+            # drains it while the shards run
+            with Manager() as manager:
+                queue = manager.Queue()
+                drain = threading.Thread(target=self._drain, args=(queue,))
+                drain.start()
+
+                try:
+                    outcomes = self._run_shards(shards, quiet, queue)
+                finally:
+                    queue.put(None)
+                    drain.join()
+
+        results = {host.name: self._result(None, host.name) for host in self._hosts}
+
+        for status, stats in outcomes:
+            if stats is None:
+                continue
+
+            for name in stats.get("processed", {}).keys():
+                if name in results:
+                    results[name] = self._result(stats, name)
+
+        status = all([outcome[0] for outcome in outcomes]) and all(
+            [result["status"] == "ok" for result in results.values()]
+        )
+
+        return status, results
+
+    def _run_shards(self, shards, quiet, queue):
+        """Run each shard in its own worker process"""
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            futures = [
+                pool.submit(
+                    run_shard,
+                    f"{self._id}-{index}",
+                    self._cache,
+                    shard,
+                    self._recipe,
+                    quiet,
+                    queue,
+                    self._configs,
+                    self._groups,
+                    self._inventory,
+                )
+                for index, shard in enumerate(shards)
+            ]
+
+            return [future.result() for future in futures]
+
+    def _drain(self, queue):
+        """Track queued events until the sentinel"""
+        while True:
+            item = queue.get()
+
+            if item is None:
+                break
+
+            self._track(item)
+
+    def _track(self, item):
+        """Keep the first start and last end of each host then forward the event"""
+        if item["event"] == "phase":
+            Phases.add(item["phase"], item["wall"], item["cpu"])
+            return
+
+        if item.get("host") and item.get("start") and item.get("end"):
+            times = self._times.setdefault(item["host"], [item["start"], item["end"]])
+            times[0] = min(times[0], item["start"])
+            times[1] = max(times[1], item["end"])
+
+        if self._listener is not None:
+            self._listener(item)
+
+    def _result(self, stats, name):
+        """Get the result of a host out of ansible stats"""
+        times = self._times.get(name)
+        result = {
+            "status": "unknown",
+            "ok": 0,
+            "changed": 0,
+            "failed": 0,
+            "unreachable": 0,
+            "skipped": 0,
+            "started_at": times[0] if times else None,
+            "finished_at": times[1] if times else None,
+            "duration": None,
+        }
+
+        if times:
+            result["duration"] = round(
+                (
+                    datetime.fromisoformat(times[1]) - datetime.fromisoformat(times[0])
+                ).total_seconds(),
+                3,
+            )
+
+        if stats is None:
+            return result
+
+        result["ok"] = stats.get("ok", {}).get(name, 0)
+        result["changed"] = stats.get("changed", {}).get(name, 0)
+        result["failed"] = stats.get("failures", {}).get(name, 0)
+        result["unreachable"] = stats.get("dark", {}).get(name, 0)
+        result["skipped"] = stats.get("skipped", {}).get(name, 0)
+
+        if result["unreachable"] > 0:
+            result["status"] = "unreachable"
+        elif result["failed"] > 0:
+            result["status"] = "failed"
+        else:
+            result["status"] = "ok"
+
+        return result
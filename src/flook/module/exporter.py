@@ -0,0 +1,214 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import time
+import tempfile
+
+
+class Exporter:
+    """Exporter Class"""
+
+    # Defaults tunable from the metrics section of the configs, a textfile
+    # path makes every run write the metrics there
+    DEFAULTS = {
+        "textfile": "",
+    }
+
+    # Upper bounds in seconds of the run and phase duration buckets
+    BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+    PHASES = ("build", "execute", "cleanup")
+
+    STATUSES = ("queued", "claimed", "pending", "running", "successful", "failed")
+
+    def __init__(self, database):
+        """Class Constructor"""
+        self._database = database
+        self._latency = {}
+
+    def render(self):
+        """
+        Render the metrics as OpenMetrics text
+
+        Returns:
+            The metrics text
+        """
+        self._latency = {}
+        lines = []
+
+        lines.extend(
+            self._histogram(
+                "flook_run_duration_seconds",
+                "Duration of finished recipe runs",
+                [
+                    ({"recipe": row[0]}, row[1:])
+                    for row in self._query(
+                        "runs",
+                        self._database.task_histogram,
+                        "$.duration",
+                        Exporter.BUCKETS,
+                    )
+                ],
+            )
+        )
+
+        phases = []
+
+        for phase in Exporter.PHASES:
+            phases.extend(
+                ({"recipe": row[0], "phase": phase}, row[1:])
+                for row in self._query(
+                    "phases",
+                    self._database.task_histogram,
+                    f"$.phases.{phase}.wall",
+                    Exporter.BUCKETS,
+                )
+            )
+
+        lines.extend(
+            self._histogram(
+                "flook_run_phase_duration_seconds",
+                "Wall time of the phases of finished recipe runs, summed over shards",
+                sorted(phases, key=lambda item: (item[0]["recipe"], item[0]["phase"])),
+            )
+        )
+
+        lines.append("# TYPE flook_host_results counter")
+        lines.append("# HELP flook_host_results Host results of recipe runs")
+
+        for name, status, count in self._query(
+            "hosts", self._database.count_task_hosts
+        ):
+            lines.append(
+                "flook_host_results_total{} {}".format(
+                    self._labels(recipe=name, status=status), count
+                )
+            )
+
+        counts = self._query("tasks", self._database.count_tasks_by_status)
+
+        lines.append("# TYPE flook_queue_depth gauge")
+        lines.append("# HELP flook_queue_depth Recipe runs waiting for a worker")
+        lines.append("flook_queue_depth {}".format(counts.get("queued", 0)))
+
+        lines.append("# TYPE flook_tasks gauge")
+        lines.append("# HELP flook_tasks Recipe runs by status")
+
+        for status in sorted(set(counts.keys()) | set(Exporter.STATUSES)):
+            lines.append(
+                "flook_tasks{} {}".format(
+                    self._labels(status=status), counts.get(status, 0)
+                )
+            )
+
+        # Only the exporter's own queries, how long a scrape waits on the
+        # database, not the latency of the queries of runs
+        lines.append("# TYPE flook_scrape_query_duration_seconds gauge")
+        lines.append(
+            "# HELP flook_scrape_query_duration_seconds Duration of the database queries of this scrape"
+        )
+
+        for name, latency in self._latency.items():
+            lines.append(
+                "flook_scrape_query_duration_seconds{} {}".format(
+                    self._labels(query=name), self._number(latency)
+                )
+            )
+
+        lines.append("# EOF")
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Write the metrics to a file atomically, for the textfile collector"""
+        text = self.render()
+        directory = os.path.dirname(os.path.abspath(path))
+
+        fd, temp = tempfile.mkstemp(dir=directory, prefix=".flook-metrics-")
+
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(text)
+
+            os.chmod(temp, 0o644)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    def _query(self, name, method, *args):
+        """Call a database method and add its duration to the scrape latency"""
+        started_at = time.perf_counter()
+        result = method(*args)
+        self._latency[name] = self._latency.get(name, 0) + (
+            time.perf_counter() - started_at
+        )
+
+        return result
+
+    def _histogram(self, name, help, series):
+        """Render a histogram out of (labels, (count, sum, buckets...)) items"""
+        lines = [f"# TYPE {name} histogram", f"# HELP {name} {help}"]
+
+        for labels, row in series:
+            count, total, buckets = row[0], row[1], row[2:]
+
+            for bound, value in zip(Exporter.BUCKETS, buckets):
+                lines.append(
+                    "{}_bucket{} {}".format(
+                        name,
+                        self._labels(**dict(labels, le=self._number(bound))),
+                        int(value),
+                    )
+                )
+
+            lines.append(
+                "{}_bucket{} {}".format(
+                    name, self._labels(**dict(labels, le="+Inf")), count
+                )
+            )
+            lines.append("{}_count{} {}".format(name, self._labels(**labels), count))
+            lines.append(
+                "{}_sum{} {}".format(name, self._labels(**labels), self._number(total))
+            )
+
+        return lines
+
+    def _labels(self, **labels):
+        """Render a label set"""
+        return "{{{}}}".format(
+            ",".join(
+                '{}="{}"'.format(
+                    key,
+                    str(value)
+                    .replace("\\", "\\\\")
+                    .replace('"', '\\"')
+                    .replace("\n", "\\n"),
+                )
+                for key, value in labels.items()
+            )
+        )
+
+    def _number(self, value):
+        """Render a float"""
+        return repr(round(float(value), 6))
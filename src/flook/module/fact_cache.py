@@ -0,0 +1,95 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import json
+import time
+from datetime import datetime
+
+
+class FactCache:
+    """FactCache Class"""
+
+    # Defaults tunable from the facts section of the configs
+    DEFAULTS = {
+        "gathering": "smart",
+        "ttl": 3600,
+        "forks": 50,
+    }
+
+    def __init__(self, path, configs=None):
+        """Class Constructor"""
+        self._path = path
+        self._configs = dict(FactCache.DEFAULTS)
+        self._configs.update(configs or {})
+
+    @property
+    def path(self):
+        """The fact cache directory"""
+        return self._path
+
+    @property
+    def configs(self):
+        """Facts configs merged with the defaults"""
+        return self._configs
+
+    def envvars(self):
+        """
+        Get the ansible environment variables of the fact cache
+
+        Returns:
+            A dict of environment variables
+        """
+        return {
+            "ANSIBLE_GATHERING": str(self._configs["gathering"]),
+            "ANSIBLE_CACHE_PLUGIN": "jsonfile",
+            "ANSIBLE_CACHE_PLUGIN_CONNECTION": self._path,
+            "ANSIBLE_CACHE_PLUGIN_TIMEOUT": str(int(self._configs["ttl"])),
+        }
+
+    def get(self, name):
+        """
+        Get the cached facts of a host
+
+        Args:
+            name: The host name
+
+        Returns:
+            A tuple of the facts, when they got gathered and whether they
+            expired, or None if the host facts are not cached
+        """
+        path = os.path.join(self._path, name)
+
+        try:
+            with open(path) as f:
+                facts = json.load(f)
+
+            gathered_at = os.path.getmtime(path)
+        except (OSError, ValueError):
+            return None
+
+        return (
+            facts,
+            datetime.utcfromtimestamp(gathered_at).strftime("%Y-%m-%d %H:%M:%S"),
+            time.time() - gathered_at > int(self._configs["ttl"]),
+        )
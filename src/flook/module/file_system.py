@@ -126,6 +126,16 @@ class FileSystem:
         f.write(content)
         f.close()
 
+    def rename(self, source, destination):
+        """
+        Rename a file or a directory
+
+        Args:
+            source: The current path
+            destination: The new path
+        """
+        os.rename(source, destination)
+
     def delete_directory(self, directory):
         """
         Deletes a directory and its content
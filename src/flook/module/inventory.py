@@ -0,0 +1,339 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import re
+import csv
+import json
+import uuid
+import shlex
+
+from flook.model.host import Host
+
+
+class Inventory:
+    """Inventory Class"""
+
+    # Ansible inventory variables flook keeps as host attributes
+    VARS = {
+        "ansible_host": "ip",
+        "ansible_port": "port",
+        "ansible_ssh_port": "port",
+        "ansible_user": "user",
+        "ansible_ssh_user": "user",
+        "ansible_password": "password",
+        "ansible_ssh_pass": "password",
+        "ansible_ssh_private_key_file": "ssh_private_key_file",
+        "ansible_connection": "connection",
+    }
+
+    IGNORED_GROUPS = ["all", "ungrouped"]
+
+    # Host names are written as is into the ansible INI inventory
+    NAME = re.compile(r"^[0-9A-Za-z_.:@-]+$")
+
+    def __init__(self, path):
+        """Class Constructor"""
+        self._path = path
+        self._base = os.path.dirname(os.path.abspath(path))
+        self._keys = {}
+
+    def hosts(self):
+        """
+        Iterate over the inventory hosts
+
+        CSV and JSON lines files are read one row at a time. Ansible INI and
+        YAML inventories need a full pass to resolve groups first.
+
+        Returns:
+            A generator of hosts
+
+        Raises:
+            ValueError: If the inventory or one of its hosts is invalid
+        """
+        extension = os.path.splitext(self._path)[1].lower()
+
+        if extension == ".csv":
+            return self._csv()
+
+        if extension == ".jsonl":
+            return self._jsonl()
+
+        if extension == ".json":
+            return self._json()
+
+        if extension in (".yml", ".yaml"):
+            return self._yaml()
+
+        return self._ini()
+
+    def _csv(self):
+        """Read hosts from a CSV file with a header row"""
+        with open(self._path, newline="") as f:
+            for number, row in enumerate(csv.DictReader(f), start=2):
+                row = {k.strip(): v for k, v in row.items() if k is not None}
+
+                if row.get("tags"):
+                    row["tags"] = row["tags"].split(",")
+
+                yield self._host(row, f"line {number}")
+
+    def _jsonl(self):
+        """Read hosts from a JSON lines file"""
+        with open(self._path) as f:
+            for number, line in enumerate(f, start=1):
+                if line.strip() != "":
+                    yield self._host(json.loads(line), f"line {number}")
+
+    def _json(self):
+        """Read hosts from a JSON list or an ansible-inventory --list output"""
+        with open(self._path) as f:
+            data = json.load(f)
+
+        if isinstance(data, list):
+            for number, item in enumerate(data):
+                yield self._host(item, f"item {number}")
+            return
+
+        hostvars = data.get("_meta", {}).get("hostvars", {})
+        groups = {}
+
+        for group, item in data.items():
+            if group == "_meta" or not isinstance(item, dict):
+                continue
+
+            groups[group] = {
+                "hosts": item.get("hosts", []),
+                "vars": item.get("vars", {}),
+                "children": item.get("children", []),
+            }
+
+        for host in self._ansible(groups, hostvars):
+            yield host
+
+    def _yaml(self):
+        """Read hosts from a YAML list or an Ansible YAML inventory"""
+        import yaml
+
+        with open(self._path) as f:
+            data = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+        if isinstance(data, list):
+            for number, item in enumerate(data):
+                yield self._host(item, f"item {number}")
+            return
+
+        groups = {}
+        hostvars = {}
+
+        def walk(name, group):
+            group = group or {}
+            hosts = group.get("hosts") or {}
+            children = group.get("children") or {}
+
+            groups[name] = {
+                "hosts": list(hosts.keys()),
+                "vars": group.get("vars") or {},
+                "children": list(children.keys()),
+            }
+
+            for host, variables in hosts.items():
+                hostvars.setdefault(host, {}).update(variables or {})
+
+            for child, item in children.items():
+                walk(child, item)
+
+        for name, group in (data or {}).items():
+            walk(name, group)
+
+        for host in self._ansible(groups, hostvars):
+            yield host
+
+    def _ini(self):
+        """Read hosts from an Ansible INI inventory"""
+        groups = {}
+        hostvars = {}
+        group, section = "ungrouped", "hosts"
+
+        with open(self._path) as f:
+            for number, line in enumerate(f, start=1):
+                line = line.strip()
+
+                if line == "" or line[0] in "#;":
+                    continue
+
+                if line.startswith("[") and line.endswith("]"):
+                    group, _, section = line[1:-1].partition(":")
+                    section = section or "hosts"
+                    groups.setdefault(group, {"hosts": [], "vars": {}, "children": []})
+                    continue
+
+                groups.setdefault(group, {"hosts": [], "vars": {}, "children": []})
+
+                try:
+                    parts = shlex.split(line, comments=True)
+                except ValueError as e:
+                    raise ValueError(f"Invalid inventory line {number}: {e}")
+
+                if section == "children":
+                    groups[group]["children"].append(parts[0])
+
+                elif section == "vars":
+                    key, _, value = line.partition("=")
+                    groups[group]["vars"][key.strip()] = value.strip()
+
+                else:
+                    variables = dict([part.partition("=")[::2] for part in parts[1:]])
+
+                    for name in self._expand(parts[0]):
+                        groups[group]["hosts"].append(name)
+                        hostvars.setdefault(name, {}).update(variables)
+
+        for host in self._ansible(groups, hostvars):
+            yield host
+
+    def _ansible(self, groups, hostvars):
+        """Resolve ansible groups into hosts tagged with their groups"""
+        tags = {}
+        variables = {}
+
+        def visit(group, parents):
+            if group not in groups or group in parents:
+                return
+
+            parents = parents + [group]
+
+            for name in groups[group]["hosts"]:
+                for parent in parents:
+                    if parent not in Inventory.IGNORED_GROUPS:
+                        tags.setdefault(name, []).append(parent)
+
+                    # Outer groups first so the closest group wins
+                    variables.setdefault(name, {}).update(groups[parent]["vars"])
+
+            for child in groups[group]["children"]:
+                visit(child, parents)
+
+        for group in groups.keys():
+            visit(group, [])
+
+        for name in hostvars.keys():
+            tags.setdefault(name, [])
+
+        for name, items in tags.items():
+            data = dict(variables.get(name, {}))
+            data.update(hostvars.get(name, {}))
+
+            row = {"name": name, "tags": list(dict.fromkeys(items))}
+
+            for key, value in data.items():
+                if key in Inventory.VARS:
+                    row[Inventory.VARS[key]] = value
+
+            yield self._host(row, f"host {name}")
+
+    @staticmethod
+    def valid_name(name):
+        """
+        Check a host name is safe to use as an inventory hostname
+
+        Args:
+            name: The host name
+
+        Returns:
+            Whether it only has letters, digits and _ . : @ -
+        """
+        return Inventory.NAME.match(name) is not None
+
+    def _expand(self, pattern):
+        """Expand ansible host ranges like web[01:10].example.com"""
+        match = re.search(r"\[([0-9]+):([0-9]+)\]", pattern)
+
+        if match is None:
+            return [pattern]
+
+        start, end = match.group(1), match.group(2)
+        names = []
+
+        for index in range(int(start), int(end) + 1):
+            names.extend(
+                self._expand(
+                    pattern[: match.start()]
+                    + str(index).zfill(len(start))
+                    + pattern[match.end() :]
+                )
+            )
+
+        return names
+
+    def _host(self, row, where):
+        """Validate a row and build a host"""
+        if not isinstance(row, dict) or not row.get("name"):
+            raise ValueError(f"Invalid host at {where}: a name is required")
+
+        if not Inventory.valid_name(str(row["name"]).strip()):
+            raise ValueError(
+                f"Invalid host at {where}: name must only have letters, digits and _ . : @ -"
+            )
+
+        try:
+            port = int(row.get("port") or 22)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid host at {where}: port must be a number")
+
+        tags = row.get("tags") or []
+
+        if isinstance(tags, str):
+            tags = tags.split(",")
+
+        ssh_private_key = row.get("ssh_private_key") or ""
+
+        if ssh_private_key == "" and row.get("ssh_private_key_file"):
+            ssh_private_key = self._key(row["ssh_private_key_file"], where)
+
+        return Host(
+            str(uuid.uuid4()),
+            str(row["name"]).strip(),
+            str(row.get("connection") or "ssh"),
+            str(row.get("ip") or row["name"]).strip(),
+            port,
+            str(row.get("user") or "root"),
+            str(row.get("password") or ""),
+            ssh_private_key,
+            [str(tag).strip() for tag in tags if str(tag).strip() != ""],
+            None,
+            None,
+        )
+
+    def _key(self, path, where):
+        """Read a private key file once, however many hosts share it"""
+        path = os.path.join(self._base, os.path.expanduser(str(path)))
+
+        if path not in self._keys:
+            try:
+                with open(path) as f:
+                    self._keys[path] = f.read()
+            except OSError as e:
+                raise ValueError(f"Invalid host at {where}: {e}")
+
+        return self._keys[path]
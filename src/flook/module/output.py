@@ -20,19 +20,41 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+
+import os
+import sys
+import csv
 import json
+from io import StringIO
 from re import sub
-from prettytable import PrettyTable
+
+from flook.module.phases import Phases
 
 
 class Output:
     """Output Class"""
 
     JSON = "JSON"
+    JSONL = "JSONL"
+    CSV = "CSV"
+    YAML = "YAML"
     DEFAULT = "DEFAULT"
 
+    FORMATS = {"json": JSON, "jsonl": JSONL, "csv": CSV, "yaml": YAML}
+
+    def __init__(self):
+        """Class Constructor"""
+        self._keys = {}
+
+    @staticmethod
+    def format(name):
+        """Get the output type of a format name"""
+        return Output.FORMATS.get(name.lower(), Output.DEFAULT)
+
     def _table(self, data):
         """Output data as Table"""
+        from prettytable import PrettyTable
+
         headers = []
         rows = []
 
@@ -51,19 +73,110 @@ class Output:
         new = []
 
         for item in data:
-            new.append({self.camel_case(k): v for k, v in item.items()})
+            new.append(self._item(item))
 
         return json.dumps(new)
 
     def render(self, data, typ):
         """Render Data to the Console"""
+        if typ == Output.DEFAULT:
+            return self._table(data)
+
         if typ == Output.JSON:
             return self._json(data)
 
-        return self._table(data)
+        stream = StringIO()
+        self.write(data, typ, stream)
+
+        return stream.getvalue().rstrip("\n")
+
+    def write(self, rows, typ, stream=None):
+        """
+        Write rows to a stream as they come
+
+        Every format but the table one is written row by row, so memory
+        stays constant and the first row is out right away. A table needs
+        all the rows to size its columns so it gets buffered.
+
+        Args:
+            rows: An iterable of dicts sharing the same keys
+            typ: The output type
+            stream: The stream to write to, defaults to stdout
+
+        Returns:
+            The number of rows written
+        """
+        with Phases.measure("output"):
+            return self._write(rows, typ, stream)
+
+    def _write(self, rows, typ, stream=None):
+        """Write rows to a stream"""
+        stream = stream if stream is not None else sys.stdout
+        count = 0
+
+        try:
+            if typ == Output.DEFAULT:
+                data = list(rows)
+
+                if len(data) > 0:
+                    stream.write(str(self._table(data)) + "\n")
+
+                return len(data)
+
+            writer = None
+
+            for item in rows:
+                if typ == Output.CSV:
+                    if writer is None:
+                        writer = csv.writer(stream)
+                        writer.writerow([self.camel_case(k) for k in item.keys()])
+                    writer.writerow(item.values())
+
+                elif typ == Output.YAML:
+                    import yaml
+
+                    stream.write(
+                        yaml.safe_dump(
+                            [self._item(item)],
+                            default_flow_style=False,
+                            sort_keys=False,
+                        )
+                    )
+
+                elif typ == Output.JSONL:
+                    stream.write(json.dumps(self._item(item)) + "\n")
+
+                else:
+                    stream.write(
+                        ("[" if count == 0 else ", ") + json.dumps(self._item(item))
+                    )
+
+                count += 1
+
+                if count == 1:
+                    stream.flush()
+
+            if typ == Output.JSON and count > 0:
+                stream.write("]\n")
+
+            stream.flush()
+
+        except BrokenPipeError:
+            # The reader went away (e.g. piped into head), stop quietly
+            if stream is sys.stdout:
+                devnull = os.open(os.devnull, os.O_WRONLY)
+                os.dup2(devnull, sys.stdout.fileno())
+
+        return count
+
+    def _item(self, item):
+        """Camel case the keys of an item"""
+        return {self.camel_case(k): v for k, v in item.items()}
 
     def camel_case(self, value):
-        """Change string into camel case"""
-        value = sub(r"(_|-)+", " ", value).title().replace(" ", "")
+        """Change string into camel case, memoized per key"""
+        if value not in self._keys:
+            key = sub(r"(_|-)+", " ", value).title().replace(" ", "")
+            self._keys[value] = "".join([key[0].lower(), key[1:]])
 
-        return "".join([value[0].lower(), value[1:]])
+        return self._keys[value]
@@ -0,0 +1,126 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+
+class Phases:
+    """Phases Class"""
+
+    # Wall and CPU seconds spent per phase name in this process
+    RECORDS = {}
+
+    LOCK = threading.Lock()
+
+    @staticmethod
+    def cpu():
+        """CPU seconds of the process and its finished children, ansible runs in one"""
+        times = os.times()
+
+        return times[0] + times[1] + times[2] + times[3]
+
+    @staticmethod
+    def clock():
+        """The current wall and CPU clocks"""
+        return time.perf_counter(), Phases.cpu()
+
+    @staticmethod
+    @contextmanager
+    def measure(name, record=None):
+        """Record the wall and CPU time of a block under a phase name"""
+        record = record or Phases.add
+        wall, cpu = Phases.clock()
+
+        try:
+            yield
+        finally:
+            record(name, time.perf_counter() - wall, Phases.cpu() - cpu)
+
+    @staticmethod
+    def add(name, wall, cpu):
+        """Add wall and CPU seconds to a phase"""
+        with Phases.LOCK:
+            record = Phases.RECORDS.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+            record["wall"] += wall
+            record["cpu"] += cpu
+
+    @staticmethod
+    def records():
+        """Get a copy of the phase records"""
+        with Phases.LOCK:
+            return {name: dict(record) for name, record in Phases.RECORDS.items()}
+
+    @staticmethod
+    def since(records):
+        """
+        Get the time spent per phase since former records
+
+        Args:
+            records: Phase records taken earlier
+
+        Returns:
+            The phases with time spent, rounded to milliseconds
+        """
+        phases = {}
+
+        for name, record in Phases.records().items():
+            former = records.get(name, {"wall": 0.0, "cpu": 0.0})
+
+            if record["wall"] == former["wall"] and record["cpu"] == former["cpu"]:
+                continue
+
+            phases[name] = {
+                key: round(record[key] - former[key], 3) for key in ("wall", "cpu")
+            }
+
+        return phases
+
+    @staticmethod
+    def report(stream, started):
+        """
+        Write the time spent per phase
+
+        Args:
+            stream: The stream to write to
+            started: The clocks at the start of the command
+        """
+        wall, cpu = Phases.clock()
+        records = Phases.records()
+
+        stream.write(f"{'phase':<12} {'wall (s)':>10} {'cpu (s)':>10}\n")
+
+        for name, record in records.items():
+            stream.write(f"{name:<12} {record['wall']:>10.3f} {record['cpu']:>10.3f}\n")
+
+        stream.write(
+            f"{'total':<12} {wall - started[0]:>10.3f} {cpu - started[1]:>10.3f}\n"
+        )
+        stream.flush()
+
+    @staticmethod
+    def reset():
+        """Forget all phase records"""
+        with Phases.LOCK:
+            Phases.RECORDS = {}
@@ -20,99 +20,413 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import yaml
-import ansible_runner
+import os
+import re
+import json
+import time
+import hashlib
 
+from flook.module.ssh import Ssh
+from flook.module.fact_cache import FactCache
+from flook.module.compiler import Compiler
+from flook.module.inventory import Inventory
 from flook.module.file_system import FileSystem
 
 
 class Playbook:
     """Playbook Class"""
 
-    def __init__(self, id, cache, hosts, recipe):
+    STATS = ["ok", "changed", "failures", "dark", "skipped", "ignored", "processed"]
+
+    # Group names ansible reserves or flook uses for every host
+    RESERVED_GROUPS = ("all", "ungrouped", "remote")
+
+    # Seconds an unused recipe bundle is kept, tunable as cache.bundle_max_age
+    BUNDLE_MAX_AGE = 7 * 24 * 3600
+
+    def __init__(
+        self, id, cache, hosts, recipe, configs=None, groups=None, inventory=None
+    ):
         """Class Constructor"""
         self._id = id
         self._cache = cache
         self._hosts = hosts
         self._recipe = recipe
+        self._configs = configs or {}
+        self._groups = groups or {}
+        self._stats = None
+        self._keys = {}
         self._file_system = FileSystem()
+        self._ssh = Ssh("{}/cp".format(self._cache), self._configs.get("ssh"))
+        self._facts = FactCache(
+            "{}/facts".format(self._cache), self._configs.get("facts")
+        )
+        self._recipe_path = "{}/bundle/recipe/{}".format(
+            self._cache, self.recipe_hash()
+        )
+        # The inventory holds passwords and keys, it lives in the run
+        # directory unless shared by the batches of a rollout
+        self._shared = inventory is not None
+        self._inventory_path = inventory or "{}/{}/inventory".format(
+            self._cache, self._id
+        )
+
+    def recipe_hash(self):
+        """Hash of everything the compiled recipe bundle depends on"""
+        return Playbook.content_hash(self._recipe)
+
+    @staticmethod
+    def content_hash(recipe):
+        """Hash of the recipe, its compiled playbook and its templates"""
+        digest = hashlib.sha256()
+        digest.update(recipe.recipe.encode())
+        digest.update((recipe.playbook or "").encode())
+        # Template hashes, so stored templates need no loading
+        digest.update(json.dumps(recipe.template_hashes, sort_keys=True).encode())
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def state_hash(content_hash, host, groups=None):
+        """
+        Hash of everything a host converges to when running a recipe
+
+        Args:
+            content_hash: The content hash of the recipe
+            host: The host
+            groups: The group vars by host tag
+
+        Returns:
+            The hash of the recipe content, the host config and the vars
+            of its groups
+        """
+        groups = groups or {}
+        digest = hashlib.sha256()
+        digest.update(content_hash.encode())
+        digest.update(
+            json.dumps(
+                [
+                    host.name,
+                    host.connection,
+                    host.ip,
+                    host.port,
+                    host.user,
+                    host.password,
+                    host.ssh_private_key,
+                    sorted(host.tags),
+                    {tag: groups[tag] for tag in host.tags if tag in groups},
+                ],
+                sort_keys=True,
+                default=str,
+            ).encode()
+        )
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def group_name(tag):
+        """
+        Get the inventory group name of a host tag
+
+        Args:
+            tag: The host tag
+
+        Returns:
+            The tag with anything but letters, digits and underscores
+            replaced, prefixed when it would clash or start with a digit
+        """
+        name = re.sub(r"[^0-9A-Za-z_]", "_", tag)
+
+        if name[:1].isdigit() or name in Playbook.RESERVED_GROUPS:
+            name = "tag_" + name
+
+        return name
+
+    @property
+    def inventory_path(self):
+        """The inventory directory"""
+        return self._inventory_path
 
     def build(self):
-        """Build Playbook"""
-        self._file_system.create_dirs("{}/{}".format(self._cache, self._id))
+        """Build Playbook, reusing the cached recipe bundle"""
         self._file_system.create_dirs("{}/{}/cache".format(self._cache, self._id))
 
-        hosts = "[remote]\n"
+        # Touching marks the bundle as used for the eviction
+        try:
+            os.utime(self._recipe_path)
+        except OSError:
+            self._bundle(self._recipe_path, self._build_recipe)
 
-        for host in self._hosts:
-            if host.connection == "local":
-                hosts = (
-                    hosts
-                    + f"{host.ip} ansible_connection={host.connection} ansible_python_interpreter=python3"
-                )
+        if self._shared:
+            self._build_limit()
+        else:
+            self.build_inventory()
 
-            elif host.password != "":
-                hosts = (
-                    hosts
-                    + f"{host.ip} ansible_port={host.port} ansible_connection={host.connection} ansible_user={host.user} ansible_password={host.password} ansible_python_interpreter=python3"
-                )
-            else:
-                hosts = (
-                    hosts
-                    + f"{host.ip} ansible_port={host.port} ansible_connection={host.connection} ansible_user={host.user} ansible_ssh_private_key_file={self._cache}/{self._id}/{host.id}.pem ansible_python_interpreter=python3"
+        if not self._file_system.file_exists("{}/cp".format(self._cache)):
+            self._file_system.create_dirs("{}/cp".format(self._cache), 0o700)
+
+        self._file_system.create_dirs("{}/{}/cache/env".format(self._cache, self._id))
+        self._file_system.write_file(
+            "{}/{}/cache/env/envvars".format(self._cache, self._id),
+            json.dumps(self.envvars()),
+        )
+
+        if self._ssh.configs["prewarm"]:
+            self.prewarm()
+
+    def build_inventory(self):
+        """Write the inventory of all hosts, removed by cleanup"""
+        self._file_system.create_dirs(self._inventory_path, 0o700)
+        self._build_inventory(self._inventory_path)
+
+    def envvars(self):
+        """The ansible environment variables of the run"""
+        envvars = self._ssh.envvars()
+        envvars.update(self._facts.envvars())
+
+        # Any extra ansible setting, e.g. ANSIBLE_FORKS
+        envvars.update(
+            {
+                k: str(v)
+                for k, v in self._configs.get("ansible", {}).get("envvars", {}).items()
+            }
+        )
+
+        return envvars
+
+    def prewarm(self):
+        """Open the ssh master connections of key based hosts before the play"""
+        return self._ssh.prewarm(
+            [
+                (
+                    host,
+                    "{}/keys/{}.pem".format(
+                        self._inventory_path, self._key_hash(host.ssh_private_key)
+                    ),
                 )
+                for host in self._hosts
+                if host.connection == "ssh"
+                and host.password == ""
+                and host.ssh_private_key != ""
+            ]
+        )
+
+    def _bundle(self, path, builder):
+        """Build a bundle in a temporary directory then move it in place"""
+        tmp_path = "{}.{}".format(path, self._id)
+
+        self._file_system.create_dirs(tmp_path, 0o700)
+
+        try:
+            builder(tmp_path, path)
+            self._file_system.rename(tmp_path, path)
+        except OSError:
+            # Another run published the same bundle first
+            if not self._file_system.file_exists(path):
+                raise
+        finally:
+            if self._file_system.file_exists(tmp_path):
+                self._file_system.delete_directory(tmp_path)
+
+    def _build_limit(self):
+        """Write the names of the hosts to run towards out of a shared inventory"""
+        with open("{}/{}/limit".format(self._cache, self._id), "w") as f:
+            for host in self._hosts:
+                f.write(host.name + "\n")
+
+    def _build_inventory(self, path):
+        """Stream the inventory to disk and write each distinct key once"""
+        self._file_system.create_dirs("{}/keys".format(path), 0o700)
+
+        written = set()
+        groups = {}
+        # Group name of each tag and the tag each group name came from
+        names = {}
+        sources = {}
+
+        with open("{}/hosts".format(path), "w", buffering=1 << 16) as f:
+            f.write("[remote]\n")
+
+            for host in self._hosts:
+                # Hosts added before names got checked
+                if not Inventory.valid_name(host.name):
+                    raise ValueError(
+                        f"Invalid host name {host.name}, rename it to only have letters, digits and _ . : @ -"
+                    )
+
+                if host.connection == "local":
+                    f.write(
+                        f"{host.name} ansible_host={host.ip} ansible_connection={host.connection} ansible_python_interpreter=python3\n"
+                    )
+
+                elif host.password != "":
+                    f.write(
+                        f"{host.name} ansible_host={host.ip} ansible_port={host.port} ansible_connection={host.connection} ansible_user={host.user} ansible_password={host.password} ansible_python_interpreter=python3\n"
+                    )
+                else:
+                    key = self._key_hash(host.ssh_private_key)
+
+                    f.write(
+                        f"{host.name} ansible_host={host.ip} ansible_port={host.port} ansible_connection={host.connection} ansible_user={host.user} ansible_ssh_private_key_file={path}/keys/{key}.pem ansible_python_interpreter=python3\n"
+                    )
+
+                    if key not in written:
+                        written.add(key)
+                        self._file_system.write_file(
+                            "{}/keys/{}.pem".format(path, key),
+                            host.ssh_private_key,
+                        )
+                        self._file_system.change_permission(
+                            "{}/keys/{}.pem".format(path, key), 0o400
+                        )
+
+                # Only names are kept, the host lines are already on disk
+                for tag in host.tags:
+                    if tag not in names:
+                        names[tag] = Playbook.group_name(tag)
+
+                        # Merged hosts and overwritten group vars otherwise
+                        if sources.setdefault(names[tag], tag) != tag:
+                            raise ValueError(
+                                "Host tags {} and {} both map to the inventory group {}, rename one of them".format(
+                                    sources[names[tag]], tag, names[tag]
+                                )
+                            )
+
+                    groups.setdefault(names[tag], []).append(host.name)
+
+            # One group per host tag so a play can target any of them
+            for name, members in groups.items():
+                f.write("\n[{}]\n".format(name))
+                f.write("\n".join(members))
+                f.write("\n")
+
+        # Ansible picks group_vars up from next to the inventory file
+        self._file_system.create_dirs("{}/group_vars".format(path))
+
+        for tag, vars in self._groups.items():
+            if tag in names and vars:
                 self._file_system.write_file(
-                    "{}/{}/{}.pem".format(self._cache, self._id, host.id),
-                    host.ssh_private_key,
-                )
-                self._file_system.change_permission(
-                    "{}/{}/{}.pem".format(self._cache, self._id, host.id), 0o400
+                    "{}/group_vars/{}.json".format(path, names[tag]),
+                    json.dumps(vars),
                 )
 
-            hosts = hosts + "\n"
+    def _key_hash(self, key):
+        """Content hash of a private key, memoized as fleets share few keys"""
+        if key not in self._keys:
+            self._keys[key] = hashlib.sha256(key.encode()).hexdigest()
 
-        self._file_system.write_file("{}/{}/hosts".format(self._cache, self._id), hosts)
+        return self._keys[key]
 
-        data = yaml.load(self._recipe.recipe, Loader=yaml.Loader)
+    def _build_recipe(self, tmp_path, path):
+        """Write the playbook and the templates"""
+        playbook = self._recipe.playbook
 
-        if "templates" in data.keys():
-            for item in self._recipe.templates:
-                for key in item.keys():
-                    self._file_system.write_file(
-                        "{}/{}/{}".format(self._cache, self._id, key), item[key]
-                    )
+        # Recipes added before recipes got compiled at add time
+        if playbook is None:
+            compiler = Compiler()
+            playbook = compiler.compile(compiler.load(self._recipe.recipe))
 
-            del data["templates"]
+        for item in self._recipe.templates:
+            for key in item.keys():
+                self._file_system.write_file("{}/{}".format(tmp_path, key), item[key])
 
-        base = {
-            "hosts": "remote",
-        }
+        self._file_system.write_file("{}/playbook.yml".format(tmp_path), playbook)
 
-        base.update(data)
-        playbook = [base]
-        self._file_system.write_file(
-            "{}/{}/playbook.yml".format(self._cache, self._id), yaml.dump(playbook)
-        )
+    def run(self, quiet=False, event_handler=None):
+        """
+        Run Ansible Playbook
+
+        Args:
+            quiet: Whether to hide ansible output
+            event_handler: An optional callable invoked with every runner event
+
+        Returns:
+            Whether the run succeeded
+        """
+        import ansible_runner
 
-    def run(self):
-        """Run Ansible Playbook"""
-        out = ansible_runner.run(
+        def handler(event):
+            if event.get("event") == "playbook_on_stats":
+                self._stats = {
+                    key: event.get("event_data", {}).get(key, {})
+                    for key in Playbook.STATS
+                }
+
+            if event_handler is not None:
+                event_handler(event)
+
+            # Events are consumed as they arrive, never persist them
+            return False
+
+        thread, runner = ansible_runner.run_async(
             private_data_dir="{}/{}/cache".format(self._cache, self._id),
-            playbook="{}/{}/playbook.yml".format(self._cache, self._id),
-            inventory="{}/{}/hosts".format(self._cache, self._id),
+            playbook="{}/playbook.yml".format(self._recipe_path),
+            inventory="{}/hosts".format(self._inventory_path),
+            quiet=quiet,
+            event_handler=handler,
+            # Absolute, so the cache outlives the per-run artifacts
+            fact_cache=self._facts.path,
+            limit=(
+                "@{}/{}/limit".format(self._cache, self._id) if self._shared else None
+            ),
         )
 
-        if out.status.lower() == "failed":
+        thread.join()
+
+        if runner.status.lower() == "failed":
             return False
 
-        elif out.status.lower() == "successful":
+        elif runner.status.lower() == "successful":
             return True
 
         return False
 
+    @property
+    def stats(self):
+        """Ansible stats of the last run, keyed by counter then host name"""
+        return self._stats
+
     def cleanup(self):
-        """Cleanup Playbook Directory"""
+        """Cleanup Playbook Directory and evict unused recipe bundles"""
         try:
             self._file_system.delete_directory("{}/{}".format(self._cache, self._id))
         except Exception:
             pass
+
+        self.evict()
+
+    def evict(self):
+        """
+        Delete the recipe bundles no run used for a while
+
+        Returns:
+            The number of bundles deleted
+        """
+        max_age = self._configs.get("cache", {}).get(
+            "bundle_max_age", Playbook.BUNDLE_MAX_AGE
+        )
+        path = "{}/bundle/recipe".format(self._cache)
+        count = 0
+
+        # Inventory bundles of former versions hold passwords and keys
+        if self._file_system.file_exists("{}/bundle/inventory".format(self._cache)):
+            self._file_system.delete_directory(
+                "{}/bundle/inventory".format(self._cache)
+            )
+
+        try:
+            names = os.listdir(path)
+        except OSError:
+            return 0
+
+        for name in names:
+            try:
+                if time.time() - os.path.getmtime(os.path.join(path, name)) > max_age:
+                    self._file_system.delete_directory(os.path.join(path, name))
+                    count += 1
+            except OSError:
+                # Used or evicted by another run meanwhile
+                continue
+
+        return count
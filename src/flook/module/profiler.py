@@ -0,0 +1,88 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import sys
+import threading
+
+
+class Profiler:
+    """Profiler Class"""
+
+    # Seconds between two stack samples of the collapsed stacks mode
+    INTERVAL = 0.005
+
+    def __init__(self, path):
+        """Class Constructor"""
+        self._path = path
+        self._profile = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._stacks = {}
+
+    def start(self):
+        """Start profiling the calling thread"""
+        if self._path.endswith(".prof"):
+            import cProfile
+
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            return
+
+        # Anything but a .prof file gets collapsed stacks, sampled so the
+        # whole call path of each stack is kept
+        self._ident = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop profiling and write the profile"""
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self._path)
+            return
+
+        self._stop.set()
+        self._thread.join()
+
+        with open(self._path, "w") as f:
+            for stack, count in sorted(self._stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+    def _sample(self):
+        """Count the stacks of the profiled thread until stopped"""
+        while not self._stop.wait(Profiler.INTERVAL):
+            frame = sys._current_frames().get(self._ident)
+            names = []
+
+            while frame is not None:
+                names.append(
+                    "{}:{}:{}".format(
+                        frame.f_code.co_filename,
+                        frame.f_code.co_name,
+                        frame.f_code.co_firstlineno,
+                    )
+                )
+                frame = frame.f_back
+
+            if len(names) > 0:
+                stack = ";".join(reversed(names))
+                self._stacks[stack] = self._stacks.get(stack, 0) + 1
@@ -0,0 +1,197 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import math
+
+from flook.module.playbook import Playbook
+from flook.module.phases import Phases
+from flook.module.executor import Executor
+
+
+class Rollout:
+    """Rollout Class"""
+
+    def __init__(
+        self,
+        id,
+        cache,
+        hosts,
+        recipe,
+        serial,
+        canary="",
+        max_fail=0,
+        parallel=1,
+        configs=None,
+        groups=None,
+    ):
+        """Class Constructor"""
+        self._id = id
+        self._cache = cache
+        self._hosts = hosts
+        self._recipe = recipe
+        self._serial = serial
+        self._canary = canary
+        self._max_fail = max_fail
+        self._parallel = parallel
+        self._configs = configs
+        self._groups = groups
+
+    @staticmethod
+    def size(value, total):
+        """
+        Get a batch size out of a count or a percentage of the hosts
+
+        Args:
+            value: The batch size e.g. 10 or 25%
+            total: The number of hosts
+
+        Returns:
+            The number of hosts of the batch, at least one
+
+        Raises:
+            ValueError: If the value is not a positive count or percentage
+        """
+        value = str(value).strip()
+
+        try:
+            if value.endswith("%"):
+                size = math.ceil(total * float(value[:-1]) / 100)
+            else:
+                size = int(value)
+        except ValueError:
+            raise ValueError(f"Invalid batch size {value}")
+
+        if size < 1 and not value.endswith("%"):
+            raise ValueError(f"Invalid batch size {value}")
+
+        return max(1, size)
+
+    def batches(self):
+        """Split hosts into the canary batch then batches of the serial size"""
+        total = len(self._hosts)
+        serial = Rollout.size(self._serial, total)
+        batches = []
+        start = 0
+
+        if self._canary != "":
+            start = min(Rollout.size(self._canary, total), total)
+            batches.append(self._hosts[:start])
+
+        for index in range(start, total, serial):
+            batches.append(self._hosts[index : index + serial])
+
+        return batches
+
+    def run(self, listener=None, quiet=False):
+        """
+        Run the recipe batch after batch, stop once the failure rate passes
+        the threshold
+
+        Args:
+            listener: An optional callable receiving compact events as they happen
+            quiet: Whether to hide ansible output
+
+        Returns:
+            A tuple of the overall status and the per host results, hosts of
+            batches that did not run are skipped
+        """
+        batches = self.batches()
+
+        # One inventory of all hosts, each batch limits the play to its hosts
+        inventory = Playbook(
+            self._id,
+            self._cache,
+            self._hosts,
+            self._recipe,
+            self._configs,
+            self._groups,
+        )
+
+        with Phases.measure("build"):
+            inventory.build_inventory()
+
+        try:
+            return self._run(batches, inventory.inventory_path, listener, quiet)
+        finally:
+            with Phases.measure("cleanup"):
+                inventory.cleanup()
+
+    def _run(self, batches, inventory, listener, quiet):
+        """Run the batches one after the other"""
+        results = {}
+        status = True
+        failed = 0
+
+        for index, batch in enumerate(batches):
+            if listener is not None:
+                listener(
+                    {
+                        "event": "batch",
+                        "batch": index + 1,
+                        "batches": len(batches),
+                        "hosts": len(batch),
+                    }
+                )
+
+            # The recipe bundle is content addressed, only the first batch builds it
+            batch_status, batch_results = Executor(
+                "{}-{}".format(self._id, index),
+                self._cache,
+                batch,
+                self._recipe,
+                self._parallel,
+                self._configs,
+                self._groups,
+                inventory,
+            ).run(listener, quiet)
+
+            results.update(batch_results)
+            status = status and batch_status
+            failed += len(
+                [
+                    result
+                    for result in batch_results.values()
+                    if result["status"] != "ok"
+                ]
+            )
+
+            if failed * 100 > self._max_fail * len(results):
+                for host in self._hosts[len(results) :]:
+                    results[host.name] = self._skipped()
+                return False, results
+
+        return status, results
+
+    def _skipped(self):
+        """The result of a host left out after the rollout stopped"""
+        return {
+            "status": "skipped",
+            "ok": 0,
+            "changed": 0,
+            "failed": 0,
+            "unreachable": 0,
+            "skipped": 0,
+            "started_at": None,
+            "finished_at": None,
+            "duration": None,
+        }
@@ -0,0 +1,204 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import re
+import ipaddress
+
+
+class Selector:
+    """Selector Class"""
+
+    # A term is field:value, values end at whitespace or an operator
+    TOKEN = re.compile(r"\s*(?:([()&|!])|(\w+):([^\s()&|!]+))")
+
+    GLOB = re.compile(r"[*?\[]")
+
+    def compile(self, expression):
+        """
+        Compile a host selector into a SQL condition on the host table
+
+        Terms are tag:<tag>, name:<name>, ip:<ip or cidr> and connection:<type>,
+        tag, name and ip accept globs. Terms combine with & (and), | (or), !
+        (not) and parentheses, & binds tighter than |.
+
+        Args:
+            expression: The selector e.g. "tag:web & !tag:canary | name:db-*"
+
+        Returns:
+            A tuple of the condition and its parameters
+
+        Raises:
+            ValueError: If the selector is invalid
+        """
+        self._tokens = self._tokenize(expression)
+        self._position = 0
+        self._params = []
+
+        if len(self._tokens) == 0:
+            raise ValueError("Empty host selector")
+
+        condition = self._or()
+
+        if self._position < len(self._tokens):
+            raise ValueError(
+                "Unexpected {} in host selector".format(
+                    self._describe(self._tokens[self._position])
+                )
+            )
+
+        return condition, self._params
+
+    def _tokenize(self, expression):
+        """Split a selector into operators and field:value terms"""
+        tokens = []
+        position = 0
+        expression = expression.rstrip()
+
+        while position < len(expression):
+            match = Selector.TOKEN.match(expression, position)
+
+            if match is None:
+                raise ValueError(
+                    f"Invalid host selector near {expression[position:].strip()}"
+                )
+
+            if match.group(1):
+                tokens.append(("op", match.group(1)))
+            else:
+                tokens.append(("term", (match.group(2), match.group(3))))
+
+            position = match.end()
+
+        return tokens
+
+    def _describe(self, token):
+        """Write a token back the way it was in the selector"""
+        kind, value = token
+
+        return "{}:{}".format(*value) if kind == "term" else value
+
+    def _peek(self):
+        """The current operator, None at a term or the end"""
+        if (
+            self._position < len(self._tokens)
+            and self._tokens[self._position][0] == "op"
+        ):
+            return self._tokens[self._position][1]
+
+        return None
+
+    def _or(self):
+        """or := and ('|' and)*"""
+        conditions = [self._and()]
+
+        while self._peek() == "|":
+            self._position += 1
+            conditions.append(self._and())
+
+        return (
+            conditions[0]
+            if len(conditions) == 1
+            else "({})".format(" OR ".join(conditions))
+        )
+
+    def _and(self):
+        """and := not ('&' not)*"""
+        conditions = [self._not()]
+
+        while self._peek() == "&":
+            self._position += 1
+            conditions.append(self._not())
+
+        return (
+            conditions[0]
+            if len(conditions) == 1
+            else "({})".format(" AND ".join(conditions))
+        )
+
+    def _not(self):
+        """not := '!' not | '(' or ')' | term"""
+        if self._position >= len(self._tokens):
+            raise ValueError("Unexpected end of host selector")
+
+        kind, value = self._tokens[self._position]
+        self._position += 1
+
+        if kind == "term":
+            return self._term(*value)
+
+        if value == "!":
+            return "NOT {}".format(self._not())
+
+        if value == "(":
+            condition = self._or()
+
+            if self._peek() != ")":
+                raise ValueError("Missing ) in host selector")
+
+            self._position += 1
+
+            return condition
+
+        raise ValueError(f"Unexpected {value} in host selector")
+
+    def _term(self, field, value):
+        """Compile a field:value term"""
+        operator = "GLOB" if Selector.GLOB.search(value) else "="
+
+        if field == "tag":
+            self._params.append(value)
+            return f"id IN (SELECT hostId FROM host_tag WHERE tag {operator} ?)"
+
+        if field == "name":
+            self._params.append(value)
+            return f"name {operator} ?"
+
+        if field == "connection":
+            self._params.append(value)
+            return "connection = ?"
+
+        if field == "ip":
+            return self._ip(value, operator)
+
+        raise ValueError(f"Unknown host selector field {field}")
+
+    def _ip(self, value, operator):
+        """Compile an ip term, IPv4 addresses and ranges use the numeric index"""
+        try:
+            network = ipaddress.ip_network(value, strict=False)
+        except ValueError:
+            # Hostnames and globs match the ip as written
+            self._params.append(value)
+            return f"ip {operator} ?"
+
+        if network.version == 4:
+            self._params.extend(
+                [int(network.network_address), int(network.broadcast_address)]
+            )
+            return "ipv4 BETWEEN ? AND ?"
+
+        if network.num_addresses == 1:
+            self._params.append(value)
+            return "ip = ?"
+
+        raise ValueError(f"Only IPv4 ranges are supported, got {value}")
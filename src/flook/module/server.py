@@ -0,0 +1,169 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import io
+import os
+import sys
+import json
+import signal
+import threading
+import socket
+import contextlib
+import socketserver
+
+import click
+
+from flook.module.database import Database
+
+
+class Server:
+    """Server Class"""
+
+    def __init__(self, path):
+        """Class Constructor"""
+        self._path = path
+
+    def run(self):
+        """Serve commands until interrupted"""
+        if os.path.exists(self._path):
+            if self._alive():
+                raise click.ClickException(f"flook is already serving on {self._path}")
+
+            # Left behind by a server that did not shut down cleanly
+            os.unlink(self._path)
+
+        # Keep one database connection per path for the life of the server
+        Database.POOL = {}
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+
+        self._server = socketserver.UnixStreamServer(self._path, self._handler())
+        os.chmod(self._path, 0o600)
+
+        click.echo(f"Serving on {self._path}")
+
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+            os.unlink(self._path)
+
+            for connection in Database.POOL.values():
+                connection.close()
+
+            Database.POOL = None
+
+    def stop(self):
+        """Stop serving, called from another thread than run"""
+        self._server.shutdown()
+
+    def handle(self, request):
+        """
+        Run a command the way the command line would
+
+        Args:
+            request: A dict of the command arguments, the client cwd and
+                the client environment flook reads
+
+        Returns:
+            A dict of the exit code and the command stdout and stderr
+        """
+        from flook.cli import main
+
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        code = 0
+
+        os.chdir(request.get("cwd", "/"))
+
+        # Configs and database are found from HOME, so each client gets its
+        # own, the pool and the configs cache are keyed by path
+        env = request.get("env", {})
+        saved = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(
+            stderr
+        ), self._restore(saved):
+            try:
+                main.main(request["args"], prog_name="flook", standalone_mode=False)
+            except click.ClickException as e:
+                e.show()
+                code = e.exit_code
+            except click.exceptions.Exit as e:
+                code = e.exit_code
+            except click.exceptions.Abort:
+                click.echo("Aborted!", err=True)
+                code = 1
+            except Exception as e:
+                click.echo(f"Error: {e}", err=True)
+                code = 1
+
+        return {"code": code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+    @contextlib.contextmanager
+    def _restore(self, saved):
+        """Put the server environment back once a command ran"""
+        try:
+            yield
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+    def _handler(self):
+        """Build the request handler, requests are served one at a time"""
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+
+                if not line:
+                    return
+
+                try:
+                    response = server.handle(json.loads(line))
+                except ValueError as e:
+                    response = {"code": 1, "stdout": "", "stderr": f"Error: {e}\n"}
+
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+
+        return Handler
+
+    def _alive(self):
+        """Whether a server answers on the socket"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            sock.connect(self._path)
+            return True
+        except OSError:
+            return False
+        finally:
+            sock.close()
@@ -0,0 +1,138 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Ssh:
+    """Ssh Class"""
+
+    # Defaults tunable from the ssh section of the configs
+    DEFAULTS = {
+        "multiplexing": True,
+        "control_persist": "300s",
+        "pipelining": True,
+        "prewarm": False,
+        "prewarm_workers": 32,
+        "prewarm_timeout": 30,
+        "prewarm_accept_new_keys": False,
+    }
+
+    def __init__(self, control_dir, configs=None):
+        """Class Constructor"""
+        self._control_dir = control_dir
+        self._configs = dict(Ssh.DEFAULTS)
+        self._configs.update(configs or {})
+
+    @property
+    def configs(self):
+        """Ssh configs merged with the defaults"""
+        return self._configs
+
+    def envvars(self):
+        """
+        Get the ansible environment variables of the ssh settings
+
+        Returns:
+            A dict of environment variables
+        """
+        envvars = {
+            "ANSIBLE_PIPELINING": str(bool(self._configs["pipelining"])),
+        }
+
+        if self._configs["multiplexing"]:
+            # %C hashes host, port and user, short enough for socket paths
+            envvars["ANSIBLE_SSH_ARGS"] = " ".join(self.multiplexing_options())
+            envvars["ANSIBLE_SSH_CONTROL_PATH_DIR"] = self._control_dir
+            envvars["ANSIBLE_SSH_CONTROL_PATH"] = "%(directory)s/%%C"
+
+        return envvars
+
+    def multiplexing_options(self):
+        """The ssh options sharing one master connection per host"""
+        return [
+            "-C",
+            "-o",
+            "ControlMaster=auto",
+            "-o",
+            "ControlPersist={}".format(self._configs["control_persist"]),
+        ]
+
+    def prewarm(self, targets):
+        """
+        Open master connections to hosts in parallel
+
+        Args:
+            targets: A list of (host, key file path) tuples
+
+        Returns:
+            The number of hosts a master connection got opened to
+        """
+        if not self._configs["multiplexing"] or len(targets) == 0:
+            return 0
+
+        workers = min(int(self._configs["prewarm_workers"]), len(targets))
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return sum(pool.map(lambda target: self._connect(*target), targets))
+
+    def _connect(self, host, key_path):
+        """Open a master connection to a host"""
+        command = (
+            ["ssh"]
+            + self.multiplexing_options()
+            + [
+                "-o",
+                "ControlPath={}/%C".format(self._control_dir),
+                "-o",
+                "BatchMode=yes",
+            ]
+            + (
+                # Opt in, trusts unknown hosts but still rejects changed keys
+                ["-o", "StrictHostKeyChecking=accept-new"]
+                if self._configs["prewarm_accept_new_keys"]
+                else []
+            )
+            + [
+                "-i",
+                key_path,
+                "-p",
+                str(host.port),
+                f"{host.user}@{host.ip}",
+                "true",
+            ]
+        )
+
+        try:
+            result = subprocess.run(
+                command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=int(self._configs["prewarm_timeout"]),
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return 0
+
+        return 1 if result.returncode == 0 else 0
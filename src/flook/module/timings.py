@@ -0,0 +1,105 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import math
+import threading
+
+
+class Timings:
+    """Timings Class"""
+
+    BATCH = 1000
+
+    def __init__(self, listener=None, writer=None, batch=BATCH):
+        """
+        Class Constructor
+
+        Args:
+            listener: Gets every event after it is recorded
+            writer: Gets the (host, task, status, start, end, duration) rows
+                each time a batch is full, and the rest on flush. Without
+                one the rows are kept
+            batch: The number of rows to keep before writing them
+        """
+        self._listener = listener
+        self._writer = writer
+        self._batch = batch
+        self._lock = threading.Lock()
+        self._rows = []
+
+    def handle(self, item):
+        """Record the timing of a host task event then forward it"""
+        if item.get("host") and item.get("duration") is not None:
+            with self._lock:
+                self._rows.append(
+                    (
+                        item["host"],
+                        item.get("task", ""),
+                        item["event"],
+                        item.get("start"),
+                        item.get("end"),
+                        round(item["duration"], 3),
+                    )
+                )
+
+                if len(self._rows) >= self._batch:
+                    self._write()
+
+        if self._listener is not None:
+            self._listener(item)
+
+    def flush(self):
+        """Write the rows left"""
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        """Hand the rows to the writer, the lock is held"""
+        if self._writer is None or len(self._rows) == 0:
+            return
+
+        rows, self._rows = self._rows, []
+        self._writer(rows)
+
+    @property
+    def rows(self):
+        """The recorded rows not written yet"""
+        return self._rows
+
+    @staticmethod
+    def percentile(values, percent):
+        """
+        Get a percentile by the nearest rank method
+
+        Args:
+            values: A list of numbers
+            percent: The percentile between 0 and 100
+
+        Returns:
+            The percentile or None for no values
+        """
+        if len(values) == 0:
+            return None
+
+        values = sorted(values)
+
+        return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
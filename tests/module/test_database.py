@@ -0,0 +1,383 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+import pickle
+import sqlite3
+import pytest
+from flook.model.host import Host
+from flook.model.task import Task
+from flook.model.group import Group
+from flook.model.recipe import Recipe
+from flook.module.database import Database
+
+
+def _host(name, tags):
+    return Host(name, name, "ssh", "127.0.0.1", 22, "root", "", "", tags, None, None)
+
+
+def test_migrate(tmp_path):
+    """Database Migrate Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+    database.migrate()
+
+    assert database.schema_version() == len(Database.MIGRATIONS)
+
+
+def test_hosts(tmp_path):
+    """Database Hosts Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+
+    database.insert_host(_host("web-1", ["web", "eu"]))
+    database.insert_host(_host("db-1", ["db"]))
+
+    assert database.get_host("web-1").tags == ["eu", "web"]
+    assert database.get_host("missing") is None
+    assert [host.name for host in database.list_hosts("db")] == ["db-1"]
+    assert len(database.list_hosts()) == 2
+
+    with pytest.raises(sqlite3.IntegrityError):
+        database.insert_host(_host("web-1", []))
+
+    database.delete_host("web-1")
+
+    assert database.list_hosts("web") == []
+
+
+def test_recipes(tmp_path):
+    """Database Recipes Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+
+    database.insert_recipe(Recipe("1", "ping", "tasks: []", [], ["net"], None, None))
+
+    assert database.get_recipe("ping").tags == ["net"]
+    assert [recipe.name for recipe in database.list_recipes("net")] == ["ping"]
+    assert database.list_recipes("web") == []
+
+
+def test_legacy_migration(tmp_path):
+    """Database Legacy Migration Tests"""
+    connection = sqlite3.connect(str(tmp_path / "flook.db"))
+    connection.executescript("".join([s + ";" for s in Database.MIGRATIONS[0]]))
+    connection.execute(
+        "INSERT INTO host VALUES ('1', 'web-1', ?, datetime('now'), datetime('now'))",
+        (
+            json.dumps(
+                {
+                    "connection": "ssh",
+                    "ip": "10.0.0.1",
+                    "port": 22,
+                    "user": "root",
+                    "password": "",
+                    "ssh_private_key": "key",
+                    "tags": ["web"],
+                }
+            ),
+        ),
+    )
+    connection.commit()
+    connection.close()
+
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+
+    host = database.list_hosts("web")[0]
+
+    assert host.name == "web-1"
+    assert host.ip == "10.0.0.1"
+    assert host.ssh_private_key == "key"
+
+
+def test_tasks(tmp_path):
+    """Database Tasks Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+
+    database.save_task(Task("1", "ping", "running", {"tag": "web"}, {}, None, None))
+    database.save_task(Task("1", "ping", "failed", {"tag": "web"}, {}, None, None))
+    database.insert_task_hosts(
+        "1",
+        {
+            "web-1": {
+                "status": "failed",
+                "ok": 1,
+                "changed": 0,
+                "failed": 1,
+                "unreachable": 0,
+                "skipped": 0,
+                "started_at": None,
+                "finished_at": None,
+                "duration": 1.5,
+            }
+        },
+    )
+
+    assert database.get_task("1").status == "failed"
+    assert database.get_task("1").payload == {"tag": "web"}
+    assert [task.id for task in database.list_tasks("failed")] == ["1"]
+    assert database.list_tasks("running") == []
+    assert database.list_task_hosts("1")["web-1"]["duration"] == 1.5
+
+
+def test_groups(tmp_path):
+    """Database Groups Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+
+    database.save_group(Group("web", {"port": 80}, None, None))
+    database.save_group(Group("web", {"port": 8080}, None, None))
+    database.save_group(Group("db", {}, None, None))
+
+    assert database.get_group("web").vars == {"port": 8080}
+    assert database.get_group("missing") is None
+    assert [group.name for group in database.list_groups()] == ["db", "web"]
+
+    database.delete_group("web")
+
+    assert [group.name for group in database.list_groups()] == ["db"]
+
+
+def test_insert_hosts(tmp_path):
+    """Database Insert Hosts Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+
+    database.insert_host(_host("web-1", ["old"]))
+
+    with pytest.raises(sqlite3.IntegrityError):
+        database.insert_hosts(iter([_host("web-2", []), _host("web-1", [])]))
+
+    assert database.get_host("web-2") is None
+
+    hosts = (_host(f"web-{i}", ["web"]) for i in range(1, 2500))
+
+    assert database.insert_hosts(hosts, True) == 2499
+    assert database.get_host("web-1").tags == ["web"]
+    assert len(database.list_hosts("web")) == 2499
+
+
+def test_connect(tmp_path):
+    """Database Connect Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"), {"synchronous": "full"})
+    database.migrate()
+
+    connection = database._connection
+
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert connection.execute("PRAGMA synchronous").fetchone()[0] == 2
+    assert connection.execute("PRAGMA user_version").fetchone()[0] == len(
+        Database.MIGRATIONS
+    )
+
+    with pytest.raises(ValueError):
+        Database().connect(str(tmp_path / "flook.db"), {"cache_size": "1; DROP"})
+
+
+def test_queue(tmp_path):
+    """Database Queue Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+
+    for id, tags in (("a", ["db"]), ("b", ["db", "eu"]), ("c", ["web"])):
+        database.enqueue_task(Task(id, "ping", "queued", {}, {}, None, None), tags)
+
+    assert database.count_tasks("queued") == 3
+
+    # The second db run waits until the first one is done
+    assert database.claim_task({"db": 1}).id == "a"
+    assert database.claim_task({"db": 1}).id == "c"
+    assert database.claim_task({"db": 1}) is None
+
+    database.save_task(Task("a", "ping", "successful", {}, {}, None, None))
+
+    task = database.claim_task({"db": 1})
+
+    assert task.id == "b"
+    assert task.status == "claimed"
+    assert database.get_task("b").status == "claimed"
+    assert database.count_tasks("queued") == 0
+
+    # Another connection never claims the same task
+    database.enqueue_task(Task("d", "ping", "queued", {}, {}, None, None), [])
+    other = Database()
+    other.connect(str(tmp_path / "flook.db"))
+
+    assert other.claim_task().id == "d"
+    assert database.claim_task() is None
+
+
+def test_task_leases(tmp_path):
+    """Database Task Leases Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+
+    for id in ("a", "b", "c"):
+        database.enqueue_task(Task(id, "ping", "queued", {}, {}, None, None), ["db"])
+
+    assert database.claim_task({"db": 2}).id == "a"
+    assert database.claim_task({"db": 2}).id == "b"
+    assert database.claim_task({"db": 2}) is None
+
+    # The worker of a and b died, b had started its run
+    database.save_task(Task("b", "ping", "running", {}, {}, None, None))
+    database._connection.execute(
+        "UPDATE task_lease SET expiresAt = datetime('now', '-1 seconds')"
+    )
+    database._connection.commit()
+
+    assert database.claim_task({"db": 2}).id == "a"
+    assert database.get_task("b").status == "failed"
+    assert database.get_task("b").result == {"error": "The worker lease expired"}
+    assert database.claim_task({"db": 2}).id == "c"
+
+    # Renewed leases hold, released ones are gone
+    assert database.renew_tasks(["a", "c"], 60) == 2
+    assert database.release_task("c") == 1
+    assert database.claim_task({"db": 2}) is None
+    assert database.get_task("a").status == "claimed"
+
+
+def test_host_states(tmp_path):
+    """Database Host States Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+
+    database.insert_host(_host("web-1", ["web"]))
+    database.insert_host(_host("web-2", ["web"]))
+    database.insert_recipe(Recipe("r", "ping", "tasks: []", [], [], None, None))
+
+    database.save_host_states(
+        "r", "1", [("web-1", "a", "ok"), ("web-2", "a", "failed")]
+    )
+    database.save_host_states("r", "2", [("web-2", "b", "ok")])
+
+    states = database.list_host_states("r")
+
+    assert states["web-1"]["hash"] == "a"
+    assert states["web-2"]["hash"] == "b"
+    assert states["web-2"]["status"] == "ok"
+    assert states["web-2"]["task_id"] == "2"
+
+    database.delete_host("web-1")
+
+    assert list(database.list_host_states("r").keys()) == ["web-2"]
+
+
+def test_templates(tmp_path, monkeypatch):
+    """Database Templates Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+
+    database.insert_recipe(
+        Recipe("1", "a", "", [{"x.j2": "x" * 1000}, {"y.j2": "y"}], [], None, None)
+    )
+    database.insert_recipe(Recipe("2", "b", "", [{"z.j2": "x" * 1000}], [], None, None))
+
+    # Same content, one blob, stored compressed
+    rows = database._connection.execute(
+        "SELECT size, length(data) FROM blob"
+    ).fetchall()
+
+    assert sorted(rows)[1][0] == 1000
+    assert sorted(rows)[1][1] < 100
+    assert len(rows) == 2
+
+    # Listings never load templates
+    def fail(path, hashes):
+        raise AssertionError("templates loaded")
+
+    monkeypatch.setattr(Database, "load_templates", staticmethod(fail))
+
+    assert [recipe.name for recipe in database.list_recipes()] == ["a", "b"]
+    assert sorted(database.get_recipe("a").template_hashes.keys()) == ["x.j2", "y.j2"]
+
+    monkeypatch.undo()
+
+    # Loaded on first use, even from another process
+    recipe = pickle.loads(pickle.dumps(database.get_recipe("a")))
+
+    assert recipe.templates == [{"x.j2": "x" * 1000}, {"y.j2": "y"}]
+
+    # Same content twice in one recipe
+    database.insert_recipe(
+        Recipe("3", "c", "", [{"u.j2": "u"}, {"v.j2": "u"}], [], None, None)
+    )
+
+    assert database.get_recipe("c").templates == [{"u.j2": "u"}, {"v.j2": "u"}]
+
+    database.delete_recipe("c")
+    database.delete_recipe("a")
+
+    assert database._connection.execute("SELECT COUNT(*) FROM blob").fetchone()[0] == 1
+    assert database.get_recipe("b").templates == [{"z.j2": "x" * 1000}]
+
+
+def test_templates_migration(tmp_path, monkeypatch):
+    """Database Templates and Playbook Migration Tests"""
+    migrations = Database.MIGRATIONS
+    monkeypatch.setattr(Database, "MIGRATIONS", migrations[:8])
+
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+    database._connection.execute(
+        "INSERT INTO recipe VALUES ('1', 'motd', ?, datetime('now'), datetime('now'))",
+        (
+            json.dumps(
+                {
+                    "recipe": "",
+                    "templates": [{"motd.j2": "hello"}],
+                    "data": {},
+                    "playbook": "- hosts: remote\n",
+                }
+            ),
+        ),
+    )
+    database._connection.commit()
+
+    monkeypatch.setattr(Database, "MIGRATIONS", migrations)
+    database.migrate()
+
+    recipe = database.get_recipe("motd")
+
+    assert recipe.templates == [{"motd.j2": "hello"}]
+    assert recipe.template_hashes == {"motd.j2": Database.sha256("hello")}
+    assert recipe.playbook == "- hosts: remote\n"
+    assert json.loads(
+        database._connection.execute("SELECT config FROM recipe").fetchone()[0]
+    ) == {"recipe": ""}
@@ -0,0 +1,100 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import io
+import json
+from flook.module.events import Events
+
+
+def _event(name, **data):
+    return {
+        "event": name,
+        "event_data": dict(
+            {"host": "web-1", "task": "install", "start": "s", "end": "e"}, **data
+        ),
+    }
+
+
+def test_compact():
+    """Events Compact Tests"""
+    assert Events.compact(_event("playbook_on_task_start")) == {
+        "event": "task",
+        "task": "install",
+    }
+    assert Events.compact(_event("runner_on_start")) is None
+    assert Events.compact(_event("playbook_on_stats")) is None
+    assert Events.compact({"event": "verbose", "stdout": "x"}) is None
+
+    item = Events.compact(_event("runner_on_ok", res={"changed": True}))
+
+    assert item["event"] == "ok"
+    assert item["host"] == "web-1"
+    assert item["changed"]
+    assert "msg" not in item
+
+    item = Events.compact(
+        _event("runner_on_failed", ignore_errors=True, res={"msg": "boom"})
+    )
+
+    assert item["event"] == "ignored"
+
+    item = Events.compact(_event("runner_on_failed", res={"msg": "boom"}))
+
+    assert item["event"] == "failed"
+    assert item["msg"] == "boom"
+
+    item = Events.compact(
+        _event("runner_on_unreachable", res={"msg": "Connection timed out"})
+    )
+
+    assert item["event"] == "unreachable"
+    assert item["msg"] == "Connection timed out"
+    assert not item["changed"]
+
+
+def test_ndjson():
+    """Events NDJSON Tests"""
+    stream = io.StringIO()
+    events = Events(Events.NDJSON, stream)
+
+    events.handle(Events.compact(_event("runner_on_ok", res={})))
+    events.summary("web-1", {"status": "ok", "ok": 1})
+    events.close()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    assert [line["event"] for line in lines] == ["ok", "summary"]
+    assert lines[1] == {"event": "summary", "host": "web-1", "status": "ok", "ok": 1}
+
+
+def test_progress():
+    """Events Progress Tests"""
+    stream = io.StringIO()
+    events = Events(Events.PROGRESS, stream)
+
+    events.handle({"event": "task", "task": "install"})
+    events.handle(Events.compact(_event("runner_on_failed", res={"msg": "boom"})))
+    events.close()
+
+    assert "FAILED [web-1] install: boom\n" in stream.getvalue()
+    assert stream.getvalue().endswith("failed=1 unreachable=0 | install\n")
@@ -0,0 +1,116 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from flook.model.host import Host
+from flook.module import executor
+from flook.module.executor import Executor
+
+
+def _hosts(count):
+    return [
+        Host(str(i), f"host-{i}", "local", "127.0.0.1", 22, "", "", "", [], None, None)
+        for i in range(count)
+    ]
+
+
+def _stats(hosts, failed=(), dark=()):
+    """Ansible stats of a shard, hosts missing from processed never ran"""
+    names = [host.name for host in hosts]
+    return {
+        "ok": {name: 2 for name in names},
+        "changed": {name: 1 for name in names},
+        "failures": {name: 1 for name in names if name in failed},
+        "dark": {name: 1 for name in names if name in dark},
+        "skipped": {},
+        "processed": {name: 1 for name in names},
+    }
+
+
+def test_shards():
+    """Executor Shards Tests"""
+    shards = Executor("a", "/tmp", _hosts(10), None, 3).shards()
+
+    assert [len(shard) for shard in shards] == [4, 3, 3]
+    assert [host.name for shard in shards for host in shard] == [
+        f"host-{i}" for i in range(10)
+    ]
+
+    shards = Executor("a", "/tmp", _hosts(2), None, 5).shards()
+
+    assert [len(shard) for shard in shards] == [1, 1]
+
+
+def test_run(monkeypatch):
+    """Executor Run Tests"""
+    hosts = _hosts(3)
+
+    def run_shard(id, cache, shard, recipe, quiet, listener, *args):
+        listener(
+            {
+                "event": "ok",
+                "host": "host-0",
+                "start": "2024-01-01T00:00:00",
+                "end": "2024-01-01T00:00:02",
+            }
+        )
+        return False, _stats(shard[:2], failed=["host-1"])
+
+    monkeypatch.setattr(executor, "run_shard", run_shard)
+
+    events = []
+    status, results = Executor("a", "/tmp", hosts, None).run(events.append)
+
+    assert not status
+    assert len(events) == 1
+    assert results["host-0"]["status"] == "ok"
+    assert results["host-0"]["ok"] == 2
+    assert results["host-0"]["changed"] == 1
+    assert results["host-0"]["duration"] == 2.0
+    assert results["host-1"]["status"] == "failed"
+    assert results["host-2"]["status"] == "unknown"
+    assert results["host-2"]["duration"] is None
+
+
+def test_run_shards(monkeypatch):
+    """Executor Run Shards Tests"""
+    hosts = _hosts(5)
+
+    def run_shards(self, shards, quiet, queue):
+        assert [len(shard) for shard in shards] == [3, 2]
+        return [
+            (True, _stats(shards[0])),
+            (False, _stats(shards[1], dark=["host-4"])),
+        ]
+
+    monkeypatch.setattr(Executor, "_run_shards", run_shards)
+
+    status, results = Executor("a", "/tmp", hosts, None, 2).run()
+
+    assert not status
+    assert [results[f"host-{i}"]["status"] for i in range(5)] == [
+        "ok",
+        "ok",
+        "ok",
+        "ok",
+        "unreachable",
+    ]
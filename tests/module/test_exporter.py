@@ -0,0 +1,130 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import re
+from flook.model.task import Task
+from flook.module.exporter import Exporter
+from flook.module.database import Database
+
+
+SAMPLE = re.compile(r"^([a-z_]+)(?:\{(.*)\})? (\S+)$")
+
+
+def _parse(text):
+    """Parse OpenMetrics text into samples keyed by name and labels"""
+    lines = text.rstrip("\n").split("\n")
+    samples = {}
+    families = []
+
+    assert lines[-1] == "# EOF"
+
+    for line in lines[:-1]:
+        if line.startswith("# TYPE "):
+            families.append(line.split(" ")[2])
+            continue
+
+        if line.startswith("# HELP "):
+            continue
+
+        name, labels, value = SAMPLE.match(line).groups()
+        labels = tuple(re.findall(r'([a-z]+)="((?:[^"\\]|\\.)*)"', labels or ""))
+
+        # Every sample belongs to the family declared right before it
+        assert name.startswith(families[-1])
+
+        samples[(name, labels)] = float(value)
+
+    return samples
+
+
+def test_render(tmp_path):
+    """Exporter Render Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+
+    for id, status, duration in (("1", "successful", 3), ("2", "failed", 20)):
+        database.save_task(
+            Task(
+                id,
+                "ping",
+                status,
+                {},
+                {
+                    "duration": duration,
+                    "phases": {"execute": {"wall": duration - 1, "cpu": 1}},
+                },
+                None,
+                None,
+            )
+        )
+        database.insert_task_hosts(
+            id,
+            {
+                "web-1": {
+                    "status": "ok" if status == "successful" else "failed",
+                    "ok": 1,
+                    "changed": 0,
+                    "failed": 0,
+                    "unreachable": 0,
+                    "skipped": 0,
+                    "started_at": None,
+                    "finished_at": None,
+                    "duration": duration,
+                }
+            },
+        )
+
+    database.save_task(Task("3", "ping", "queued", {}, {}, None, None))
+
+    samples = _parse(Exporter(database).render())
+
+    run = ("recipe", "ping")
+    assert samples[("flook_run_duration_seconds_bucket", (run, ("le", "1.0")))] == 0
+    assert samples[("flook_run_duration_seconds_bucket", (run, ("le", "5.0")))] == 1
+    assert samples[("flook_run_duration_seconds_bucket", (run, ("le", "30.0")))] == 2
+    assert samples[("flook_run_duration_seconds_bucket", (run, ("le", "+Inf")))] == 2
+    assert samples[("flook_run_duration_seconds_count", (run,))] == 2
+    assert samples[("flook_run_duration_seconds_sum", (run,))] == 23
+    assert (
+        samples[("flook_run_phase_duration_seconds_sum", (run, ("phase", "execute")))]
+        == 21
+    )
+    assert samples[("flook_host_results_total", (run, ("status", "ok")))] == 1
+    assert samples[("flook_host_results_total", (run, ("status", "failed")))] == 1
+    assert samples[("flook_queue_depth", ())] == 1
+    assert samples[("flook_tasks", (("status", "running"),))] == 0
+    assert samples[("flook_scrape_query_duration_seconds", (("query", "runs"),))] >= 0
+
+
+def test_export(tmp_path):
+    """Exporter Export Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+
+    Exporter(database).export(str(tmp_path / "flook.prom"))
+
+    assert _parse((tmp_path / "flook.prom").read_text())[("flook_queue_depth", ())] == 0
+    assert [path.name for path in tmp_path.iterdir() if path.suffix == ".prom"] == [
+        "flook.prom"
+    ]
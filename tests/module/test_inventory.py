@@ -0,0 +1,116 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import pytest
+from flook.module.inventory import Inventory
+
+
+def test_ini(tmp_path):
+    """Inventory INI Tests"""
+    (tmp_path / "id_rsa").write_text("KEY")
+    (tmp_path / "hosts").write_text(
+        """
+solo ansible_host=10.0.0.9
+
+[web]
+web[01:02] ansible_user=deploy ansible_ssh_private_key_file=id_rsa
+
+[db]
+db1 ansible_host=10.0.1.1 ansible_port=2222
+
+[prod:children]
+web
+db
+
+[prod:vars]
+ansible_user=ops
+"""
+    )
+
+    hosts = {host.name: host for host in Inventory(str(tmp_path / "hosts")).hosts()}
+
+    assert sorted(hosts.keys()) == ["db1", "solo", "web01", "web02"]
+    assert sorted(hosts["web01"].tags) == ["prod", "web"]
+    assert hosts["web01"].user == "deploy"
+    assert hosts["web01"].ssh_private_key == "KEY"
+    assert hosts["db1"].user == "ops"
+    assert hosts["db1"].port == 2222
+    assert hosts["solo"].ip == "10.0.0.9"
+    assert hosts["solo"].tags == []
+
+
+def test_yaml(tmp_path):
+    """Inventory YAML Tests"""
+    (tmp_path / "hosts.yml").write_text(
+        """
+all:
+  children:
+    cache:
+      hosts:
+        redis-1:
+          ansible_connection: local
+      vars:
+        ansible_user: redis
+"""
+    )
+
+    host = next(Inventory(str(tmp_path / "hosts.yml")).hosts())
+
+    assert host.name == "redis-1"
+    assert host.connection == "local"
+    assert host.user == "redis"
+    assert host.tags == ["cache"]
+
+
+def test_csv(tmp_path):
+    """Inventory CSV Tests"""
+    (tmp_path / "hosts.csv").write_text(
+        'name,ip,port,tags\nweb-1,10.0.0.1,22,"web,eu"\n,10.0.0.2,22,\n'
+    )
+
+    hosts = Inventory(str(tmp_path / "hosts.csv")).hosts()
+
+    assert next(hosts).tags == ["web", "eu"]
+
+    with pytest.raises(ValueError):
+        next(hosts)
+
+
+def test_names(tmp_path):
+    """Inventory Host Names Tests"""
+    for name in ("web-1", "web_1.example.com", "10.0.0.1", "fe80::1", "db@eu"):
+        assert Inventory.valid_name(name)
+
+    for name in ("web 1", "web=1", "web#1", "web;1", "", "[web]"):
+        assert not Inventory.valid_name(name)
+
+    (tmp_path / "hosts.jsonl").write_text(
+        '{"name": "web-1"}\n{"name": "web 1 ansible_host=10.0.0.9"}\n'
+    )
+
+    hosts = Inventory(str(tmp_path / "hosts.jsonl")).hosts()
+
+    assert next(hosts).name == "web-1"
+
+    with pytest.raises(ValueError, match="line 2"):
+        next(hosts)
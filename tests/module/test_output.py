@@ -0,0 +1,88 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+import pytest
+from io import StringIO
+from flook.module.output import Output
+
+
+ROWS = [
+    {"ID": "1", "Created at": "now"},
+    {"ID": "2", "Created at": "later"},
+]
+
+
+def test_camel_case():
+    """Output Camel Case Tests"""
+    output = Output()
+
+    assert output.camel_case("Created at") == "createdAt"
+    assert output.camel_case("ssh_private-key") == "sshPrivateKey"
+
+
+def test_format():
+    """Output Format Tests"""
+    assert Output.format("JSON") == Output.JSON
+    assert Output.format("jsonl") == Output.JSONL
+    assert Output.format("") == Output.DEFAULT
+
+
+@pytest.mark.parametrize(
+    "typ,expected",
+    [
+        (
+            Output.JSON,
+            json.dumps(
+                [{"id": "1", "createdAt": "now"}, {"id": "2", "createdAt": "later"}]
+            )
+            + "\n",
+        ),
+        (
+            Output.JSONL,
+            '{"id": "1", "createdAt": "now"}\n{"id": "2", "createdAt": "later"}\n',
+        ),
+        (Output.CSV, "id,createdAt\r\n1,now\r\n2,later\r\n"),
+        (Output.YAML, "- id: '1'\n  createdAt: now\n- id: '2'\n  createdAt: later\n"),
+    ],
+)
+def test_write(typ, expected):
+    """Output Write Tests"""
+    stream = StringIO()
+
+    assert Output().write(iter(ROWS), typ, stream) == 2
+    assert stream.getvalue() == expected
+
+
+def test_write_empty():
+    """Output Write Empty Tests"""
+    stream = StringIO()
+
+    assert Output().write(iter([]), Output.JSON, stream) == 0
+    assert stream.getvalue() == ""
+
+
+def test_render():
+    """Output Render Tests"""
+    assert json.loads(Output().render(ROWS, Output.JSON))[1]["createdAt"] == "later"
+    assert "Created at" in str(Output().render(ROWS, Output.DEFAULT))
@@ -0,0 +1,66 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import io
+from flook.module.phases import Phases
+
+
+def test_measure():
+    """Phases Measure Tests"""
+    Phases.reset()
+    Phases.add("build", 1.0, 0.5)
+
+    former = Phases.records()
+
+    with Phases.measure("execute"):
+        sum(range(1000))
+
+    Phases.add("build", 0.25, 0.0)
+
+    phases = Phases.since(former)
+
+    assert sorted(phases.keys()) == ["build", "execute"]
+    assert phases["build"] == {"wall": 0.25, "cpu": 0.0}
+    assert phases["execute"]["wall"] >= 0
+    assert Phases.records()["build"]["wall"] == 1.25
+
+    Phases.reset()
+
+    assert Phases.records() == {}
+
+
+def test_report():
+    """Phases Report Tests"""
+    Phases.reset()
+    started = Phases.clock()
+    Phases.add("config", 0.5, 0.25)
+
+    stream = io.StringIO()
+    Phases.report(stream, started)
+
+    lines = stream.getvalue().splitlines()
+
+    assert lines[0].split() == ["phase", "wall", "(s)", "cpu", "(s)"]
+    assert lines[1].split() == ["config", "0.500", "0.250"]
+    assert lines[2].split()[0] == "total"
+
+    Phases.reset()
@@ -0,0 +1,344 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import json
+import pytest
+from flook.model.host import Host
+from flook.model.recipe import Recipe
+from flook.module.playbook import Playbook
+from flook.module.fact_cache import FactCache
+from flook.module.compiler import Compiler
+
+
+RECIPE = """
+templates:
+  motd.j2: motd.j2
+
+tasks:
+  - name: set motd banner
+    template:
+      src: "motd.j2"
+      dest: "/etc/motd"
+"""
+
+
+def _hosts(count):
+    return [
+        Host(
+            str(i),
+            f"host-{i}",
+            "ssh",
+            "127.0.0.1",
+            22,
+            "root",
+            "",
+            "key",
+            [],
+            None,
+            None,
+        )
+        for i in range(count)
+    ]
+
+
+def test_build(tmp_path):
+    """Playbook Build Tests"""
+    recipe = Recipe("1", "motd", RECIPE, [{"motd.j2": "{{ version }}"}], [], None, None)
+
+    first = Playbook("a", str(tmp_path), _hosts(2), recipe)
+    first.build()
+    first.cleanup()
+
+    second = Playbook("b", str(tmp_path), _hosts(2), recipe)
+    second.build()
+
+    bundle = tmp_path / "bundle" / "recipe" / first.recipe_hash()
+
+    assert first.recipe_hash() == second.recipe_hash()
+    assert (bundle / "motd.j2").read_text() == "{{ version }}"
+    assert "hosts: remote" in (bundle / "playbook.yml").read_text()
+    assert not (tmp_path / "a").exists()
+    assert (tmp_path / "b" / "cache").exists()
+    assert (tmp_path / "b" / "inventory" / "hosts").exists()
+    assert second.inventory_path == f"{tmp_path}/b/inventory"
+
+    second.cleanup()
+
+    assert not (tmp_path / "b").exists()
+    assert bundle.exists()
+
+
+def test_build_shared_inventory(tmp_path):
+    """Playbook Build Shared Inventory Tests"""
+    recipe = Recipe("1", "ping", "tasks: []", [], [], None, None)
+    hosts = _hosts(4)
+
+    inventory = Playbook("a", str(tmp_path), hosts, recipe)
+    inventory.build_inventory()
+
+    batch = Playbook(
+        "a-0", str(tmp_path), hosts[:2], recipe, None, None, inventory.inventory_path
+    )
+    batch.build()
+
+    assert (tmp_path / "a-0" / "limit").read_text() == "host-0\nhost-1\n"
+    assert not (tmp_path / "a-0" / "inventory").exists()
+
+    batch.cleanup()
+
+    assert (tmp_path / "a" / "inventory" / "hosts").exists()
+
+
+def test_evict(tmp_path):
+    """Playbook Evict Tests"""
+    recipe = Recipe("1", "ping", "tasks: []", [], [], None, None)
+
+    playbook = Playbook("a", str(tmp_path), _hosts(1), recipe)
+    playbook.build()
+
+    bundle = tmp_path / "bundle" / "recipe" / playbook.recipe_hash()
+    legacy = tmp_path / "bundle" / "inventory" / "x"
+    legacy.mkdir(parents=True)
+
+    playbook.cleanup()
+
+    assert bundle.exists()
+    assert not legacy.exists()
+
+    os.utime(bundle, (0, 0))
+
+    assert playbook.evict() == 1
+    assert not bundle.exists()
+
+
+def test_build_compiled(tmp_path):
+    """Playbook Build Compiled Recipe Tests"""
+    compiler = Compiler()
+    data = compiler.load(RECIPE)
+    recipe = Recipe(
+        "1",
+        "motd",
+        RECIPE,
+        [{"motd.j2": "{{ version }}"}],
+        [],
+        None,
+        None,
+        compiler.compile(data),
+    )
+
+    playbook = Playbook("a", str(tmp_path), _hosts(1), recipe)
+    playbook.build()
+
+    bundle = tmp_path / "bundle" / "recipe" / playbook.recipe_hash()
+
+    assert (bundle / "playbook.yml").read_text() == recipe.playbook
+    assert "templates" not in recipe.playbook
+    assert compiler.load((bundle / "playbook.yml").read_text())[0]["hosts"] == "remote"
+
+
+def test_envvars(tmp_path):
+    """Playbook Envvars Tests"""
+    recipe = Recipe("1", "ping", "tasks: []", [], [], None, None)
+
+    playbook = Playbook(
+        "a", str(tmp_path), _hosts(1), recipe, {"ssh": {"control_persist": "10s"}}
+    )
+    playbook.build()
+
+    envvars = json.loads((tmp_path / "a" / "cache" / "env" / "envvars").read_text())
+
+    assert envvars["ANSIBLE_PIPELINING"] == "True"
+    assert envvars["ANSIBLE_SSH_CONTROL_PATH_DIR"] == f"{tmp_path}/cp"
+    assert "ControlPersist=10s" in envvars["ANSIBLE_SSH_ARGS"]
+
+    playbook = Playbook(
+        "b", str(tmp_path), _hosts(1), recipe, {"ssh": {"multiplexing": False}}
+    )
+
+    assert "ANSIBLE_SSH_ARGS" not in playbook.envvars()
+
+
+def test_fact_cache(tmp_path):
+    """Playbook Fact Cache Tests"""
+    recipe = Recipe("1", "ping", "tasks: []", [], [], None, None)
+
+    playbook = Playbook("a", str(tmp_path), _hosts(1), recipe, {"facts": {"ttl": 60}})
+    envvars = playbook.envvars()
+
+    assert envvars["ANSIBLE_GATHERING"] == "smart"
+    assert envvars["ANSIBLE_CACHE_PLUGIN_TIMEOUT"] == "60"
+
+    facts = FactCache(str(tmp_path / "facts"), {"ttl": 60})
+
+    assert facts.get("host-0") is None
+
+    (tmp_path / "facts").mkdir()
+    (tmp_path / "facts" / "host-0").write_text('{"ansible_kernel": "6.1"}')
+
+    data, gathered_at, expired = facts.get("host-0")
+
+    assert data["ansible_kernel"] == "6.1"
+    assert gathered_at != ""
+    assert not expired
+
+    os.utime(tmp_path / "facts" / "host-0", (0, 0))
+
+    assert facts.get("host-0")[2]
+
+
+def test_build_keys(tmp_path):
+    """Playbook Build Shared Keys Tests"""
+    recipe = Recipe("1", "ping", "tasks: []", [], [], None, None)
+    hosts = _hosts(2) + [
+        Host(
+            "2", "host-2", "ssh", "127.0.0.1", 22, "root", "", "another", [], None, None
+        )
+    ]
+
+    playbook = Playbook("a", str(tmp_path), hosts, recipe)
+    playbook.build()
+
+    bundle = tmp_path / "a" / "inventory"
+    keys = [
+        line.split()[5].split("=")[1]
+        for line in (bundle / "hosts").read_text().splitlines()[1:]
+    ]
+
+    assert len(os.listdir(bundle / "keys")) == 2
+    assert keys[0] == keys[1]
+    assert keys[0] != keys[2]
+    assert keys[2].startswith(f"{bundle}/keys/")
+    assert (bundle / "keys" / os.path.basename(keys[2])).read_text() == "another"
+
+
+def test_groups(tmp_path):
+    """Playbook Tag Groups Tests"""
+    recipe = Recipe("1", "ping", "tasks: []", [], [], None, None)
+    hosts = [
+        Host(
+            "1",
+            "web-1",
+            "local",
+            "127.0.0.1",
+            22,
+            "",
+            "",
+            "",
+            ["web", "eu-1"],
+            None,
+            None,
+        ),
+        Host("2", "db-1", "local", "127.0.0.1", 22, "", "", "", ["db"], None, None),
+    ]
+    groups = {"web": {"port": 8080}, "missing": {"port": 1}}
+
+    playbook = Playbook("a", str(tmp_path), hosts, recipe, None, groups)
+    playbook.build()
+
+    bundle = tmp_path / "a" / "inventory"
+    inventory = (bundle / "hosts").read_text()
+
+    assert "[web]\nweb-1\n" in inventory
+    assert "[eu_1]\nweb-1\n" in inventory
+    assert "[db]\ndb-1\n" in inventory
+    assert json.loads((bundle / "group_vars" / "web.json").read_text()) == {
+        "port": 8080
+    }
+    assert os.listdir(bundle / "group_vars") == ["web.json"]
+
+    assert Playbook.group_name("2024") == "tag_2024"
+    assert Playbook.group_name("remote") == "tag_remote"
+
+
+def test_group_collision(tmp_path):
+    """Playbook Tag Group Collision Tests"""
+    recipe = Recipe("1", "ping", "tasks: []", [], [], None, None)
+    hosts = _hosts(3)
+
+    for host, tag in zip(hosts, ("web-1", "web_1", "web-1")):
+        host.tags.append(tag)
+
+    playbook = Playbook("a", str(tmp_path), hosts, recipe)
+
+    with pytest.raises(ValueError, match="web-1 and web_1"):
+        playbook.build()
+
+    # Distinct tags of the same hosts are fine
+    playbook = Playbook("b", str(tmp_path), [hosts[0], hosts[2]], recipe)
+    playbook.build()
+
+    assert (
+        "[web_1]\nhost-0\nhost-2\n"
+        in (tmp_path / "b" / "inventory" / "hosts").read_text()
+    )
+
+
+def test_invalid_name(tmp_path):
+    """Playbook Invalid Host Name Tests"""
+    recipe = Recipe("1", "ping", "tasks: []", [], [], None, None)
+    hosts = _hosts(1) + [
+        Host(
+            "1",
+            "host 1 ansible_host=10.0.0.9",
+            "local",
+            "127.0.0.1",
+            22,
+            "",
+            "",
+            "",
+            [],
+            None,
+            None,
+        )
+    ]
+
+    with pytest.raises(ValueError, match="Invalid host name"):
+        Playbook("a", str(tmp_path), hosts, recipe).build()
+
+
+def test_state_hash():
+    """Playbook State Hash Tests"""
+    recipe = Recipe("1", "motd", RECIPE, [{"motd.j2": "hello"}], [], None, None)
+    host = Host(
+        "1", "web-1", "ssh", "10.0.0.1", 22, "root", "", "key", ["web"], None, None
+    )
+    content = Playbook.content_hash(recipe)
+    state = Playbook.state_hash(content, host, {"web": {"port": 80}})
+
+    assert state == Playbook.state_hash(content, host, {"web": {"port": 80}, "db": {}})
+    assert state != Playbook.state_hash(content, host, {"web": {"port": 8080}})
+    assert state != Playbook.state_hash(
+        Playbook.content_hash(
+            Recipe("1", "motd", RECIPE, [{"motd.j2": "bye"}], [], None, None)
+        ),
+        host,
+        {"web": {"port": 80}},
+    )
+    assert state != Playbook.state_hash(
+        content,
+        Host(
+            "1", "web-1", "ssh", "10.0.0.2", 22, "root", "", "key", ["web"], None, None
+        ),
+        {"web": {"port": 80}},
+    )
@@ -0,0 +1,59 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import pstats
+from flook.module.profiler import Profiler
+
+
+def _work():
+    return sum(i * i for i in range(200000))
+
+
+def test_cprofile(tmp_path):
+    """Profiler cProfile Tests"""
+    profiler = Profiler(str(tmp_path / "flook.prof"))
+    profiler.start()
+    _work()
+    profiler.stop()
+
+    stats = pstats.Stats(str(tmp_path / "flook.prof"))
+
+    assert any(key[2] == "_work" for key in stats.stats.keys())
+
+
+def test_collapsed(tmp_path, monkeypatch):
+    """Profiler Collapsed Stacks Tests"""
+    monkeypatch.setattr(Profiler, "INTERVAL", 0.001)
+
+    profiler = Profiler(str(tmp_path / "flook.folded"))
+    profiler.start()
+
+    for _ in range(20):
+        _work()
+
+    profiler.stop()
+
+    lines = (tmp_path / "flook.folded").read_text().splitlines()
+
+    assert len(lines) > 0
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+    assert any(":_work:" in line for line in lines)
@@ -0,0 +1,116 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import pytest
+from flook.model.host import Host
+from flook.model.recipe import Recipe
+from flook.module import rollout
+from flook.module.rollout import Rollout
+
+
+def _hosts(count):
+    return [
+        Host(str(i), f"host-{i}", "local", "127.0.0.1", 22, "", "", "", [], None, None)
+        for i in range(count)
+    ]
+
+
+class FakeExecutor:
+    """Executor failing the hosts listed in FAILING"""
+
+    FAILING = []
+    RUNS = []
+    INVENTORIES = []
+
+    def __init__(
+        self,
+        id,
+        cache,
+        hosts,
+        recipe,
+        parallel=1,
+        configs=None,
+        groups=None,
+        inventory=None,
+    ):
+        self._hosts = hosts
+        FakeExecutor.RUNS.append(id)
+        FakeExecutor.INVENTORIES.append(inventory)
+
+    def run(self, listener=None, quiet=False):
+        results = {
+            host.name: {
+                "status": "failed" if host.name in FakeExecutor.FAILING else "ok"
+            }
+            for host in self._hosts
+        }
+        return all(r["status"] == "ok" for r in results.values()), results
+
+
+def test_size():
+    """Rollout Size Tests"""
+    assert Rollout.size("10", 100) == 10
+    assert Rollout.size("25%", 10) == 3
+    assert Rollout.size("1%", 10) == 1
+
+    for value in ["0", "x", "%"]:
+        with pytest.raises(ValueError):
+            Rollout.size(value, 10)
+
+
+def test_batches():
+    """Rollout Batches Tests"""
+    batches = Rollout("a", "/tmp", _hosts(10), None, "40%", "1").batches()
+
+    assert [len(batch) for batch in batches] == [1, 4, 4, 1]
+
+
+def test_run(tmp_path, monkeypatch):
+    """Rollout Run Tests"""
+    monkeypatch.setattr(rollout, "Executor", FakeExecutor)
+    FakeExecutor.FAILING = ["host-2"]
+    FakeExecutor.RUNS = []
+    FakeExecutor.INVENTORIES = []
+    recipe = Recipe("1", "ping", "tasks: []", [], [], None, None)
+
+    status, results = Rollout("a", str(tmp_path), _hosts(6), recipe, "2").run()
+
+    assert not status
+    assert FakeExecutor.RUNS == ["a-0", "a-1"]
+    assert FakeExecutor.INVENTORIES == [f"{tmp_path}/a/inventory"] * 2
+    assert not (tmp_path / "a").exists()
+    assert [results[f"host-{i}"]["status"] for i in range(6)] == [
+        "ok",
+        "ok",
+        "failed",
+        "ok",
+        "skipped",
+        "skipped",
+    ]
+
+    FakeExecutor.RUNS = []
+    status, results = Rollout("a", str(tmp_path), _hosts(6), recipe, "2", "", 25).run()
+
+    assert not status
+    assert len(FakeExecutor.RUNS) == 3
+    assert results["host-5"]["status"] == "ok"
@@ -0,0 +1,120 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import pytest
+from flook.model.host import Host
+from flook.module.database import Database
+from flook.module.selector import Selector
+
+
+def _database(tmp_path):
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+    database.insert_hosts(
+        [
+            Host(
+                "1",
+                "web-1",
+                "ssh",
+                "10.0.0.1",
+                22,
+                "root",
+                "",
+                "k",
+                ["web"],
+                None,
+                None,
+            ),
+            Host(
+                "2",
+                "web-2",
+                "ssh",
+                "10.0.1.2",
+                22,
+                "root",
+                "",
+                "k",
+                ["web", "canary"],
+                None,
+                None,
+            ),
+            Host(
+                "3", "db-1", "ssh", "10.1.0.1", 22, "root", "", "k", ["db"], None, None
+            ),
+            Host("4", "local", "local", "localhost", 22, "", "", "", [], None, None),
+        ]
+    )
+    return database
+
+
+def test_compile():
+    """Selector Compile Tests"""
+    selector = Selector()
+
+    assert selector.compile("name:web-1") == ("name = ?", ["web-1"])
+    assert selector.compile("name:web-*") == ("name GLOB ?", ["web-*"])
+    assert selector.compile("ip:10.0.0.0/24") == (
+        "ipv4 BETWEEN ? AND ?",
+        [167772160, 167772415],
+    )
+    assert selector.compile("!connection:local & (name:a | name:b)") == (
+        "(NOT connection = ? AND (name = ? OR name = ?))",
+        ["local", "a", "b"],
+    )
+
+    for expression in [
+        "",
+        "tag:",
+        "tag:web &",
+        "(tag:web",
+        "tag:web)",
+        "os:linux",
+        "ip:fd00::/8",
+    ]:
+        with pytest.raises(ValueError):
+            selector.compile(expression)
+
+
+def test_errors():
+    """Selector Error Messages Tests"""
+    with pytest.raises(ValueError, match="Unexpected tag:b in host selector"):
+        Selector().compile("tag:a tag:b")
+
+    with pytest.raises(ValueError, match="Unexpected \\) in host selector"):
+        Selector().compile("tag:a)")
+
+
+def test_select(tmp_path):
+    """Selector Hosts Selection Tests"""
+    database = _database(tmp_path)
+
+    def names(select):
+        return sorted(host.name for host in database.list_hosts("", select))
+
+    assert names("tag:web & !tag:canary | name:db-*") == ["db-1", "web-1"]
+    assert names("ip:10.0.0.0/16") == ["web-1", "web-2"]
+    assert names("ip:localhost | connection:local") == ["local"]
+    assert names("!(tag:web | tag:db)") == ["local"]
+    assert names("tag:can*") == ["web-2"]
+    assert [host.name for host in database.list_hosts("db", "name:*-1")] == ["db-1"]
@@ -0,0 +1,99 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import sys
+import time
+import threading
+import subprocess
+from flook.module.client import Client
+from flook.module.server import Server
+from flook.module.database import Database
+
+
+def test_proxied():
+    """Client Proxied Commands Tests"""
+    assert Client.proxied(["host", "list", "-o", "json"])
+    assert not Client.proxied(["host", "ssh", "web-1"])
+    assert not Client.proxied(["recipe", "run", "ping"])
+    assert not Client.proxied(["host", "list", "--help"])
+    assert not Client.proxied(["--version"])
+
+
+def _init(home):
+    home.mkdir(exist_ok=True)
+    subprocess.run(
+        [sys.executable, "-m", "flook.cli", "config", "init"],
+        env=dict(os.environ, HOME=str(home)),
+        capture_output=True,
+    )
+
+
+def test_serve(tmp_path, monkeypatch):
+    """Server Tests"""
+    _init(tmp_path)
+    _init(tmp_path / "other")
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+    path = str(tmp_path / "flook.sock")
+    client = Client(path)
+
+    assert client.request(["host", "list"]) is None
+
+    server = Server(path)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    while not os.path.exists(path):
+        time.sleep(0.01)
+
+    try:
+        response = client.request(["host", "list", "-o", "json"])
+
+        assert response["code"] == 1
+        assert "No hosts found!" in response["stderr"]
+
+        response = client.request(
+            ["host", "add", "web-1", "-c", "local", "-i", "127.0.0.1"]
+        )
+
+        assert response["code"] == 0
+
+        response = client.request(["host", "get", "web-1", "-o", "jsonl"])
+
+        assert response["code"] == 0
+        assert '"name": "web-1"' in response["stdout"]
+        assert len(Database.POOL) == 1
+
+        # Another client HOME gets its own configs and database
+        monkeypatch.setenv("HOME", str(tmp_path / "other"))
+        response = client.request(["host", "get", "web-1"])
+
+        assert response["code"] == 1
+        assert len(Database.POOL) == 2
+    finally:
+        server.stop()
+        thread.join(5)
+
+    assert not os.path.exists(path)
+    assert Database.POOL is None
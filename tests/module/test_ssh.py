@@ -0,0 +1,55 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import subprocess
+from flook.model.host import Host
+from flook.module.ssh import Ssh
+
+
+def _commands(monkeypatch, configs):
+    commands = []
+
+    def run(command, **kwargs):
+        commands.append(command)
+        return subprocess.CompletedProcess(command, 0)
+
+    monkeypatch.setattr(subprocess, "run", run)
+
+    host = Host("1", "web-1", "ssh", "10.0.0.1", 22, "root", "", "key", [], None, None)
+
+    assert Ssh("/tmp/cp", configs).prewarm([(host, "/tmp/key.pem")]) == 1
+
+    return commands
+
+
+def test_prewarm_host_keys(monkeypatch):
+    """Ssh Prewarm Host Key Checking Tests"""
+    command = " ".join(_commands(monkeypatch, None)[0])
+
+    assert "StrictHostKeyChecking" not in command
+    assert "BatchMode=yes" in command
+    assert command.endswith("root@10.0.0.1 true")
+
+    command = " ".join(_commands(monkeypatch, {"prewarm_accept_new_keys": True})[0])
+
+    assert "StrictHostKeyChecking=accept-new" in command
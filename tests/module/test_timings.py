@@ -0,0 +1,77 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from flook.module.timings import Timings
+
+
+def test_percentile():
+    """Timings Percentile Tests"""
+    assert Timings.percentile([], 50) is None
+    assert Timings.percentile([3], 95) == 3
+    assert Timings.percentile([4, 1, 3, 2], 50) == 2
+    assert Timings.percentile(list(range(1, 101)), 95) == 95
+    assert Timings.percentile([4, 1, 3, 2], 100) == 4
+
+
+def test_handle():
+    """Timings Handle Tests"""
+    events = []
+    timings = Timings(events.append)
+
+    timings.handle({"event": "task", "task": "ping"})
+    timings.handle(
+        {
+            "event": "ok",
+            "host": "web-1",
+            "task": "ping",
+            "changed": False,
+            "start": "2023-01-01T00:00:00",
+            "end": "2023-01-01T00:00:01",
+            "duration": 1.23456,
+        }
+    )
+
+    assert len(events) == 2
+    assert timings.rows == [
+        ("web-1", "ping", "ok", "2023-01-01T00:00:00", "2023-01-01T00:00:01", 1.235)
+    ]
+
+
+def test_flush():
+    """Timings Flush Tests"""
+    batches = []
+    timings = Timings(writer=batches.append, batch=2)
+
+    for index in range(5):
+        timings.handle(
+            {"event": "ok", "host": f"web-{index}", "task": "ping", "duration": 1}
+        )
+
+    assert [len(batch) for batch in batches] == [2, 2]
+    assert len(timings.rows) == 1
+
+    timings.flush()
+    timings.flush()
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert timings.rows == []
+    assert batches[2][0][0] == "web-4"
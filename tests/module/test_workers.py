@@ -0,0 +1,84 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import sys
+import click
+import pytest
+from flook.model.task import Task
+from flook.command import workers
+from flook.command.workers import Workers
+from flook.module.database import Database
+
+
+def test_limits():
+    """Workers Limits Tests"""
+    assert Workers.limits([]) == {}
+    assert Workers.limits(["tag:db=2", "tag:web=0"]) == {"db": 2, "web": 0}
+
+    for value in ("db=2", "tag:=2", "tag:db", "tag:db=x"):
+        with pytest.raises(click.ClickException):
+            Workers.limits([value])
+
+
+def test_run(tmp_path, monkeypatch):
+    """Workers Run Tests"""
+    database = Database()
+    database.connect(str(tmp_path / "flook.db"))
+    database.migrate()
+
+    # A run that records its result and one that dies before it can
+    commands = {
+        "a": "import sys; from flook.module.database import Database; from flook.model.task import Task; d = Database(); d.connect(sys.argv[1]); d.save_task(Task('a', 'ping', 'successful', {}, {}, None, None))",
+        "b": "raise SystemExit(3)",
+    }
+
+    monkeypatch.setattr(
+        workers.Recipes,
+        "command",
+        staticmethod(
+            lambda payload, id: [
+                sys.executable,
+                "-c",
+                commands[id],
+                str(tmp_path / "flook.db"),
+            ]
+        ),
+    )
+
+    for id in ("a", "b"):
+        database.enqueue_task(Task(id, "ping", "queued", {}, {}, None, None), ["db"])
+
+    worker = Workers()
+    worker.database = database
+    worker._configs = {"cache": {"path": str(tmp_path)}}
+    worker.run(2, ["tag:db=1"], True, 0.1)
+
+    assert database.get_task("a").status == "successful"
+    assert database.get_task("b").status == "failed"
+    assert database.get_task("b").result == {"error": "Run exited with code 3"}
+    assert (tmp_path / "b.log").exists()
+
+
+def test_lease():
+    """Workers Lease Tests"""
+    with pytest.raises(click.ClickException):
+        Workers().run(1, [], True, 5.0, 5)
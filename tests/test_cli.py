@@ -0,0 +1,228 @@
+# MIT License
+#
+# Copyright (c) 2023 Clivern
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import json
+import sys
+import subprocess
+import pytest
+from flook.model.task import Task
+from flook.module.database import Database
+
+
+# Modules a subcommand must never pay for
+HEAVY = ["ansible_runner", "prettytable", "importlib.metadata", "multiprocessing"]
+
+
+def _imports(home, args):
+    """Run a flook command under -X importtime and get the imported modules"""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "from flook.cli import main; main()",
+        ]
+        + args,
+        env=dict(os.environ, HOME=str(home)),
+        capture_output=True,
+        text=True,
+    )
+
+    modules = {}
+
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        parts = line[len("import time:") :].split("|")
+
+        if parts[0].strip().isdigit():
+            modules[parts[2].strip()] = int(parts[1])
+
+    return modules
+
+
+@pytest.fixture
+def home(tmp_path):
+    subprocess.run(
+        [sys.executable, "-m", "flook.cli", "config", "init"],
+        env=dict(os.environ, HOME=str(tmp_path)),
+        capture_output=True,
+    )
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "args,allowed",
+    [
+        (["--version"], ["importlib.metadata"]),
+        (["host", "list", "-o", "json"], []),
+        (["host", "get", "missing", "-o", "json"], []),
+        (["recipe", "list", "-o", "json"], []),
+        (["recipe", "get", "missing", "-o", "json"], []),
+        (["task", "list", "-o", "json"], []),
+        (["config", "dump"], []),
+        (["host", "list"], ["prettytable"]),
+    ],
+)
+def test_startup_imports(home, args, allowed):
+    """CLI Startup Imports Tests"""
+    modules = _imports(home, args)
+
+    # Import times are too noisy on shared runners, the modules are not
+    assert "flook.cli" in modules
+
+    for module in HEAVY:
+        if module not in allowed:
+            assert module not in modules, f"{module} imported by flook {args}"
+
+
+def test_detached_run_fails_before_start(home):
+    """CLI Detached Run Failing Before It Starts Tests"""
+    database = Database()
+    database.connect(str(home / "flook.db"))
+    database.migrate()
+    database.save_task(Task("1", "missing", "pending", {}, {}, None, None))
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from flook.cli import main; main()",
+            "recipe",
+            "run",
+            "missing",
+            "--run-id",
+            "1",
+        ],
+        env=dict(os.environ, HOME=str(home)),
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 1
+    assert database.get_task("1").status == "failed"
+    assert "not found" in database.get_task("1").result["error"]
+
+
+def test_task_stats(home):
+    """CLI Task Stats Tests"""
+    database = Database()
+    database.connect(str(home / "flook.db"))
+    database.migrate()
+
+    for id, duration in (("1", 2.0), ("2", 3.0)):
+        database.save_task(
+            Task(id, "ping", "successful", {}, {"duration": duration}, None, None)
+        )
+        database.insert_task_timings(
+            id,
+            [
+                ("web-1", "setup", "ok", None, None, duration / 2),
+                ("web-2", "setup", "ok", None, None, duration),
+                ("web-1", "ping", "ok", None, None, 0.1),
+            ],
+        )
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from flook.cli import main; main()",
+            "task",
+            "stats",
+            "2",
+            "-o",
+            "json",
+        ],
+        env=dict(os.environ, HOME=str(home)),
+        capture_output=True,
+        text=True,
+    )
+
+    data = json.loads(result.stdout)[0]
+
+    assert result.returncode == 0
+    assert data["previousRuns"] == 1
+    assert data["change"] == "+50.0%"
+    assert [task["task"] for task in data["tasks"]] == ["setup", "ping"]
+    assert data["tasks"][0]["p50"] == 1.5
+    assert data["tasks"][0]["previousP50"] == 1.0
+    assert data["tasks"][0]["change"] == "+50.0%"
+
+
+def test_changed_only(home):
+    """CLI Changed Only Run Tests"""
+    from flook.model.host import Host
+    from flook.model.recipe import Recipe
+    from flook.module.playbook import Playbook
+
+    database = Database()
+    database.connect(str(home / "flook.db"))
+    database.migrate()
+
+    host = Host("1", "web-1", "local", "127.0.0.1", 22, "", "", "", ["web"], None, None)
+    recipe = Recipe("r", "ping", "tasks: []", [], [], None, None, "[]")
+
+    database.insert_host(host)
+    database.insert_recipe(recipe)
+    database.save_host_states(
+        "r",
+        "0",
+        [("1", Playbook.state_hash(Playbook.content_hash(recipe), host), "ok")],
+    )
+
+    def run(*args):
+        return subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "from flook.cli import main; main()",
+                "recipe",
+                "run",
+                "ping",
+                "-t",
+                "web",
+                "--changed-only",
+                "--run-id",
+                "1",
+            ]
+            + list(args),
+            env=dict(os.environ, HOME=str(home)),
+            capture_output=True,
+            text=True,
+        )
+
+    result = run()
+
+    assert result.returncode == 0
+    assert "All 1 hosts converged" in result.stdout
+    assert database.get_task("1").status == "successful"
+    assert database.get_task("1").result["converged"] == 1
+
+    result = run("--max-age", "1w")
+
+    assert result.returncode == 1
+    assert "Invalid duration 1w" in result.stderr